@@ -1,14 +1,39 @@
+import argparse
+import bisect
+import concurrent.futures
 import csv
+import io
 import configparser
 import datetime
+import hashlib
+import heapq
+import itertools
 import logging
+import math
+import mmap
+import multiprocessing
+import re
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
 import json
 import os
+import pickle
 import pathlib # Pour gérer les chemins de manière robuste
+import queue
+import random
 import sys # Pour sys.executable et sys.frozen
+import threading
+import time
+import traceback
+import tracemalloc
+import unicodedata
+from functools import lru_cache
+
+try:
+    import numpy as np # Optionnel : allure, vitesse et % âge calculés par tableaux
+except ImportError:
+    np = None
 
 # Configuration du logging pour la console
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
@@ -22,31 +47,2514 @@ else:
 RECOVERY_FILE = BASE_PATH / "race_recovery_state.json"
 CONFIG_FILENAME = BASE_PATH / "categories.ini" 
 LISTE_DEPARTS_FILENAME = BASE_PATH / "liste_departs.csv" # Fichier CSV par défaut pour les participants
+SCAN_BATCH_INTERVAL_MS = 100 # Période de traitement des scans en mode douchette
+SCAN_MAX_GAP_SECONDS = 0.3 # Fin de scan implicite pour les douchettes sans suffixe Entrée
 RESULTS_DIR = BASE_PATH / "résultats" 
+SETTINGS_FILENAME = BASE_PATH / "race_timer_settings.json" # Réglages du poste (dossier miroir), hors état de course
+START_OFFSETS_FILENAME = BASE_PATH / "decalages_depart.json" # Décalages de départ, conservés d'une session à l'autre
+MIRROR_INTERVAL_SECONDS = 2.0 # Période des passes du miroir : retard maximal visé de la copie de secours
+MIRROR_CHUNK_BYTES = 64 * 1024 # Taille des blocs comparés par empreinte
+MIRROR_SMALL_FILE_BYTES = 4 * MIRROR_CHUNK_BYTES # En dessous, la copie est remplacée en entier (fichier temporaire puis os.replace)
+MIRROR_LAG_WARN_SECONDS = 10.0 # Indicateur orange si la dernière passe réussie est plus ancienne
+DIAGNOSTICS_LOG_FILENAME = BASE_PATH / "diagnostics_blocages.log" # Blocages de l'interface avec la pile du thread Tk
+STALL_HEARTBEAT_MS = 100 # Battement de la boucle Tk surveillé par le thread watchdog
+STALL_THRESHOLD_SECONDS = 0.5 # Retard du battement à partir duquel l'interface est considérée bloquée
+STALL_SAMPLE_SECONDS = 0.05 # Période d'échantillonnage de la pile pendant un blocage
+AGE_FACTORS_FILENAME = BASE_PATH / "facteurs_age.ini" # Coefficients d'âge et temps de référence (optionnel)
+STARTUP_CACHE_FILE = BASE_PATH / "race_timer_cache.pickle" # Données déjà analysées (config, liste de départ) pour un démarrage rapide
+DISK_WRITER_POLL_MS = 200 # Remise des accusés d'écriture sur le thread Tk
+DISK_BACKLOG_WARN_COUNT = 5 # Indicateur d'écritures en attente au-delà de ce nombre...
+DISK_BACKLOG_WARN_SECONDS = 2.0 # ...ou si la plus ancienne attend depuis plus longtemps
+
+# Alias d'en-têtes acceptés pour la colonne optionnelle de club (classement par équipes)
+CLUB_HEADER_ALIASES = ['club', 'équipe', 'equipe', 'team', 'association', 'asso']
+TEAM_SIZE_DEFAULT = 4 # Nombre de coureurs qui marquent pour leur club
+# Alias d'en-têtes acceptés pour la colonne optionnelle d'année de naissance
+BIRTH_YEAR_HEADER_ALIASES = ['année', 'annee', 'année de naissance', 'annee de naissance', 'naissance', 'né(e) en', 'an', 'birth year', 'yob']
+
+
+def parse_annees_interval(annees_str):
+    """Convertit le texte libre 'annees' de categories.ini en intervalle (min, max) d'années de naissance.
+
+    None signifie borne ouverte. Retourne None si le texte n'est pas interprétable (ex: 'U12')."""
+    if not isinstance(annees_str, str):
+        return None
+    text = annees_str.strip().lower()
+    years = [int(y) for y in re.findall(r'\b(\d{4})\b', text)]
+    if len(years) >= 2:
+        return (min(years[0], years[1]), max(years[0], years[1]))
+    if len(years) == 1:
+        year = years[0]
+        if re.search(r'jeune|après|apres|plus tard', text):
+            return (year, None)
+        if re.search(r'âg|ag[ée]|vieu|avant|plus t[ôo]t', text):
+            return (None, year)
+        return (year, year)
+    return None
+
+
+def normalize_category_name(cat_name):
+    if isinstance(cat_name, str):
+        return cat_name.strip().capitalize() 
+    return "" 
+
+
+def parse_birth_year(value):
+    """Extrait une année de naissance (4 chiffres) d'une cellule CSV ('2010', '12/03/2010'...)."""
+    match = re.search(r'(\d{4})', value or '')
+    return int(match.group(1)) if match else None
+
+
+class CategoryYearIndex:
+    """Index année de naissance -> catégorie(s), construit une fois à partir des textes 'annees'.
+
+    Les intervalles sont découpés en segments élémentaires triés ; une recherche est un bisect (O(log k))."""
+
+    def __init__(self, annees_categories=None):
+        self.intervals = {}
+        self.unparsed = []
+        self._starts = []
+        self._cats = []
+        for cat, annees in (annees_categories or {}).items():
+            interval = parse_annees_interval(annees)
+            if interval is None:
+                self.unparsed.append(cat)
+            else:
+                self.intervals[cat] = interval
+        self._build()
+
+    def _build(self):
+        bounds = set()
+        for lo, hi in self.intervals.values():
+            bounds.add(lo if lo is not None else float('-inf'))
+            if hi is not None: bounds.add(hi + 1)
+        self._starts = sorted(bounds)
+        self._cats = []
+        for start in self._starts:
+            covering = tuple(sorted(cat for cat, (lo, hi) in self.intervals.items()
+                                    if (lo is None or lo <= start) and (hi is None or start <= hi)))
+            self._cats.append(covering)
+
+    def lookup(self, year):
+        """Retourne le tuple (trié) des catégories couvrant l'année donnée ; vide si aucune."""
+        if year is None or not self._starts:
+            return ()
+        idx = bisect.bisect_right(self._starts, year) - 1
+        return self._cats[idx] if idx >= 0 else ()
+
+    def validate(self):
+        """Liste des problèmes (chevauchements, trous, textes non interprétables), en français pour le log/l'UI."""
+        issues = []
+        for i, (start, cats) in enumerate(zip(self._starts, self._cats)):
+            end = self._starts[i + 1] - 1 if i + 1 < len(self._starts) else None
+            lo_txt = "..." if start == float('-inf') else str(int(start))
+            hi_txt = "..." if end is None else str(int(end))
+            if len(cats) > 1:
+                issues.append(f"Chevauchement {lo_txt}-{hi_txt}: {', '.join(cats)}")
+            elif not cats and start != float('-inf') and end is not None:
+                issues.append(f"Années sans catégorie: {lo_txt}-{hi_txt}")
+        for cat in self.unparsed:
+            issues.append(f"Années non interprétables pour la catégorie '{cat}'")
+        return issues
+
+
+def parse_bib_range(text):
+    """Convertit le texte 'dossards' de categories.ini ('1-99', '100 à 199', '250') en intervalle (min, max).
+
+    Retourne None si le texte n'est pas interprétable."""
+    numbers = [int(n) for n in re.findall(r'\d+', text or '')]
+    if len(numbers) == 1:
+        return (numbers[0], numbers[0])
+    if len(numbers) == 2:
+        return (min(numbers), max(numbers))
+    return None
+
+
+class BibRangeIndex:
+    """Plages de dossards réservées par catégorie, triées par début : la catégorie propriétaire d'un dossard
+    est trouvée par bisect (O(log k))."""
+
+    def __init__(self, dossards_categories=None):
+        self.ranges = {}
+        self.unparsed = []
+        for cat, text in (dossards_categories or {}).items():
+            bib_range = parse_bib_range(text)
+            if bib_range is None:
+                self.unparsed.append(cat)
+            else:
+                self.ranges[cat] = bib_range
+        self._sorted = sorted((lo, hi, cat) for cat, (lo, hi) in self.ranges.items())
+        self._starts = [lo for lo, _, _ in self._sorted]
+        self._reach = list(itertools.accumulate((hi for _, hi, _ in self._sorted), max)) # Fin maximale des plages 0..i
+
+    def range_of(self, cat):
+        return self.ranges.get(cat)
+
+    def owner(self, bib):
+        """Catégorie dont la plage contient le dossard, ou None (plages chevauchantes: celle qui commence le plus tard)."""
+        idx = bisect.bisect_right(self._starts, bib) - 1
+        while idx >= 0 and self._reach[idx] >= bib:
+            lo, hi, cat = self._sorted[idx]
+            if hi >= bib: return cat
+            idx -= 1
+        return None
+
+    def validate(self):
+        issues = []
+        active = [] # Plages déjà vues qui atteignent encore le début de la plage courante
+        for lo_b, hi_b, cat_b in self._sorted:
+            active = [entry for entry in active if entry[1] >= lo_b]
+            for lo_a, hi_a, cat_a in active: # Toutes les paires, pas seulement les plages voisines
+                issues.append(f"Chevauchement {lo_b}-{min(hi_a, hi_b)}: {cat_a}, {cat_b}")
+            active.append((lo_b, hi_b, cat_b))
+        for cat in self.unparsed:
+            issues.append(f"Plage de dossards non interprétable pour la catégorie '{cat}'")
+        return issues
+
+
+class BibAllocator:
+    """Ensemble des dossards pris, stocké en intervalles disjoints triés (listes parallèles début/fin).
+
+    Test d'appartenance et recherche du prochain dossard libre par bisect (O(log n)) ; une liste de départ
+    numérotée en séquence tient en quelques intervalles, l'ajout d'un dossard ne fait que fusionner ses voisins."""
+
+    def __init__(self, bibs=()):
+        self._starts = []
+        self._ends = []
+        for bib in sorted(set(bibs)):
+            if self._ends and self._ends[-1] == bib - 1:
+                self._ends[-1] = bib
+            else:
+                self._starts.append(bib); self._ends.append(bib)
+
+    def __contains__(self, bib):
+        idx = bisect.bisect_right(self._starts, bib) - 1
+        return idx >= 0 and self._ends[idx] >= bib
+
+    def __len__(self):
+        return sum(end - start + 1 for start, end in zip(self._starts, self._ends))
+
+    def add(self, bib):
+        idx = bisect.bisect_right(self._starts, bib) - 1
+        if idx >= 0 and self._ends[idx] >= bib: return
+        joins_left = idx >= 0 and self._ends[idx] == bib - 1
+        joins_right = idx + 1 < len(self._starts) and self._starts[idx + 1] == bib + 1
+        if joins_left and joins_right:
+            self._ends[idx] = self._ends[idx + 1]
+            del self._starts[idx + 1], self._ends[idx + 1]
+        elif joins_left:
+            self._ends[idx] = bib
+        elif joins_right:
+            self._starts[idx + 1] = bib
+        else:
+            self._starts.insert(idx + 1, bib); self._ends.insert(idx + 1, bib)
+
+    def discard(self, bib):
+        idx = bisect.bisect_right(self._starts, bib) - 1
+        if idx < 0 or self._ends[idx] < bib: return
+        start, end = self._starts[idx], self._ends[idx]
+        if start == end:
+            del self._starts[idx], self._ends[idx]
+        elif bib == start:
+            self._starts[idx] = bib + 1
+        elif bib == end:
+            self._ends[idx] = bib - 1
+        else:
+            self._ends[idx] = bib - 1
+            self._starts.insert(idx + 1, bib + 1); self._ends.insert(idx + 1, end)
+
+    def next_free(self, low=1, high=None):
+        """Plus petit dossard libre >= low (et <= high si donné), ou None si la plage est pleine."""
+        idx = bisect.bisect_right(self._starts, low) - 1
+        candidate = self._ends[idx] + 1 if idx >= 0 and self._ends[idx] >= low else low
+        return candidate if high is None or candidate <= high else None
+
+
+_COLLATION_EXPANSIONS = str.maketrans({'œ': 'oe', 'æ': 'ae', '-': None, "'": None, '’': None, ' ': None})
+
+
+def collation_primary(text):
+    """Forme comparable d'un nom: sans accents, casse, espaces ni ponctuation de nom, ligatures développées."""
+    folded = (text or '').casefold().translate(_COLLATION_EXPANSIONS)
+    return ''.join(ch for ch in unicodedata.normalize('NFKD', folded) if not unicodedata.combining(ch))
+
+
+def collation_key(text):
+    """Clé de tri française insensible aux accents et à la casse: 'Lefevre' < 'Lefèvre' < 'Lefort'.
+
+    Niveau primaire (collation_primary), puis le texte en minuscules pour départager; les deux sont joints par \x00
+    en une seule chaîne comparable."""
+    return f"{collation_primary(text)}\x00{(text or '').casefold()}"
+
+
+@lru_cache(maxsize=None)
+def category_collation_key(cat):
+    # Peu de catégories distinctes: clé mémorisée plutôt que stockée sur chaque participant
+    return collation_key(cat)
+
+
+class Participant:
+    """Inscrit de la liste de départ. __slots__ et chaînes catégorie/sexe internées: empreinte réduite sur les gros effectifs.
+    Les clés de tri (nom, prénom) sont calculées une fois à la création."""
+
+    __slots__ = ('bib', 'nom', 'prenom', 'sexe', 'cat', 'annee', 'club', 'sort_nom', 'sort_prenom')
+
+    def __init__(self, bib, nom, prenom, sexe, cat, annee=None, club=None):
+        self.bib = bib
+        self.nom = nom
+        self.prenom = prenom
+        self.sexe = sys.intern(sexe)
+        self.cat = sys.intern(cat)
+        self.annee = annee
+        self.club = sys.intern(club) if club else None
+        self.sort_nom = collation_key(nom)
+        self.sort_prenom = collation_key(prenom)
+
+    def __reduce__(self):
+        # Pickle compact (cache de démarrage) ; le constructeur ré-interne catégorie, sexe et club au chargement
+        return (Participant, (self.bib, self.nom, self.prenom, self.sexe, self.cat, self.annee, self.club))
+
+    def __repr__(self):
+        return f"Participant({self.bib!r}, {self.nom!r}, {self.prenom!r}, {self.sexe!r}, {self.cat!r}, {self.annee!r}, {self.club!r})"
+
+
+class Result:
+    """Résultat d'un dossard : temps (timedelta) ou abandon."""
+
+    __slots__ = ('bib', 'time', 'abandon')
+
+    def __init__(self, bib, time, abandon=False):
+        self.bib = bib
+        self.time = time
+        self.abandon = abandon
+
+    def __reduce__(self):
+        return (Result, (self.bib, self.time, self.abandon))
+
+    def __repr__(self):
+        return f"Result({self.bib!r}, {self.time!r}, {self.abandon!r})"
+
+
+SEX_ALIASES = {'h': 'h', 'm': 'h', 'homme': 'h', 'masculin': 'h', 'f': 'f', 'femme': 'f', 'féminin': 'f', 'feminin': 'f', 'w': 'f'}
+IMPORT_PROGRESS_EVERY_ROWS = 2000
+IMPORT_POOL_MIN_FILES = 2 # En dessous, lecture dans le processus courant (démarrer le pool coûte plus cher)
+IMPORT_POOL_MIN_BYTES = 4 * 1024 * 1024 # Idem pour un total plus petit : ~1 s de lecture, le double du démarrage des processus 'spawn'
+
+
+class ParticipantImport:
+    """Résultat d'une lecture de liste de départ : participants valides et problèmes relevés ligne par ligne."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.participants = []
+        self.issues = [] # (ligne, dossard, message)
+        self.encoding = None
+        self.delimiter = None
+        self.cancelled = False
+        self.report_path = None
+        self.source_files = [] # Fichiers fusionnés (import multi-fichiers)
+
+    def report_text(self):
+        """Contenu CSV du rapport des problèmes ; l'écriture passe par le DiskWriter (thread unique d'écriture)."""
+        f = io.StringIO(newline='')
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Fichier', str(self.file_path), ''])
+        writer.writerow(['Ligne', 'Dossard', 'Problème'])
+        for line_no, bib_s, message in self.issues:
+            writer.writerow([line_no, bib_s, message])
+        return f.getvalue()
+
+
+def _iter_lines_with_progress(text_file, total_size, progress_callback, cancel_event):
+    read_chars = 0
+    for line_no, line in enumerate(text_file):
+        read_chars += len(line)
+        if line_no % IMPORT_PROGRESS_EVERY_ROWS == 0:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            if progress_callback and total_size:
+                progress_callback(min(read_chars / total_size, 1.0))
+        yield line
+
+
+def read_participants_file(file_path, year_index=None, known_categories=None, progress_callback=None, cancel_event=None):
+    """Lit et valide une liste de départ (CSV) en flux, sans toucher à Tk : utilisable depuis un thread.
+
+    Retourne un ParticipantImport, ou None si aucun couple encodage/délimiteur ne convient."""
+    file_path = pathlib.Path(file_path)
+    year_index = year_index or CategoryYearIndex()
+    total_size = file_path.stat().st_size
+    possible_encodings = ('utf-8-sig', 'utf-8', 'cp1252', 'mbcs', 'latin-1')
+    # Prioritize semicolon as per user file example and write operations
+    common_delimiters = [';', ',']
+
+    for encoding in possible_encodings:
+        sniffed_delimiter = None
+        try: 
+            with file_path.open('r', encoding=encoding, newline='') as fs:
+                sample = fs.read(2048) 
+                if sample: 
+                    dialect = csv.Sniffer().sniff(sample, delimiters=''.join(common_delimiters))
+                    sniffed_delimiter = dialect.delimiter
+        except Exception: 
+            pass 
+
+        delimiters_to_try = [sniffed_delimiter] if sniffed_delimiter else common_delimiters
+        
+        for delimiter in delimiters_to_try:
+            try:
+                result = ParticipantImport(file_path)
+                with file_path.open(newline='', encoding=encoding) as fc:
+                    reader = csv.DictReader(_iter_lines_with_progress(fc, total_size, progress_callback, cancel_event), delimiter=delimiter)
+                    if cancel_event is not None and cancel_event.is_set():
+                        result.cancelled = True
+                        return result
+                    if not reader.fieldnames: continue
+                    original_fieldnames = reader.fieldnames
+                    norm_to_orig_map = { (fn.strip().lower() if fn else ''): fn for fn in original_fieldnames} 
+                    
+                    bib_key = next((k for k in ['n° dossard', 'n. dossard', 'dossard', 'n','no dossard', 'no. dossard'] if k in norm_to_orig_map), None)
+                    nom_key = next((k for k in ['nom'] if k in norm_to_orig_map), None)
+                    prenom_key = next((k for k in ['prénom', 'prenom'] if k in norm_to_orig_map), None)
+                    sexe_key = next((k for k in ['sexe', 'sex'] if k in norm_to_orig_map), None)
+                    cat_key = next((k for k in ['catégorie', 'categorie', 'cat'] if k in norm_to_orig_map), None)
+                    annee_key = next((k for k in BIRTH_YEAR_HEADER_ALIASES if k in norm_to_orig_map), None)
+                    club_key = next((k for k in CLUB_HEADER_ALIASES if k in norm_to_orig_map), None)
+
+                    bib_h_orig = norm_to_orig_map.get(bib_key) if bib_key else None
+                    nom_h_orig = norm_to_orig_map.get(nom_key) if nom_key else None
+                    prenom_h_orig = norm_to_orig_map.get(prenom_key) if prenom_key else None
+                    sexe_h_orig = norm_to_orig_map.get(sexe_key) if sexe_key else None
+                    cat_h_orig = norm_to_orig_map.get(cat_key) if cat_key else None
+                    annee_h_orig = norm_to_orig_map.get(annee_key) if annee_key else None
+                    club_h_orig = norm_to_orig_map.get(club_key) if club_key else None
+
+                    # La catégorie peut être déduite de l'année de naissance si la colonne existe
+                    if not all([bib_h_orig, nom_h_orig, prenom_h_orig, sexe_h_orig, cat_h_orig or annee_h_orig]): 
+                        logging.debug(f"Headers manquants pour import ({file_path}) avec enc {encoding} delim '{delimiter}'. Fields: {original_fieldnames}")
+                        continue
+                    
+                    seen_bibs = set()
+                    issues = result.issues
+                    for row_idx, row in enumerate(reader):
+                        line_no = row_idx + 2
+                        bib_s = (row.get(bib_h_orig) or '').strip()
+                        if not bib_s: 
+                            if all(not (row.get(h) or '').strip() for h in [nom_h_orig, prenom_h_orig, sexe_h_orig, cat_h_orig, annee_h_orig] if h):
+                                continue 
+                        if not bib_s.isdigit(): 
+                            issues.append((line_no, bib_s, "Dossard non numérique, ligne ignorée"))
+                            continue
+                        bib = int(bib_s)
+                        nom_val = (row.get(nom_h_orig) or '').strip()
+                        prenom_val = (row.get(prenom_h_orig) or '').strip()
+                        sexe_raw = (row.get(sexe_h_orig) or '').strip().lower() 
+                        cat_val = normalize_category_name(row.get(cat_h_orig)) if cat_h_orig else ""
+                        annee_val = parse_birth_year(row.get(annee_h_orig)) if annee_h_orig else None
+                        if not cat_val and annee_val is not None:
+                            candidates = year_index.lookup(annee_val)
+                            if len(candidates) == 1:
+                                cat_val = candidates[0]
+                            elif candidates:
+                                issues.append((line_no, bib_s, f"Catégorie ambiguë pour l'année {annee_val}: {', '.join(candidates)}"))
+                                continue
+                        if not (nom_val and prenom_val and sexe_raw and cat_val): 
+                            issues.append((line_no, bib_s, "Données manquantes, ligne ignorée"))
+                            continue 
+                        sexe_val = SEX_ALIASES.get(sexe_raw)
+                        if sexe_val is None:
+                            issues.append((line_no, bib_s, f"Sexe invalide '{sexe_raw}' (h/f attendu), ligne ignorée"))
+                            continue
+                        if bib in seen_bibs:
+                            issues.append((line_no, bib_s, "Dossard en double, ligne ignorée"))
+                            continue
+                        if known_categories and cat_val not in known_categories:
+                            issues.append((line_no, bib_s, f"Catégorie '{cat_val}' absente de {CONFIG_FILENAME.name}, ligne ignorée"))
+                            continue
+                        seen_bibs.add(bib)
+                        club_val = ' '.join((row.get(club_h_orig) or '').split()) if club_h_orig else None
+                        result.participants.append(Participant(bib, nom_val, prenom_val, sexe_val, cat_val, annee_val, club_val))
+
+                if cancel_event is not None and cancel_event.is_set():
+                    result.cancelled = True
+                result.encoding, result.delimiter = encoding, delimiter
+                if progress_callback: progress_callback(1.0)
+                return result
+            except Exception as e_inner_load: 
+                logging.debug(f"Erreur interne chargement participants (enc:{encoding}, delim:'{delimiter}'): {e_inner_load}")
+    return None
+
+
+def _read_participants_file_job(file_path, annees_categories, known_categories):
+    # Exécuté dans un processus du pool : fonction de niveau module, arguments et résultat picklables
+    return read_participants_file(file_path, CategoryYearIndex(annees_categories), known_categories)
+
+
+def participant_files_in(directory):
+    """Fichiers CSV d'un dossier, triés par nom : cet ordre décide quel fichier garde un dossard en double."""
+    return sorted((p for p in pathlib.Path(directory).iterdir() if p.is_file() and p.suffix.lower() == '.csv'),
+                  key=lambda p: p.name.lower())
+
+
+def merge_participant_imports(results, source, existing=(), existing_name=None):
+    """Fusionne des lectures faites séparément, dans l'ordre donné. Un dossard déjà vu (liste existante ou fichier
+    précédent) est ignoré et signalé ; les problèmes de chaque fichier sont repris avec le nom du fichier."""
+    merged = ParticipantImport(source)
+    first_file_by_bib = {}
+    for p in existing:
+        first_file_by_bib[p.bib] = existing_name
+        merged.participants.append(p)
+    for path, result in results:
+        name = path.name
+        merged.source_files.append(path)
+        if result is None:
+            merged.issues.append((name, '', "Fichier illisible (format, délimiteur ou encodage), ignoré"))
+            continue
+        merged.issues.extend((f"{name}:{line_no}", bib_s, message) for line_no, bib_s, message in result.issues)
+        for p in result.participants:
+            first_file = first_file_by_bib.get(p.bib)
+            if first_file is not None:
+                merged.issues.append((name, str(p.bib), f"Dossard déjà présent dans {first_file}, {p.nom} {p.prenom} ignoré(e)"))
+                continue
+            first_file_by_bib[p.bib] = name
+            merged.participants.append(p)
+    return merged
+
+
+def read_participant_files(paths, annees_categories=None, known_categories=None, max_workers=None,
+                           progress_callback=None, cancel_event=None):
+    """Lit plusieurs listes de départ, un fichier par processus (ProcessPoolExecutor), mêmes règles que read_participants_file.
+    Un petit lot (moins de IMPORT_POOL_MIN_BYTES au total) est lu dans le processus courant.
+
+    Retourne une liste [(chemin, ParticipantImport ou None)] dans l'ordre de `paths`, quel que soit l'ordre de fin."""
+    paths = [pathlib.Path(p) for p in paths]
+    annees_categories = dict(annees_categories or {})
+    known_categories = set(known_categories) if known_categories else None
+    results = {}
+
+    def read_serially(indices):
+        for i in indices:
+            if cancel_event is not None and cancel_event.is_set(): return
+            try:
+                results[i] = _read_participants_file_job(paths[i], annees_categories, known_categories)
+            except Exception as e: # Même traitement qu'un fichier en échec dans le pool
+                logging.error(f"Erreur lecture de {paths[i]}: {e}")
+                results[i] = None
+            if progress_callback: progress_callback(len(results) / len(paths))
+
+    def file_size(path):
+        try: return path.stat().st_size
+        except OSError: return 0 # L'erreur sera signalée par la lecture elle-même
+
+    workers = min(len(paths), max_workers or os.cpu_count() or 1)
+    if len(paths) < IMPORT_POOL_MIN_FILES or workers < 2 or sum(map(file_size, paths)) < IMPORT_POOL_MIN_BYTES:
+        read_serially(range(len(paths)))
+    else:
+        # 'spawn' : pas de fork d'un processus qui porte Tk et des threads (et même comportement que sous Windows)
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {pool.submit(_read_participants_file_job, path, annees_categories, known_categories): i
+                       for i, path in enumerate(paths)}
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except concurrent.futures.process.BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logging.error(f"Erreur lecture de {paths[i]}: {e}")
+                    results[i] = None
+                if progress_callback: progress_callback(len(results) / len(paths))
+                if cancel_event is not None and cancel_event.is_set(): break
+        except concurrent.futures.process.BrokenProcessPool as e:
+            logging.warning(f"Pool de processus indisponible ({e}), lecture des fichiers restants dans ce processus.")
+            read_serially([i for i in range(len(paths)) if i not in results])
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return [(path, results.get(i)) for i, path in enumerate(paths) if i in results]
+
+
+def participants_csv_text(participants):
+    """Contenu de liste_departs.csv pour ces participants ; colonnes Année et Club seulement si renseignées."""
+    f = io.StringIO(newline='')
+    writer = csv.writer(f, delimiter=';')
+    with_annee = any(p_data.annee for p_data in participants)
+    with_club = any(p_data.club for p_data in participants)
+    writer.writerow(['N° Dossard', 'Nom', 'Prénom', 'Sexe', 'Catégorie'] + (['Année'] if with_annee else []) + (['Club'] if with_club else []))
+    for p_data in participants:
+        row = [p_data.bib, p_data.nom, p_data.prenom, p_data.sexe, p_data.cat]
+        if with_annee: row.append(p_data.annee or '')
+        if with_club: row.append(p_data.club or '')
+        writer.writerow(row)
+    return f.getvalue()
+
+
+def sniff_csv_delimiter(sample, delimiters=';,'):
+    """Délimiteur d'un extrait CSV (';' ou ','), ';' par défaut comme pour les fichiers écrits par l'application."""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=delimiters).delimiter
+    except csv.Error:
+        first_line = sample.split('\n', 1)[0]
+        return max(delimiters, key=first_line.count) if any(d in first_line for d in delimiters) else delimiters[0]
+
+
+_PARTICIPANT_COLUMN_ALIASES = {
+    'bib': ['n° dossard', 'n. dossard', 'dossard', 'n', 'no dossard', 'no. dossard'], 'nom': ['nom'],
+    'prenom': ['prénom', 'prenom'], 'sexe': ['sexe', 'sex'], 'cat': ['catégorie', 'categorie', 'cat'],
+    'annee': BIRTH_YEAR_HEADER_ALIASES, 'club': CLUB_HEADER_ALIASES,
+}
+
+
+def append_participant_csv_row(path, participant):
+    """Ajoute un participant à une liste de départ existante en respectant son délimiteur et ses colonnes.
+
+    Fichier absent ou vide : écrit comme participants_csv_text. Si l'année (ou le club) est renseignée et que le
+    fichier n'a pas la colonne, elle est ajoutée (fichier réécrit une fois). Appelée sur le thread d'écriture."""
+    path = pathlib.Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        write_file_atomic(path, participants_csv_text([participant]).encode('utf-8-sig'))
+        return
+    with path.open('r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(2048)
+    delimiter = sniff_csv_delimiter(sample)
+    header = next(csv.reader(io.StringIO(sample), delimiter=delimiter), [])
+    normalized = [column.strip().lower() for column in header]
+    columns = {field: next((normalized.index(alias) for alias in aliases if alias in normalized), None)
+               for field, aliases in _PARTICIPANT_COLUMN_ALIASES.items()}
+    missing = [(field, title) for field, title in (('annee', 'Année'), ('club', 'Club'))
+               if columns[field] is None and getattr(participant, field)]
+    if missing:
+        with path.open('r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.reader(f, delimiter=delimiter))
+        for field, title in missing:
+            columns[field] = len(header)
+            header = header + [title]
+        out = io.StringIO(newline='')
+        writer = csv.writer(out, delimiter=delimiter)
+        writer.writerow(header)
+        writer.writerows(row + [''] * (len(header) - len(row)) for row in rows[1:])
+        write_file_atomic(path, out.getvalue().encode('utf-8-sig'))
+    row = [''] * max(len(header), 5)
+    values = {'bib': participant.bib, 'nom': participant.nom, 'prenom': participant.prenom, 'sexe': participant.sexe,
+              'cat': participant.cat, 'annee': participant.annee or '', 'club': participant.club or ''}
+    for position, field in enumerate(('bib', 'nom', 'prenom', 'sexe', 'cat')):
+        if columns[field] is None: columns[field] = position # En-tête non reconnu: ordre par défaut
+    for field, index in columns.items():
+        if index is not None: row[index] = values[field]
+    with path.open('rb') as f:
+        f.seek(-1, os.SEEK_END)
+        ends_with_newline = f.read(1) in (b'\n', b'\r')
+    with path.open('a', newline='', encoding='utf-8-sig') as f:
+        if not ends_with_newline: f.write('\r\n') # Dernière ligne saisie à la main sans fin de ligne
+        csv.writer(f, delimiter=delimiter).writerow(row)
+        f.flush(); os.fsync(f.fileno())
+
+
+OFFSET_HEADER_ALIASES = ['décalage', 'decalage', 'décalage départ', 'decalage depart', 'offset', 'handicap', 'retard', 'départ', 'depart']
+BIB_HEADER_ALIASES = ['n° dossard', 'n. dossard', 'dossard', 'n', 'no dossard', 'no. dossard', 'bib']
+
+
+def parse_duration(text):
+    """'HH:MM:SS', 'MM:SS' ou secondes (décimales acceptées, virgule ou point) -> secondes (float), None si invalide."""
+    text = (text or '').strip().replace(',', '.')
+    if not text: return None
+    parts = text.split(':')
+    if len(parts) > 3: return None
+    try:
+        values = [float(part) for part in parts]
+    except ValueError:
+        return None
+    if any(v < 0 for v in values) or any(v >= 60 for v in values[1:]): return None
+    seconds = 0.0
+    for value in values:
+        seconds = seconds * 60 + value
+    return seconds
+
+
+def parse_start_offsets(lines, delimiter=None):
+    """Lit des lignes 'dossard;décalage' (en-tête facultatif). Retourne ({dossard: secondes}, [(ligne, texte, message)])."""
+    offsets, issues = {}, []
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip(): continue
+        fields = next(csv.reader([line], delimiter=delimiter)) if delimiter else re.split(r'[;,\t ]+', line.strip(), maxsplit=1)
+        if len(fields) < 2:
+            issues.append((line_no, line.strip(), "Dossard et décalage attendus")); continue
+        bib_s, offset_s = fields[0].strip(), fields[1].strip()
+        if line_no == 1 and not bib_s.isdigit() and bib_s.lower() in BIB_HEADER_ALIASES: continue
+        if not bib_s.isdigit():
+            issues.append((line_no, bib_s, "Dossard non numérique")); continue
+        seconds = parse_duration(offset_s)
+        if seconds is None:
+            issues.append((line_no, bib_s, f"Décalage invalide '{offset_s}'")); continue
+        offsets[int(bib_s)] = seconds
+    return offsets, issues
+
+
+def _read_small_csv_lines(file_path):
+    """(lignes, délimiteur) d'un petit CSV saisi à la main ou exporté d'un tableur (UTF-8, Windows ou Latin-1)."""
+    data = pathlib.Path(file_path).read_bytes()
+    for encoding in ('utf-8-sig', 'cp1252'):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode('latin-1') # Décode tout octet: dernier recours
+    lines = text.splitlines()
+    return lines, sniff_csv_delimiter('\n'.join(lines[:20]), delimiters=';,\t')
+
+
+def read_start_offsets_file(file_path):
+    """Lit un CSV de décalages de départ (colonnes Dossard et Décalage, ou les deux premières colonnes)."""
+    lines, delimiter = _read_small_csv_lines(file_path)
+    header = [field.strip().lower() for field in next(csv.reader(lines[:1], delimiter=delimiter), [])]
+    bib_col = next((header.index(k) for k in BIB_HEADER_ALIASES if k in header), None)
+    offset_col = next((header.index(k) for k in OFFSET_HEADER_ALIASES if k in header), None)
+    if bib_col is not None and offset_col is not None:
+        # Colonnes nommées: on ne garde que dossard et décalage, dans cet ordre
+        rows = csv.reader(lines[1:], delimiter=delimiter)
+        lines = [f"{row[bib_col]};{row[offset_col]}" if len(row) > max(bib_col, offset_col) else ';'.join(row) for row in rows]
+        offsets, issues = parse_start_offsets(lines, delimiter=';')
+        return offsets, [(line_no + 1, text, message) for line_no, text, message in issues]
+    return parse_start_offsets(lines, delimiter=delimiter)
+
+
+CHIP_TAG_HEADER_ALIASES = ['puce', 'tag', 'chip', 'transpondeur', 'code puce']
+CHIP_LOG_CHUNK_BYTES = 8 * 1024 * 1024 # Taille des blocs lus dans le journal projeté en mémoire
+CHIP_MIN_ELAPSED_SECONDS = 30.0 # Lectures trop proches du départ (tapis ou zone de départ) ignorées
+CHIP_CONFLICT_TOLERANCE_SECONDS = 1.0 # Écart toléré entre un résultat déjà saisi et la lecture de la puce
+
+
+def read_chip_tag_map(file_path):
+    """Lit une correspondance puce -> dossard (colonnes Puce et Dossard, ou les deux premières colonnes)."""
+    lines, delimiter = _read_small_csv_lines(file_path)
+    rows = list(csv.reader(lines, delimiter=delimiter))
+    header = [field.strip().lower() for field in (rows[0] if rows else [])]
+    tag_col = next((header.index(k) for k in CHIP_TAG_HEADER_ALIASES if k in header), None)
+    bib_col = next((header.index(k) for k in BIB_HEADER_ALIASES if k in header), None)
+    if tag_col is None or bib_col is None:
+        tag_col, bib_col = 0, 1
+    tag_to_bib, issues = {}, []
+    for line_no, row in enumerate(rows, start=1):
+        if len(row) <= max(tag_col, bib_col) or not any(field.strip() for field in row): continue
+        tag, bib_s = row[tag_col].strip(), row[bib_col].strip()
+        if line_no == 1 and not bib_s.isdigit(): continue # En-tête
+        if not tag or not bib_s.isdigit():
+            issues.append((line_no, tag, "Puce et dossard numérique attendus")); continue
+        if tag in tag_to_bib and tag_to_bib[tag] != int(bib_s):
+            issues.append((line_no, tag, f"Puce déjà associée au dossard {tag_to_bib[tag]}, ligne ignorée")); continue
+        tag_to_bib[tag] = int(bib_s)
+    return tag_to_bib, issues
+
+
+@lru_cache(maxsize=64)
+def _chip_day_offset(date_text, start_ordinal):
+    year, month, day = date_text.split(b'-')
+    return (datetime.date(int(year), int(month), int(day)).toordinal() - start_ordinal) * 86400
+
+
+class ChipLogImport:
+    """Lecture en flux d'un journal brut de lecteur de puces (lignes `lecteur,antenne,puce,horodatage`).
+
+    Le fichier est projeté en mémoire (mmap) et traité par blocs terminés par un saut de ligne. Pour chaque puce,
+    seule la première lecture valide (au moins min_elapsed après le départ du dossard) est gardée ; une lecture
+    ultérieure d'une puce déjà résolue est écartée par simple comparaison de l'horodatage brut, sans conversion.
+    Horodatages acceptés : 'AAAA-MM-JJ HH:MM:SS[.fff]' (ou avec 'T'), 'HH:MM:SS[.fff]' (jour du départ),
+    secondes ou millisecondes epoch."""
+
+    def __init__(self, start_time, tag_to_bib=None, offsets=None, min_elapsed=CHIP_MIN_ELAPSED_SECONDS):
+        self.start_time = start_time
+        self.tag_to_bib = tag_to_bib # None : la puce porte le numéro de dossard
+        self.offsets = offsets or {}
+        self.min_elapsed = min_elapsed
+        self.lines = 0
+        self.malformed = 0 # Lignes illisibles (dont un éventuel en-tête)
+        self.too_early = 0 # Lectures avant départ ou trop proches du départ
+        self.unknown_tags = Counter() # Puce sans dossard -> nombre de lectures
+        self.first_read = {} # Dossard -> (secondes depuis le départ, puce, lecteur)
+        self.multi_tag_bibs = {} # Dossard lu par plusieurs puces -> puces
+        self.cancelled = False
+        self._start_epoch = start_time.timestamp()
+        self._start_ordinal = start_time.toordinal()
+        self._start_sod = start_time.hour * 3600 + start_time.minute * 60 + start_time.second + start_time.microsecond / 1e6
+
+    def _elapsed(self, raw):
+        raw = raw.strip().rstrip(b'Z')
+        if b':' not in raw:
+            value = float(raw)
+            if value > 1e11: value /= 1000.0 # Millisecondes epoch
+            return value - self._start_epoch
+        day = 0
+        if len(raw) > 10 and raw[4:5] == b'-':
+            day = _chip_day_offset(raw[:10], self._start_ordinal)
+            raw = raw[11:]
+        hours, minutes, seconds = raw.split(b':')
+        return day + int(hours) * 3600 + int(minutes) * 60 + float(seconds) - self._start_sod
+
+    def _bib_for_tag(self, tag):
+        if self.tag_to_bib is not None:
+            return self.tag_to_bib.get(tag.decode('utf-8', 'replace').strip())
+        tag = tag.strip()
+        return int(tag) if tag.isdigit() else None
+
+    def read(self, file_path, progress_callback=None, cancel_event=None):
+        best_raw, best = {}, {} # Puce -> horodatage brut / (secondes, lecteur) de sa meilleure lecture valide
+        bib_of_tag = {}
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0: return self
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                while pos < size:
+                    if cancel_event is not None and cancel_event.is_set():
+                        self.cancelled = True
+                        return self
+                    end = mm.rfind(b'\n', pos, pos + CHIP_LOG_CHUNK_BYTES) + 1 if pos + CHIP_LOG_CHUNK_BYTES < size else size
+                    if end <= pos: # Ligne plus longue qu'un bloc
+                        end = mm.find(b'\n', pos + CHIP_LOG_CHUNK_BYTES) + 1 or size
+                    chunk = mm[pos:end]
+                    pos = end
+                    self.lines += chunk.count(b'\n') + (0 if chunk.endswith(b'\n') else 1)
+                    for line in chunk.split(b'\n'):
+                        fields = line.split(b',')
+                        if len(fields) < 4:
+                            if line.strip(): self.malformed += 1
+                            continue
+                        tag, raw = fields[2], fields[3]
+                        previous = best_raw.get(tag)
+                        # Même format et pas plus tôt : la lecture ne peut pas améliorer celle déjà retenue
+                        if previous is not None and len(raw) == len(previous) and raw >= previous: continue
+                        bib = bib_of_tag[tag] if tag in bib_of_tag else bib_of_tag.setdefault(tag, self._bib_for_tag(tag))
+                        if bib is None:
+                            if tag.strip().decode('utf-8', 'replace').lower() in CHIP_TAG_HEADER_ALIASES: self.malformed += 1
+                            else: self.unknown_tags[tag] += 1
+                            continue
+                        try:
+                            elapsed = self._elapsed(raw)
+                        except ValueError:
+                            self.malformed += 1; continue
+                        if elapsed < self.min_elapsed + self.offsets.get(bib, 0.0):
+                            self.too_early += 1; continue
+                        if previous is None or elapsed < best[tag][0]:
+                            best_raw[tag], best[tag] = raw, (elapsed, fields[0])
+                    if progress_callback: progress_callback(pos / size)
+        for tag, (elapsed, reader) in best.items():
+            bib = bib_of_tag[tag]
+            tag_text = tag.decode('utf-8', 'replace').strip()
+            current = self.first_read.get(bib)
+            if current is not None:
+                self.multi_tag_bibs.setdefault(bib, {current[1]}).add(tag_text)
+            if current is None or elapsed < current[0]:
+                self.first_read[bib] = (elapsed, tag_text, reader.decode('utf-8', 'replace').strip())
+        return self
+
+    def summary_lines(self):
+        lines = [f"{self.lines} lignes lues, {len(self.first_read)} dossards avec une lecture valide."]
+        if self.too_early: lines.append(f"{self.too_early} lectures avant le départ ou à moins de {self.min_elapsed:.0f} s ignorées.")
+        if self.unknown_tags:
+            sample = ', '.join(tag.decode('utf-8', 'replace') for tag, _ in self.unknown_tags.most_common(5))
+            lines.append(f"{len(self.unknown_tags)} puce(s) sans dossard ({sum(self.unknown_tags.values())} lectures), ex: {sample}.")
+        if self.malformed: lines.append(f"{self.malformed} lignes illisibles ignorées (en-tête compris).")
+        if self.multi_tag_bibs:
+            lines.append(f"{len(self.multi_tag_bibs)} dossards lus par plusieurs puces (première lecture retenue).")
+        return lines
+
+class _WriteJob:
+    __slots__ = ('kind', 'path', 'data', 'func', 'callbacks', 'queued_at', 'coalesce')
+
+    def __init__(self, kind, path, data=None, func=None, callback=None, coalesce=False):
+        self.kind = kind
+        self.path = pathlib.Path(path) if path is not None else None
+        self.data = data
+        self.func = func
+        self.callbacks = [callback] if callback else []
+        self.queued_at = time.monotonic()
+        self.coalesce = coalesce
+
+
+class DiskWriter:
+    """Thread unique et ordonné pour toutes les écritures disque (write-behind).
+
+    Le thread Tk ne fait que mettre en file ; les écritures complètes passent par un fichier temporaire,
+    fsync puis os.replace (atomique). Les accusés d'écriture (None ou l'exception) sont remis sur le thread Tk
+    par poll_acks(). Une réécriture complète encore en attente pour le même fichier est remplacée par la plus
+    récente (coalesce) : seul le dernier état est écrit. Seules les opérations idempotentes (remplacement,
+    suppression) sont retentées : un ajout ou une opération personnalisée en échec peut avoir été
+    partiellement appliqué, il est signalé sans nouvel essai pour ne pas dupliquer de données."""
+
+    RETRIES = 3
+    RETRYABLE_KINDS = ('replace', 'delete')
+    RETRY_DELAY = 0.2
+
+    def __init__(self):
+        self._jobs = deque()
+        self._pending_by_path = {}
+        self._cond = threading.Condition()
+        self._acks = queue.Queue()
+        self._busy = False
+        self._busy_since = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="disk-writer", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _to_bytes(data, encoding):
+        return data.encode(encoding) if isinstance(data, str) else data
+
+    def replace(self, path, data, encoding='utf-8', callback=None, coalesce=False):
+        """Remplace atomiquement le contenu complet d'un fichier."""
+        self._submit(_WriteJob('replace', path, self._to_bytes(data, encoding), callback=callback, coalesce=coalesce))
+
+    def append(self, path, data, encoding='utf-8', callback=None):
+        self._submit(_WriteJob('append', path, self._to_bytes(data, encoding), callback=callback))
+
+    def delete(self, path, callback=None):
+        self._submit(_WriteJob('delete', path, callback=callback))
+
+    def call(self, func, callback=None):
+        """Exécute une opération d'écriture personnalisée, dans l'ordre de la file."""
+        self._submit(_WriteJob('call', None, func=func, callback=callback))
+
+    def _submit(self, job):
+        with self._cond:
+            if job.coalesce:
+                pending = self._pending_by_path.get(job.path)
+                if pending is not None:
+                    pending.data = job.data
+                    pending.callbacks.extend(job.callbacks)
+                    return
+                self._pending_by_path[job.path] = job
+            elif job.path is not None:
+                # Ajout ou suppression du même fichier : les réécritures suivantes passent après, pas avant
+                self._pending_by_path.pop(job.path, None)
+            self._jobs.append(job)
+            self._cond.notify()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._jobs) + (1 if self._busy else 0)
+
+    def oldest_pending_age(self):
+        """Âge (s) de l'écriture la plus ancienne non terminée, 0 si la file est vide."""
+        with self._cond:
+            oldest = self._busy_since if self._busy else (self._jobs[0].queued_at if self._jobs else None)
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def poll_acks(self):
+        """À appeler depuis le thread Tk : exécute les callbacks des écritures terminées."""
+        while True:
+            try: callbacks, error = self._acks.get_nowait()
+            except queue.Empty: return
+            for callback in callbacks:
+                try: callback(error)
+                except Exception: logging.exception("Erreur dans un accusé d'écriture")
+
+    def flush(self, timeout=None):
+        """Attend que la file soit vide (fermeture de l'application uniquement)."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._jobs or self._busy:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0: return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stopped:
+                    self._cond.wait()
+                if not self._jobs and self._stopped: return
+                job = self._jobs.popleft()
+                if job.coalesce and self._pending_by_path.get(job.path) is job:
+                    del self._pending_by_path[job.path]
+                self._busy, self._busy_since = True, job.queued_at
+            error = None
+            attempts = self.RETRIES if job.kind in self.RETRYABLE_KINDS else 1
+            for attempt in range(attempts):
+                try:
+                    self._execute(job); error = None; break
+                except Exception as e: # Fichier verrouillé (synchro cloud, antivirus...) : nouvel essai
+                    error = e
+                    if attempt + 1 < attempts: time.sleep(self.RETRY_DELAY * (attempt + 1))
+            if error is not None:
+                logging.error(f"Échec d'écriture {job.path or job.func}: {error}")
+            if job.callbacks: self._acks.put((job.callbacks, error))
+            with self._cond:
+                self._busy, self._busy_since = False, None
+                self._cond.notify_all()
+
+    def _execute(self, job):
+        if job.kind == 'replace':
+            write_file_atomic(job.path, job.data)
+        elif job.kind == 'append':
+            job.path.parent.mkdir(parents=True, exist_ok=True)
+            with job.path.open('ab') as f:
+                f.write(job.data); f.flush(); os.fsync(f.fileno())
+        elif job.kind == 'delete':
+            job.path.unlink(missing_ok=True)
+        else:
+            job.func()
+
+
+def write_file_atomic(path, data):
+    """Écrit data (bytes) dans un fichier temporaire voisin, fsync, puis le renomme sur path."""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open('wb') as f:
+        f.write(data); f.flush(); os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class BackupMirror:
+    """Copie de secours continue de fichiers et dossiers vers un second emplacement (clé USB, partage monté).
+
+    Un thread dédié fait une passe toutes les `interval` secondes : un fichier dont taille et date n'ont pas changé
+    est ignoré. Un petit fichier, ou un fichier remplacé atomiquement depuis la dernière passe (nouvel inode, comme
+    race_recovery_state.json), est recopié dans un fichier temporaire de la cible puis renommé : la copie n'est
+    jamais à moitié écrite. Un gros fichier modifié sur place est relu par blocs de MIRROR_CHUNK_BYTES et seuls les
+    blocs dont l'empreinte diffère de la copie sont réécrits ; s'il n'a fait que grandir (flux NDJSON, journal), la
+    relecture commence au dernier bloc connu. Les suppressions ne sont pas répercutées : la copie garde tout.
+    Le thread Tk ne fait que lire last_sync / last_error."""
+
+    def __init__(self, sources, target, interval=MIRROR_INTERVAL_SECONDS):
+        self.sources = [pathlib.Path(p) for p in sources]
+        self.target = pathlib.Path(target)
+        self.interval = interval
+        self.last_sync = None # time.monotonic() de la dernière passe complète réussie
+        self.last_error = None
+        self.bytes_written = 0
+        self._synced = {} # Source -> ((taille, mtime_ns) copiés, (st_dev, st_ino), empreintes des blocs de la copie)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="backup-mirror", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Arrête le thread après une dernière passe (au plus `timeout` secondes d'attente)."""
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def lag(self):
+        return None if self.last_sync is None else time.monotonic() - self.last_sync
+
+    def _run(self):
+        while True:
+            stopping = self._stop_event.wait(self.interval)
+            try:
+                self.sync_once()
+                if self.last_error is not None: logging.info(f"Miroir {self.target}: copie rétablie.")
+                self.last_error = None
+                self.last_sync = time.monotonic()
+            except OSError as e:
+                if str(e) != str(self.last_error): logging.warning(f"Miroir {self.target} indisponible: {e}")
+                self.last_error = e
+            if stopping: return
+
+    def _files(self):
+        for source in self.sources:
+            if source.is_dir():
+                for path in sorted(source.rglob('*')):
+                    # Fichiers temporaires de write_file_atomic (.nom.tmp) : seul le résultat final est copié
+                    if path.is_file() and not (path.name.startswith('.') and path.name.endswith('.tmp')):
+                        yield path, self.target / source.name / path.relative_to(source)
+            elif source.is_file():
+                yield source, self.target / source.name
+
+    def sync_once(self):
+        if not self.target.is_dir():
+            raise OSError(f"dossier introuvable: {self.target}")
+        for source, dest in self._files():
+            try:
+                self._sync_file(source, dest)
+            except FileNotFoundError:
+                self._synced.pop(source, None) # Supprimé ou remplacé pendant la passe: repris à la suivante
+
+    @staticmethod
+    def _digest(chunk):
+        return hashlib.blake2b(chunk, digest_size=16).digest()
+
+    @classmethod
+    def _chunk_hashes(cls, path):
+        hashes = []
+        try:
+            with path.open('rb') as f:
+                for chunk in iter(lambda: f.read(MIRROR_CHUNK_BYTES), b''):
+                    hashes.append(cls._digest(chunk))
+        except FileNotFoundError:
+            pass
+        return hashes
+
+    def _sync_file(self, source, dest):
+        stat = source.stat()
+        stat_key, identity = (stat.st_size, stat.st_mtime_ns), (stat.st_dev, stat.st_ino)
+        known = self._synced.get(source)
+        dest_exists = dest.exists()
+        if known is not None and known[0] == stat_key and dest_exists: return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        replaced = known is not None and known[1] != identity
+        if stat.st_size <= MIRROR_SMALL_FILE_BYTES or replaced:
+            new_hashes = self._replace_copy(source, dest, known[2] if known is not None and dest_exists else None)
+        else:
+            # Empreintes de la copie: mémorisées, ou relues une fois (premier démarrage, clé rebranchée)
+            old_hashes = known[2] if known is not None and dest_exists else self._chunk_hashes(dest)
+            first = self._appended_from(source, known[0][0], stat.st_size, old_hashes) if known is not None and dest_exists else 0
+            new_hashes = self._patch_copy(source, dest, old_hashes, first)
+        self._synced[source] = (stat_key, identity, new_hashes)
+
+    def _appended_from(self, source, known_size, size, old_hashes):
+        """Premier bloc à relire si le fichier n'a fait que grandir depuis la dernière passe, sinon 0.
+
+        Le bloc complet qui précède la limite connue est relu pour le vérifier : un fichier réécrit sur place
+        (et non complété) y diffère presque toujours, et repart alors d'une comparaison complète."""
+        first = known_size // MIRROR_CHUNK_BYTES
+        if size < known_size or first == 0 or first > len(old_hashes): return 0
+        with source.open('rb') as f:
+            f.seek((first - 1) * MIRROR_CHUNK_BYTES)
+            if self._digest(f.read(MIRROR_CHUNK_BYTES)) != old_hashes[first - 1]: return 0
+        return first
+
+    def _replace_copy(self, source, dest, old_hashes):
+        """Recopie complète via un fichier temporaire de la cible puis os.replace ; rien n'est écrit si le contenu
+        est identique à la copie connue."""
+        with source.open('rb') as fin:
+            chunks = list(iter(lambda: fin.read(MIRROR_CHUNK_BYTES), b'')) if os.fstat(fin.fileno()).st_size <= MIRROR_SMALL_FILE_BYTES else None
+            if chunks is not None:
+                new_hashes = [self._digest(chunk) for chunk in chunks]
+                if new_hashes == old_hashes: return new_hashes
+                write_file_atomic(dest, b''.join(chunks))
+                self.bytes_written += sum(map(len, chunks))
+                return new_hashes
+            # Gros fichier remplacé : copie en flux, sans tout garder en mémoire
+            new_hashes = []
+            tmp_path = dest.with_name(f".{dest.name}.tmp")
+            with tmp_path.open('wb') as fout:
+                for chunk in iter(lambda: fin.read(MIRROR_CHUNK_BYTES), b''):
+                    new_hashes.append(self._digest(chunk))
+                    fout.write(chunk)
+                    self.bytes_written += len(chunk)
+                fout.flush(); os.fsync(fout.fileno())
+            os.replace(tmp_path, dest)
+        return new_hashes
+
+    def _patch_copy(self, source, dest, old_hashes, first):
+        """Réécrit sur place les blocs modifiés à partir du bloc `first` (les précédents sont inchangés)."""
+        new_hashes, changed = old_hashes[:first], False
+        with source.open('rb') as fin, dest.open('r+b' if dest.exists() else 'w+b') as fout:
+            fin.seek(first * MIRROR_CHUNK_BYTES)
+            for index, chunk in enumerate(iter(lambda: fin.read(MIRROR_CHUNK_BYTES), b''), start=first):
+                digest = self._digest(chunk)
+                if index >= len(old_hashes) or old_hashes[index] != digest:
+                    fout.seek(index * MIRROR_CHUNK_BYTES)
+                    fout.write(chunk)
+                    self.bytes_written += len(chunk)
+                    changed = True
+                new_hashes.append(digest)
+            size = fin.tell()
+            if fout.seek(0, os.SEEK_END) != size:
+                fout.truncate(size); changed = True
+            if changed:
+                fout.flush(); os.fsync(fout.fileno())
+        return new_hashes
+
+
+class LiveResultsFeed:
+    """Flux de résultats en direct, en ajout seul: une ligne NDJSON (et optionnellement CSV) par événement.
+
+    Les corrections ne réécrivent jamais le fichier: elles sont ajoutées comme enregistrements 'correction'
+    (ou 'reinitialisation') qui référencent la ligne d'origine par son numéro 'seq'."""
+
+    CSV_HEADER = ['seq', 'type', 'horodatage', 'course', 'dossard', 'nom', 'prenom', 'categorie', 'sexe', 'temps', 'temps_s',
+                  'temps_brut', 'decalage_s', 'allure', 'vitesse_kmh', 'pct_age', 'ref_seq', 'motif']
+
+    def __init__(self, disk_writer, race_id, base_path, ndjson=True, csv_enabled=False, seq=0, seq_by_bib=None):
+        self.disk_writer = disk_writer
+        self.race_id = race_id
+        self.base_path = pathlib.Path(base_path) # Chemin sans extension, commun aux deux formats
+        self.ndjson = ndjson
+        self.csv_enabled = csv_enabled
+        self.seq = seq
+        self.seq_by_bib = dict(seq_by_bib or {}) # Dernier enregistrement de chaque dossard, cible des corrections
+
+    @classmethod
+    def for_race(cls, disk_writer, results_dir, category, run_number, ndjson=True, csv_enabled=False):
+        cat_name_for_file = category.replace(' ', '_').replace('/', '-')
+        stem = f"direct_{cat_name_for_file}_course_{run_number}_{datetime.datetime.now():%Y%m%d_%H%M%S}"
+        return cls(disk_writer, f"{category} #{run_number}", pathlib.Path(results_dir) / stem, ndjson, csv_enabled)
+
+    @property
+    def ndjson_path(self):
+        return self.base_path.with_name(self.base_path.name + '.ndjson') if self.ndjson else None
+
+    @property
+    def csv_path(self):
+        return self.base_path.with_name(self.base_path.name + '.csv') if self.csv_enabled else None
+
+    def result(self, result, participant, category, source, offset=0.0, extra=None):
+        """Enregistre un classé ou un abandon. source: 'arrivee', 'manuel', 'rapprochement' ou 'puce'.
+        Avec un décalage de départ, 'temps' est le temps net et 'temps_brut' le temps depuis le départ de la course.
+        extra: champs supplémentaires (allure, vitesse, % âge)."""
+        self.results([(result, participant, offset)], category, source, [extra] if extra else None)
+
+    def results(self, items, category, source, extras=None):
+        """Comme result() pour une série [(result, participant, offset)], écrite en un seul ajout par format."""
+        records = []
+        for index, (result, participant, offset) in enumerate(items):
+            record = self._record('abandon' if result.abandon else source, result.bib, participant, category)
+            record.update(self.times_fields(result.time, offset))
+            if extras and extras[index]: record.update(extras[index])
+            record['seq'] += len(records)
+            records.append(record)
+        self._append(*records)
+
+    @staticmethod
+    def times_fields(gun_time, offset=0.0):
+        if gun_time is None: return {'temps': None, 'temps_s': None}
+        gun_seconds = gun_time.total_seconds()
+        net_seconds = max(0.0, gun_seconds - offset)
+        fields = {'temps': format_elapsed(net_seconds), 'temps_s': round(net_seconds, 1)}
+        if offset:
+            fields.update({'temps_brut': format_elapsed(gun_seconds), 'decalage_s': round(offset, 1)})
+        return fields
+
+    def amend(self, bib, participant, category, reason, **changes):
+        """Ajoute une correction pour le dernier enregistrement du dossard (la ligne d'origine reste intacte)."""
+        record = self._record('correction', bib, participant, category)
+        record['ref_seq'] = self.seq_by_bib.get(bib)
+        record['motif'] = reason
+        record.update(changes)
+        self._append(record)
+
+    def reset(self, reason):
+        record = {'seq': self.seq + 1, 'type': 'reinitialisation', 'horodatage': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'course': self.race_id, 'motif': reason}
+        self.seq_by_bib.clear()
+        self._append(record)
+
+    def _record(self, kind, bib, participant, category):
+        return {'seq': self.seq + 1, 'type': kind, 'horodatage': datetime.datetime.now().isoformat(timespec='seconds'),
+                'course': self.race_id, 'dossard': bib,
+                'nom': participant.nom if participant else None, 'prenom': participant.prenom if participant else None,
+                'categorie': category, 'sexe': participant.sexe if participant else None}
+
+    def _append(self, *records):
+        if not records: return
+        for record in records:
+            self.seq = record['seq']
+            if record.get('dossard') is not None: self.seq_by_bib[record['dossard']] = record['seq']
+        if self.ndjson_path is not None:
+            text = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            self.disk_writer.append(self.ndjson_path, text, callback=self._on_written)
+        if self.csv_path is not None:
+            rows = [['' if record.get(key) is None else record.get(key) for key in self.CSV_HEADER] for record in records]
+            csv_path = self.csv_path
+
+            def append_csv_row():
+                csv_path.parent.mkdir(parents=True, exist_ok=True)
+                with csv_path.open('a', newline='', encoding='utf-8-sig') as f:
+                    writer = csv.writer(f, delimiter=';')
+                    if f.tell() == 0: writer.writerow(self.CSV_HEADER)
+                    writer.writerows(rows)
+                    f.flush(); os.fsync(f.fileno())
+            self.disk_writer.call(append_csv_row, callback=self._on_written)
+
+    def _on_written(self, error):
+        if error is not None: logging.error(f"Flux direct: écriture impossible: {error}")
+
+    def state(self):
+        return {'race_id': self.race_id, 'base_path': str(self.base_path), 'ndjson': self.ndjson, 'csv': self.csv_enabled,
+                'seq': self.seq, 'seq_by_bib': {str(bib): seq for bib, seq in self.seq_by_bib.items()}}
+
+    @classmethod
+    def from_state(cls, disk_writer, state):
+        return cls(disk_writer, state['race_id'], state['base_path'], state.get('ndjson', True), state.get('csv', False),
+                   state.get('seq', 0), {int(bib): seq for bib, seq in state.get('seq_by_bib', {}).items()})
+
+class ActionJournal:
+    """Journal NDJSON en ajout seul des actions de l'opérateur pendant une course (une ligne par action).
+
+    Opérations : 'start' (catégorie, heure, décalages), 'arrival' (t), 'drop' (temps retiré du buffer, par valeur),
+    'assign' (dossard apparié à la tête du buffer : t est le temps consommé), 'result' (dossard à temps fixe ou
+    abandon : manuel, puce), 'offsets', 'reset', 'finish'. Les temps sont en secondes depuis le départ.
+    Rejoué par replay_journal, le journal redonne le classement ; corrigé, il en donne un nouveau."""
+
+    def __init__(self, disk_writer, path, seq=0):
+        self.disk_writer = disk_writer
+        self.path = pathlib.Path(path)
+        self.seq = seq
+
+    @classmethod
+    def for_race(cls, disk_writer, results_dir, category, run_number):
+        cat_name_for_file = category.replace(' ', '_').replace('/', '-')
+        stem = f"journal_{cat_name_for_file}_course_{run_number}_{datetime.datetime.now():%Y%m%d_%H%M%S}"
+        return cls(disk_writer, pathlib.Path(results_dir) / f"{stem}.ndjson")
+
+    def record(self, *entries):
+        """Ajoute les actions données ({'op': ..., champs}) en un seul ajout disque."""
+        if not entries: return
+        lines = []
+        for entry in entries:
+            self.seq += 1
+            lines.append(json.dumps({'seq': self.seq, **entry}, ensure_ascii=False) + '\n')
+        self.disk_writer.append(self.path, ''.join(lines), callback=self._on_written)
+
+    def _on_written(self, error):
+        if error is not None: logging.error(f"Journal des actions: écriture impossible: {error}")
+
+    def state(self):
+        return {'path': str(self.path), 'seq': self.seq}
+
+    @classmethod
+    def from_state(cls, disk_writer, state):
+        return cls(disk_writer, state['path'], state.get('seq', 0))
+
+
+def read_journal(file_path):
+    """Actions d'un journal NDJSON, dans l'ordre. Une ligne illisible (fin tronquée par un arrêt brutal) est ignorée
+    et comptée. Retourne (actions, lignes_ignorées)."""
+    events, skipped = [], 0
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip(): continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                skipped += 1; continue
+            if isinstance(event, dict) and 'op' in event: events.append(event)
+            else: skipped += 1
+    return events, skipped
+
+
+_BIB_FIX_RE = re.compile(r'^(?:bib|dossard)\s+(\d+)\s*(?:->|→|=>|\s)\s*(\d+)$', re.IGNORECASE)
+_INSERT_FIX_RE = re.compile(r'^(?:insert|inserer|insérer)(?:[- ](?:arrival|arriv[ée]e))?\s+(?:at\s+|en\s+)?(\d+)(?:\s+(\S+))?$', re.IGNORECASE)
+_DELETE_FIX_RE = re.compile(r'^(?:delete|supprimer)(?:[- ](?:arrival|arriv[ée]e))?\s+(?:at\s+|en\s+)?(\d+)$', re.IGNORECASE)
+
+
+def parse_journal_correction(text):
+    """'bib 312 -> 321', 'insert 57 [HH:MM:SS.d]' ou 'delete 12' -> tuple ('bib', 312, 321), ('insert', 57, secondes|None)
+    ou ('delete', 12). Les positions sont les numéros d'arrivée (1 = premier clic « Nouvelle arrivée »).
+    Lève ValueError si la ligne n'est pas reconnue."""
+    text = ' '.join((text or '').split())
+    match = _BIB_FIX_RE.match(text)
+    if match: return ('bib', int(match.group(1)), int(match.group(2)))
+    match = _INSERT_FIX_RE.match(text)
+    if match:
+        seconds = parse_duration(match.group(2)) if match.group(2) else None
+        if match.group(2) and seconds is None: raise ValueError(f"Temps invalide: {match.group(2)}")
+        return ('insert', int(match.group(1)), seconds)
+    match = _DELETE_FIX_RE.match(text)
+    if match: return ('delete', int(match.group(1)))
+    raise ValueError(f"Correction non reconnue: {text!r}")
+
+
+def apply_journal_corrections(events, corrections):
+    """Nouvelle liste d'actions avec les corrections appliquées (les actions d'origine ne sont pas modifiées).
+
+    Les insertions et suppressions d'arrivée visent les numéros d'arrivée du journal d'origine, quel que soit
+    l'ordre des corrections. Retourne (actions, avertissements)."""
+    warnings = []
+    bib_map = {}
+    inserts = defaultdict(list) # Numéro d'arrivée -> temps à insérer juste avant (None: à interpoler)
+    deleted = set()
+    for fix in corrections:
+        if fix[0] == 'bib': bib_map[fix[1]] = fix[2]
+        elif fix[0] == 'insert': inserts[fix[1]].append(fix[2])
+        elif fix[0] == 'delete': deleted.add(fix[1])
+    arrival_times = [event['t'] for event in events if event['op'] == 'arrival']
+    for number in sorted(set(inserts) | deleted):
+        if number < 1 or (number > len(arrival_times) + (1 if number in inserts else 0)):
+            warnings.append(f"Arrivée n°{number} hors du journal ({len(arrival_times)} arrivées): correction ignorée.")
+    corrected, number = [], 0
+    for event in events:
+        op = event['op']
+        if op == 'arrival':
+            number += 1
+            for seconds in inserts.pop(number, ()):
+                corrected.append({'op': 'arrival', 't': _interpolated_arrival(arrival_times, number, seconds), 'correction': True})
+            if number in deleted: continue
+        elif 'bib' in event and event['bib'] in bib_map:
+            event = dict(event, bib=bib_map[event['bib']], correction=True)
+        corrected.append(event)
+    for seconds in inserts.pop(len(arrival_times) + 1, ()): # Arrivée manquée après le dernier clic
+        corrected.append({'op': 'arrival', 't': _interpolated_arrival(arrival_times, len(arrival_times) + 1, seconds), 'correction': True})
+    return corrected, warnings
+
+
+def _interpolated_arrival(arrival_times, number, seconds):
+    # Sans temps donné : milieu entre l'arrivée précédente et celle qui devient la suivante
+    if seconds is not None: return seconds
+    before = arrival_times[number - 2] if number >= 2 else None
+    after = arrival_times[number - 1] if number <= len(arrival_times) else None
+    if before is None: return after if after is not None else 0.0
+    if after is None: return before
+    return (before + after) / 2
+
+
+class JournalReplay:
+    """État d'une course reconstruit en une passe sur le journal : classement, buffer restant, décalages."""
+
+    def __init__(self):
+        self.category = None
+        self.start_time = None
+        self.rankings = []
+        self.buffer = deque()
+        self.offsets = {}
+        self.warnings = []
+        self.time_changes = 0 # Appariements dont le temps diffère de celui enregistré (buffer décalé par une correction)
+
+    def net_seconds(self, result):
+        return max(0.0, result.time.total_seconds() - self.offsets.get(result.bib, 0.0))
+
+    def scratch(self):
+        """[(pos, dossard, temps net en secondes)] dans l'ordre de l'export (temps net, puis ordre d'arrivée)."""
+        timed = [(self.net_seconds(r), index, r.bib) for index, r in enumerate(self.rankings) if not r.abandon and r.time is not None]
+        timed.sort()
+        return [(pos, bib, seconds) for pos, (seconds, _, bib) in enumerate(timed, 1)]
+
+    def abandons(self):
+        return {r.bib for r in self.rankings if r.abandon}
+
+
+def replay_journal(events):
+    """Rejoue les actions (voir ActionJournal) sans interface. Un dossard déjà classé n'est pas classé une seconde
+    fois (son temps de buffer est tout de même consommé) ; une arrivée à retirer absente est signalée."""
+    replay = JournalReplay()
+    ranked = set()
+    buffer, rankings, warnings = replay.buffer, replay.rankings, replay.warnings
+    for event in events:
+        op = event['op']
+        if op == 'arrival':
+            buffer.append(event['t'])
+        elif op == 'assign':
+            if not buffer:
+                warnings.append(f"Action {event.get('seq', '?')}: dossard {event['bib']} sans temps dans le buffer (ignoré).")
+                continue
+            seconds = buffer.popleft()
+            if event.get('t') is not None and seconds != event['t']: replay.time_changes += 1
+            if event['bib'] in ranked:
+                warnings.append(f"Action {event.get('seq', '?')}: dossard {event['bib']} déjà classé, temps {format_elapsed(seconds, tenths=True)} ignoré.")
+                continue
+            ranked.add(event['bib'])
+            rankings.append(Result(event['bib'], datetime.timedelta(seconds=seconds)))
+        elif op == 'result':
+            if event['bib'] in ranked:
+                warnings.append(f"Action {event.get('seq', '?')}: dossard {event['bib']} déjà classé (ignoré).")
+                continue
+            ranked.add(event['bib'])
+            seconds = event.get('t')
+            rankings.append(Result(event['bib'], datetime.timedelta(seconds=seconds) if seconds is not None else None, bool(event.get('abandon'))))
+        elif op == 'drop':
+            try:
+                buffer.remove(event['t'])
+            except ValueError:
+                warnings.append(f"Action {event.get('seq', '?')}: temps {format_elapsed(event['t'], tenths=True)} à retirer absent du buffer.")
+        elif op == 'offsets':
+            if event.get('replace_all'): replay.offsets.clear()
+            for bib, seconds in event.get('changes', {}).items():
+                if seconds: replay.offsets[int(bib)] = seconds
+                else: replay.offsets.pop(int(bib), None)
+        elif op == 'start':
+            replay.category = event.get('category')
+            replay.start_time = event.get('start_time')
+            replay.offsets = {int(bib): seconds for bib, seconds in event.get('offsets', {}).items()}
+        elif op == 'reset':
+            buffer.clear(); rankings.clear(); ranked.clear()
+    return replay
+
+
+def read_exported_scratch(file_path):
+    """Classement scratch et abandons d'un CSV exporté par l'application : ([(pos, dossard, secondes)], {abandons})."""
+    scratch, abandons = [], set()
+    section, time_col = None, None
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f, delimiter=';'):
+            first = row[0].strip() if row else ''
+            if not any(cell.strip() for cell in row):
+                section = None; continue
+            if first == 'Classement Scratch Général (valides)':
+                section = 'scratch'; continue
+            if first.startswith('Abandons'):
+                section = 'abandons'; continue
+            if first.startswith('Classement'):
+                section = None; continue
+            if section == 'scratch':
+                if first == 'Pos.':
+                    time_col = row.index('Temps') if 'Temps' in row else 5; continue
+                if first.isdigit() and len(row) > max(1, time_col or 5) and row[1].strip().isdigit():
+                    seconds = parse_duration(row[time_col or 5])
+                    scratch.append((int(first), int(row[1]), seconds))
+            elif section == 'abandons' and first.isdigit():
+                abandons.add(int(first))
+    return scratch, abandons
+
+
+def scratch_diff(old_scratch, old_abandons, new_scratch, new_abandons):
+    """Lignes (dossard, statut, anc. pos, nouv. pos, anc. temps, nouv. temps) des dossards dont le classement change.
+    Les temps sont comparés à la seconde, comme dans l'export."""
+    old = {bib: (pos, seconds) for pos, bib, seconds in old_scratch}
+    new = {bib: (pos, seconds) for pos, bib, seconds in new_scratch}
+    rows = []
+    for bib in set(old) | set(new) | (old_abandons ^ new_abandons):
+        old_pos, old_s = old.get(bib, (None, None))
+        new_pos, new_s = new.get(bib, (None, None))
+        old_time = format_elapsed(old_s) if old_s is not None else ('Abandon' if bib in old_abandons else '')
+        new_time = format_elapsed(new_s) if new_s is not None else ('Abandon' if bib in new_abandons else '')
+        if old_pos == new_pos and old_time == new_time: continue
+        if old_pos is None and bib not in old_abandons: status = 'ajouté'
+        elif new_pos is None and bib not in new_abandons: status = 'retiré'
+        elif old_time != new_time: status = 'temps' if old_pos == new_pos else 'temps et position'
+        else: status = 'position'
+        rows.append((bib, status, old_pos, new_pos, old_time, new_time))
+    rows.sort(key=lambda row: (row[3] is None, row[3] or 0, row[2] or 0, row[0]))
+    return rows
+
+
+class TeamScorer:
+    """Classement par clubs (cross): somme des places des N premiers de chaque club, par sexe.
+
+    Chaque club garde un tas borné (max-heap de taille N sur le temps) de ses meilleurs coureurs: une arrivée
+    coûte O(log N) et aucun tri global n'est refait. Les places sont lues dans la liste triée des temps du sexe
+    (tous les classés comptent, avec ou sans club)."""
+
+    def __init__(self, top_n=4):
+        self.top_n = max(1, int(top_n))
+        self._heaps = defaultdict(list) # (sexe, club) -> [(-secondes, -dossard)], le plus lent en tête
+        self._sex_times = defaultdict(list) # sexe -> temps triés (secondes)
+
+    def clear(self):
+        self._heaps.clear(); self._sex_times.clear()
+
+    def rebuild(self, results, participants_by_bib, top_n=None, offsets=None):
+        if top_n is not None: self.top_n = max(1, int(top_n))
+        self.clear()
+        offsets = offsets or {}
+        for result in results:
+            self.add(result, participants_by_bib.get(result.bib), offsets.get(result.bib, 0.0))
+
+    def add(self, result, participant, offset=0.0):
+        """offset: décalage de départ du dossard (s); le classement se fait au temps net."""
+        if result.abandon or result.time is None or participant is None: return
+        seconds = max(0.0, result.time.total_seconds() - offset)
+        bisect.insort(self._sex_times[participant.sexe], seconds)
+        if not participant.club: return
+        heap = self._heaps[(participant.sexe, participant.club)]
+        entry = (-seconds, -result.bib)
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]: # Plus rapide que le plus lent des N retenus
+            heapq.heapreplace(heap, entry)
+
+    def has_teams(self):
+        return bool(self._heaps)
+
+    def standings(self, sex):
+        """[(club, points, [(place, dossard)...], complet)] : équipes complètes d'abord, par points puis place du dernier marqueur."""
+        times = self._sex_times.get(sex, [])
+        rows = []
+        for (heap_sex, club), heap in self._heaps.items():
+            if heap_sex != sex: continue
+            scorers = sorted((bisect.bisect_left(times, -neg_seconds) + 1, -neg_bib) for neg_seconds, neg_bib in heap)
+            rows.append((club, sum(place for place, _ in scorers), scorers, len(scorers) >= self.top_n))
+        rows.sort(key=lambda row: (not row[3], -len(row[2]), row[1], row[2][-1][0]))
+        return rows
+
+class ArrivalAnalytics:
+    """Débit de la ligne d'arrivée, calculé au fil de l'eau à partir des temps d'arrivée (secondes depuis le départ).
+
+    Fenêtres glissantes 10 s / 60 s (deques) avec détection du pic, compteurs par tranche de 10 s et par minute,
+    profondeur du buffer dans le temps et délai entre "Nouvelle arrivée" et la validation du dossard."""
+
+    BUCKET_SECONDS = 10
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.arrivals = [] # Temps d'arrivée, croissants
+        self.consumed = [] # (temps d'arrivée, instant de sortie du buffer, 'validation' | 'suppression')
+        self._window_10s = deque(); self._window_60s = deque()
+        self.peak_10s = (0, None); self.peak_60s = (0, None) # (arrivées, début de la fenêtre)
+        self.arrivals_per_bucket = defaultdict(int)
+        self.assigned_per_bucket = defaultdict(int)
+        self.latency_sum_per_bucket = defaultdict(float)
+        self.max_depth_per_bucket = {}; self.end_depth_per_bucket = {}
+        self.depth = 0; self.max_depth = (0, None)
+        self.latencies = [] # Triés, pour les percentiles
+
+    def arrival(self, t):
+        self.arrivals.append(t)
+        self.arrivals_per_bucket[int(t // self.BUCKET_SECONDS)] += 1
+        for window, span, attr in ((self._window_10s, 10, 'peak_10s'), (self._window_60s, 60, 'peak_60s')):
+            window.append(t)
+            while window[0] <= t - span: window.popleft()
+            if len(window) > getattr(self, attr)[0]: setattr(self, attr, (len(window), window[0]))
+        self._set_depth(self.depth + 1, t)
+
+    def consume(self, arrival_t, t, kind='validation'):
+        """Un temps quitte le buffer: validé (délai de saisie mesuré) ou supprimé."""
+        self.consumed.append((arrival_t, t, kind))
+        if kind == 'validation':
+            bucket = int(t // self.BUCKET_SECONDS)
+            self.assigned_per_bucket[bucket] += 1
+            latency = max(0.0, t - arrival_t)
+            self.latency_sum_per_bucket[bucket] += latency
+            bisect.insort(self.latencies, latency)
+        self._set_depth(max(0, self.depth - 1), t)
+
+    def _set_depth(self, depth, t):
+        bucket = int(t // self.BUCKET_SECONDS)
+        # La tranche démarre avec la profondeur courante, même si le premier événement la fait baisser
+        self.max_depth_per_bucket[bucket] = max(self.max_depth_per_bucket.get(bucket, self.depth), depth)
+        self.end_depth_per_bucket[bucket] = depth
+        self.depth = depth
+        if depth > self.max_depth[0]: self.max_depth = (depth, t)
+
+    def rate(self, now, span):
+        """Arrivées dans les `span` dernières secondes."""
+        return len(self.arrivals) - bisect.bisect_right(self.arrivals, now - span)
+
+    def latency_percentile(self, fraction):
+        if not self.latencies: return None
+        return self.latencies[min(len(self.latencies) - 1, int(fraction * len(self.latencies)))]
+
+    def summary_text(self, now):
+        text = f"Arrivées: {self.rate(now, 60)}/min, {self.rate(now, 10)}/10 s | buffer {self.depth}"
+        if self.peak_10s[0]:
+            text += f" | pic {self.peak_10s[0]}/10 s à {format_elapsed(self.peak_10s[1])}"
+        p95 = self.latency_percentile(0.95)
+        if p95 is not None: text += f" | saisie p95 {p95:.0f} s"
+        return text
+
+    def state(self):
+        return {'arrivals': [round(t, 3) for t in self.arrivals],
+                'consumed': [[round(a, 3), round(t, 3), kind] for a, t, kind in self.consumed]}
+
+    @classmethod
+    def from_state(cls, state):
+        """Rejoue les événements sauvegardés dans l'ordre chronologique."""
+        analytics = cls()
+        events = [(t, 0, t, None) for t in state.get('arrivals', [])]
+        events += [(t, 1, a, kind) for a, t, kind in state.get('consumed', [])]
+        for t, order, arrival_t, kind in sorted(events, key=lambda e: (e[0], e[1])):
+            if order == 0: analytics.arrival(t)
+            else: analytics.consume(arrival_t, t, kind)
+        return analytics
+
+    def write_csv(self, f, title):
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(["Analyse des arrivées:", title, "", "", "", ""])
+        writer.writerow(["Arrivées enregistrées", len(self.arrivals), "Validées", sum(self.assigned_per_bucket.values()), "", ""])
+        for label, (count, start) in (("Pic sur 10 s", self.peak_10s), ("Pic sur 60 s", self.peak_60s)):
+            writer.writerow([label, count, "à partir de", format_elapsed(start) if start is not None else "", "", ""])
+        writer.writerow(["Buffer max", self.max_depth[0], "à", format_elapsed(self.max_depth[1]) if self.max_depth[1] is not None else "", "", ""])
+        for label, fraction in (("Délai de saisie médian (s)", 0.5), ("Délai de saisie p95 (s)", 0.95), ("Délai de saisie max (s)", 1.0)):
+            value = self.latency_percentile(fraction)
+            writer.writerow([label, f"{value:.1f}" if value is not None else "", "", "", "", ""])
+        writer.writerow([])
+
+        writer.writerow(["Par minute", "", "", "", "", ""])
+        writer.writerow(['Minute', 'Arrivées', 'Validées', '', '', ''])
+        per_minute_arrivals, per_minute_assigned = defaultdict(int), defaultdict(int)
+        per_bucket = 60 // self.BUCKET_SECONDS
+        for bucket, count in self.arrivals_per_bucket.items(): per_minute_arrivals[bucket // per_bucket] += count
+        for bucket, count in self.assigned_per_bucket.items(): per_minute_assigned[bucket // per_bucket] += count
+        for minute in sorted(set(per_minute_arrivals) | set(per_minute_assigned)):
+            writer.writerow([format_elapsed(minute * 60), per_minute_arrivals.get(minute, 0), per_minute_assigned.get(minute, 0), '', '', ''])
+        writer.writerow([])
+
+        writer.writerow([f"Par tranche de {self.BUCKET_SECONDS} s", "", "", "", "", ""])
+        writer.writerow(['Début', 'Arrivées', 'Validées', 'Buffer max', 'Délai moyen (s)', ''])
+        buckets = set(self.arrivals_per_bucket) | set(self.assigned_per_bucket) | set(self.max_depth_per_bucket)
+        depth = 0
+        for bucket in range(min(buckets), max(buckets) + 1) if buckets else ():
+            # Sans événement dans la tranche, la profondeur reste celle de la fin de la tranche précédente
+            assigned = self.assigned_per_bucket.get(bucket, 0)
+            mean_latency = f"{self.latency_sum_per_bucket[bucket] / assigned:.1f}" if assigned else ""
+            writer.writerow([format_elapsed(bucket * self.BUCKET_SECONDS), self.arrivals_per_bucket.get(bucket, 0), assigned,
+                             self.max_depth_per_bucket.get(bucket, depth), mean_latency, ''])
+            depth = self.end_depth_per_bucket.get(bucket, depth)
+
+class StartupCache:
+    """Cache binaire (pickle) des fichiers déjà analysés, invalidé par chemin, mtime, taille et empreinte du contenu."""
+
+    VERSION = 4
+
+    def __init__(self, cache_path):
+        self.cache_path = pathlib.Path(cache_path)
+        self.entries = {}
+        self._dirty = False
+        try:
+            with self.cache_path.open('rb') as f:
+                payload = pickle.load(f)
+            if payload.get('version') == self.VERSION:
+                self.entries = payload.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Cache de démarrage illisible ({self.cache_path.name}), ignoré: {e}")
+
+    @staticmethod
+    def _stat_key(path):
+        path = pathlib.Path(path)
+        st = path.stat()
+        return (str(path.resolve()), st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _content_hash(path):
+        digest = hashlib.blake2b(digest_size=16)
+        with pathlib.Path(path).open('rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, kind, path, extra_key=None):
+        entry = self.entries.get(kind)
+        if entry is None or entry['extra_key'] != extra_key:
+            return None
+        try:
+            if entry['stat_key'] != self._stat_key(path) or entry['hash'] != self._content_hash(path):
+                return None
+        except OSError:
+            return None
+        return entry['data']
+
+    def put(self, kind, path, data, extra_key=None):
+        try:
+            self.entries[kind] = {'stat_key': self._stat_key(path), 'hash': self._content_hash(path),
+                                  'extra_key': extra_key, 'data': data}
+            self._dirty = True
+        except OSError as e:
+            logging.debug(f"Cache de démarrage: impossible d'indexer {path}: {e}")
+
+    def save(self, disk_writer):
+        """Sérialise un instantané des entrées sur le thread d'écriture."""
+        if not self._dirty: return
+        payload = {'version': self.VERSION, 'entries': dict(self.entries)}
+        cache_path = self.cache_path
+        disk_writer.call(lambda: write_file_atomic(cache_path, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)),
+                         callback=self._on_saved)
+        self._dirty = False
+
+    def _on_saved(self, error):
+        if error is not None:
+            logging.warning(f"Impossible d'écrire le cache de démarrage {self.cache_path}: {error}")
+            self._dirty = True
+
+
+def format_elapsed(seconds, tenths=False):
+    """Formate une durée en HH:MM:SS (ou HH:MM:SS.d) par arithmétique entière, sans passer par datetime."""
+    if tenths:
+        total = int(seconds * 10) if seconds > 0 else 0
+        hours, rem = divmod(total, 36000); minutes, rem = divmod(rem, 600); secs, dec = divmod(rem, 10)
+        return f"{hours:02}:{minutes:02}:{secs:02}.{dec}"
+    total = int(seconds) if seconds > 0 else 0
+    hours, rem = divmod(total, 3600); minutes, secs = divmod(rem, 60)
+    return f"{hours:02}:{minutes:02}:{secs:02}"
+
+
+RIEGEL_EXPONENT = 1.06 # Transposition d'un temps de référence à une distance voisine: T2 = T1 * (D2/D1)^1.06
+
+
+class AgeGradeTable:
+    """Table locale facteurs_age.ini : sections [h]/[f] 'âge = coefficient' (<= 1, comme les tables WMA) et
+    [standards_h]/[standards_f] 'distance en m = temps de référence open'. Les âges absents sont interpolés.
+
+    Pourcentage âge = temps de référence de la distance / (temps net x coefficient de l'âge) x 100."""
+
+    def __init__(self, factors=None, standards=None):
+        self.ages, self.values = {}, {}
+        for sex, pairs in (factors or {}).items():
+            pairs = sorted(pairs)
+            self.ages[sex] = [age for age, _ in pairs]
+            self.values[sex] = [factor for _, factor in pairs]
+        self.standards = {sex: sorted(pairs) for sex, pairs in (standards or {}).items() if pairs}
+
+    @classmethod
+    def read(cls, path):
+        """None si le fichier n'existe pas (colonne % âge absente des exports)."""
+        path = pathlib.Path(path)
+        if not path.exists(): return None
+        config = configparser.ConfigParser()
+        config.read(path, encoding='utf-8')
+        factors, standards = {}, {}
+        for sex in ('h', 'f'):
+            for section, target, parse in ((sex, factors, lambda v: float(v.replace(',', '.'))),
+                                           (f"standards_{sex}", standards, parse_duration)):
+                if not config.has_section(section): continue
+                for key, value in config.items(section):
+                    try:
+                        pair = (float(key.replace(',', '.')), parse(value))
+                    except ValueError:
+                        pair = (None, None)
+                    if pair[1] is None or not pair[1] > 0:
+                        logging.warning(f"{path.name} [{section}] '{key} = {value}' ignoré"); continue
+                    target.setdefault(sex, []).append(pair)
+        logging.info(f"Coefficients d'âge chargés depuis {path.name} ({', '.join(f'{sex}: {len(v)}' for sex, v in factors.items()) or 'aucun'})")
+        return cls(factors, standards)
+
+    def has(self, sex):
+        return sex in self.ages and sex in self.standards
+
+    def factor(self, sex, age):
+        ages, values = self.ages[sex], self.values[sex]
+        i = bisect.bisect_left(ages, age)
+        if i == 0: return values[0]
+        if i == len(ages): return values[-1]
+        lo, hi = ages[i - 1], ages[i]
+        return values[i - 1] + (values[i] - values[i - 1]) * (age - lo) / (hi - lo)
+
+    def standard(self, sex, distance):
+        entries = self.standards.get(sex)
+        if not entries or not distance > 0: return None
+        ref_distance, ref_seconds = min(entries, key=lambda entry: abs(math.log(distance / entry[0])))
+        return ref_seconds * (distance / ref_distance) ** RIEGEL_EXPONENT
+
+
+def performance_columns(net_seconds, distances_m, sexes=None, ages=None, age_table=None):
+    """Allure (s/km), vitesse (km/h) et pourcentage âge d'une série de classés, colonne par colonne.
+
+    Entrées alignées, nan pour une valeur inconnue ; sorties: trois listes de float (nan si non calculable).
+    Avec numpy chaque colonne est une opération sur tableau, sinon le même calcul en compréhensions de liste."""
+    nan = float('nan')
+    with_age = age_table is not None and sexes is not None and ages is not None
+    if np is not None:
+        t = np.asarray(net_seconds, dtype=float)
+        d = np.asarray(distances_m, dtype=float)
+        pct = np.full(t.shape, nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valid = (t > 0) & (d > 0)
+            pace = np.where(valid, t / d * 1000.0, nan)
+            speed = np.where(valid, d / t * 3.6, nan)
+            if with_age:
+                sex_array, age_array = np.asarray(sexes, dtype=object), np.asarray(ages, dtype=float)
+                for sex in ('h', 'f'):
+                    mask = valid & (sex_array == sex) & ~np.isnan(age_array)
+                    if not age_table.has(sex) or not mask.any(): continue
+                    factor = np.interp(age_array[mask], age_table.ages[sex], age_table.values[sex])
+                    # Peu de distances distinctes: un temps de référence par distance, redistribué par index
+                    unique_d, inverse = np.unique(d[mask], return_inverse=True)
+                    standard = np.array([age_table.standard(sex, x) or nan for x in unique_d])[inverse]
+                    pct[mask] = standard / (t[mask] * factor) * 100.0
+        return pace.tolist(), speed.tolist(), pct.tolist()
+
+    pace = [t / d * 1000.0 if t > 0 and d > 0 else nan for t, d in zip(net_seconds, distances_m)]
+    speed = [d / t * 3.6 if t > 0 and d > 0 else nan for t, d in zip(net_seconds, distances_m)]
+    if not with_age:
+        return pace, speed, [nan] * len(pace)
+    standards = {}
+    for sex in ('h', 'f'):
+        if age_table.has(sex):
+            standards.update(((sex, d), age_table.standard(sex, d) or nan) for d in set(distances_m) if d > 0)
+    pct = [standards[(sex, d)] / (t * age_table.factor(sex, age)) * 100.0 if (sex, d) in standards and t > 0 and age == age else nan
+           for t, d, sex, age in zip(net_seconds, distances_m, sexes, ages)]
+    return pace, speed, pct
+
+
+def format_pace(seconds_per_km):
+    """Allure en M:SS (par km) ; '' si non calculable."""
+    if not seconds_per_km > 0: return ''
+    minutes, secs = divmod(int(round(seconds_per_km)), 60)
+    return f"{minutes}:{secs:02}"
+
+
+def performance_fields(pace, speed, pct):
+    """Champs du flux direct (valeurs non calculables omises)."""
+    fields = {}
+    if pace > 0: fields['allure'] = format_pace(pace)
+    if speed > 0: fields['vitesse_kmh'] = round(speed, 2)
+    if pct > 0: fields['pct_age'] = round(pct, 1)
+    return fields
+
+
+class ClockDisplay:
+    """Un affichage de chrono lié à un label ; le widget n'est modifié que si le texte rendu change."""
+
+    def __init__(self, label, elapsed_source, tenths=False):
+        self.label = label
+        self.elapsed_source = elapsed_source # callable -> secondes écoulées, ou None si à l'arrêt
+        self.tenths = tenths
+        self._last_text = None
+
+    def show(self, seconds):
+        text = format_elapsed(seconds, self.tenths)
+        if text != self._last_text:
+            self.label.config(text=text)
+            self._last_text = text
+
+    def refresh(self):
+        seconds = self.elapsed_source()
+        if seconds is not None:
+            self.show(seconds)
+
+
+class ClockTicker:
+    """Source de ticks unique pour tous les affichages de chrono.
+
+    Chaque tick est programmé par rapport à l'échéance monotone suivante (epoch + k * période) et non
+    1000 ms après le tick précédent : l'affichage ne dérive pas et ne saute pas de seconde."""
+
+    def __init__(self, tk_root):
+        self.tk_root = tk_root
+        self.clocks = []
+        self.epoch = None
+        self._after_id = None
+
+    @property
+    def period(self):
+        return 0.1 if any(clock.tenths for clock in self.clocks) else 1.0
+
+    @property
+    def running(self):
+        return self.epoch is not None
+
+    def add(self, clock):
+        self.clocks.append(clock)
+        if self.running: clock.refresh()
+
+    def remove(self, clock):
+        if clock in self.clocks: self.clocks.remove(clock)
+
+    def show_all(self, seconds):
+        for clock in list(self.clocks):
+            try: clock.show(seconds)
+            except tk.TclError: self.remove(clock) # Label détruit (fenêtre fermée)
+
+    def start(self, epoch):
+        self.stop()
+        self.epoch = epoch
+        self._tick()
+
+    def stop(self):
+        if self._after_id is not None:
+            try: self.tk_root.after_cancel(self._after_id)
+            except tk.TclError: pass
+        self._after_id = None
+        self.epoch = None
+
+    def reschedule(self):
+        """À appeler quand la résolution (période) change pendant que le chrono tourne."""
+        if self.running: self.start(self.epoch)
+
+    def _tick(self):
+        for clock in list(self.clocks):
+            try: clock.refresh()
+            except tk.TclError: self.remove(clock)
+        period = self.period
+        elapsed = time.monotonic() - self.epoch
+        next_deadline = (int(elapsed / period) + 1) * period
+        # +1 ms pour tomber juste après la frontière de seconde (ou de dixième)
+        delay_ms = max(1, int((next_deadline - elapsed) * 1000) + 1)
+        self._after_id = self.tk_root.after(delay_ms, self._tick)
+
+
+class StallWatchdog:
+    """Détecte les blocages de la boucle Tk : un battement after() horodate chaque passage, un thread vérifie qu'il avance.
+
+    Dès que le battement a plus de `threshold` de retard, la pile du thread principal est échantillonnée
+    (sys._current_frames) jusqu'à la reprise ; l'événement (durée, opération en cause, piles les plus fréquentes)
+    est alors écrit dans le journal de diagnostic, depuis le thread watchdog."""
+
+    STACK_DEPTH = 25
+    MAX_STACKS_LOGGED = 3
+
+    def __init__(self, tk_root, log_path, threshold=STALL_THRESHOLD_SECONDS, heartbeat_ms=STALL_HEARTBEAT_MS,
+                 sample_interval=STALL_SAMPLE_SECONDS):
+        self.tk_root = tk_root
+        self.threshold = threshold
+        self.heartbeat_ms = heartbeat_ms
+        self.sample_interval = sample_interval
+        self.stall_count = 0
+        self.longest_stall = 0.0
+        self._main_ident = threading.main_thread().ident
+        self._module_file = pathlib.Path(__file__).name
+        self._last_beat = time.monotonic()
+        self._after_id = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.log_path = pathlib.Path(log_path).resolve()
+        # Un logger par fichier de diagnostic : deux surveillances vers deux fichiers n'écrivent pas dans le même
+        self.logger = logging.getLogger(f"race_timer.diagnostics.{self.log_path}")
+        if not self.logger.handlers:
+            handler = logging.FileHandler(self.log_path, encoding='utf-8', delay=True) # Fichier créé au premier blocage
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.logger.addHandler(handler)
+            self.logger.propagate = False
+
+    def start(self):
+        if self._stop_event.is_set(): return # Fenêtre fermée avant le premier passage de la boucle
+        self._last_beat = time.monotonic()
+        self._after_id = self.tk_root.after(self.heartbeat_ms, self._beat)
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._after_id is not None:
+            self.tk_root.after_cancel(self._after_id); self._after_id = None
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        self._after_id = self.tk_root.after(self.heartbeat_ms, self._beat)
+
+    def _run(self):
+        heartbeat = self.heartbeat_ms / 1000.0
+        stalled_since = None # Dernier battement vu avant le blocage en cours
+        samples = Counter()
+        while not self._stop_event.wait(self.sample_interval):
+            last_beat = self._last_beat
+            if stalled_since is None:
+                if time.monotonic() - last_beat - heartbeat >= self.threshold:
+                    stalled_since = last_beat
+                    samples.clear()
+                    self._sample(samples)
+            elif last_beat != stalled_since:
+                self._record(last_beat - stalled_since - heartbeat, samples)
+                stalled_since = None
+            else:
+                self._sample(samples)
+
+    def _sample(self, samples):
+        frame = sys._current_frames().get(self._main_ident)
+        if frame is None: return
+        stack = traceback.extract_stack(frame, limit=self.STACK_DEPTH)
+        samples[tuple((f.filename, f.lineno, f.name, f.line) for f in stack)] += 1
+
+    def _operation(self, stack):
+        # Fonction de l'application la plus profonde de la pile : save_state, réécriture CSV, remplissage d'un Treeview...
+        for filename, lineno, name, _ in reversed(stack):
+            if pathlib.Path(filename).name == self._module_file:
+                return f"{name} ({self._module_file}:{lineno})"
+        filename, lineno, name, _ = stack[-1]
+        return f"{name} ({pathlib.Path(filename).name}:{lineno})"
+
+    def _record(self, duration, samples):
+        self.stall_count += 1
+        self.longest_stall = max(self.longest_stall, duration)
+        total = sum(samples.values())
+        common = samples.most_common(self.MAX_STACKS_LOGGED)
+        operation = self._operation(common[0][0]) if common else "inconnue"
+        logging.warning(f"Interface bloquée {duration:.2f} s, opération: {operation} (détail dans {self.log_path.name})")
+        lines = [f"Blocage de la boucle Tk: {duration:.3f} s, {total} échantillon(s), opération: {operation}"]
+        for stack, count in common:
+            lines.append(f"Pile ({count}/{total} échantillons):")
+            lines.extend(''.join(traceback.format_list(traceback.StackSummary.from_list(list(stack)))).rstrip().splitlines())
+        self.logger.warning('\n'.join(lines))
+
+
+class _SeqNode:
+    __slots__ = ('value', 'prio', 'size', 'left', 'right')
+
+    def __init__(self, value):
+        self.value = value
+        self.prio = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _seq_size(node):
+    return node.size if node is not None else 0
+
+
+def _seq_split(node, k):
+    """Coupe le treap en (k premiers éléments, reste)."""
+    if node is None:
+        return None, None
+    if _seq_size(node.left) >= k:
+        left, node.left = _seq_split(node.left, k)
+        node.size = 1 + _seq_size(node.left) + _seq_size(node.right)
+        return left, node
+    right_part, rest = _seq_split(node.right, k - _seq_size(node.left) - 1)
+    node.right = right_part
+    node.size = 1 + _seq_size(node.left) + _seq_size(node.right)
+    return node, rest
+
+
+def _seq_merge(left, right):
+    if left is None: return right
+    if right is None: return left
+    if left.prio > right.prio:
+        left.right = _seq_merge(left.right, right)
+        left.size = 1 + _seq_size(left.left) + _seq_size(left.right)
+        return left
+    right.left = _seq_merge(left, right.left)
+    right.size = 1 + _seq_size(right.left) + _seq_size(right.right)
+    return right
+
+
+class IndexedSequence:
+    """Séquence à accès par position (treap implicite) : insertion, suppression et lecture en O(log n) à n'importe quelle position.
+
+    Offre le sous-ensemble de l'API de list utilisé pour le buffer d'arrivées et la file des dossards."""
+
+    def __init__(self, iterable=()):
+        self._root = None
+        for value in iterable:
+            self.append(value)
+
+    def __len__(self):
+        return _seq_size(self._root)
+
+    def __iter__(self):
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node); node = node.left
+            node = stack.pop()
+            yield node.value
+            node = node.right
+
+    def __repr__(self):
+        return f"IndexedSequence({list(self)!r})"
+
+    def _normalize_index(self, index, allow_end=False):
+        n = len(self)
+        if index < 0: index += n
+        if not (0 <= index < n or (allow_end and index == n)):
+            raise IndexError("IndexedSequence index out of range")
+        return index
+
+    def _node_at(self, index):
+        node = self._root
+        while True:
+            left_size = _seq_size(node.left)
+            if index < left_size: node = node.left
+            elif index == left_size: return node
+            else: index -= left_size + 1; node = node.right
+
+    def __getitem__(self, index):
+        return self._node_at(self._normalize_index(index)).value
+
+    def __setitem__(self, index, value):
+        self._node_at(self._normalize_index(index)).value = value
+
+    def insert(self, index, value):
+        n = len(self)
+        index = max(0, min(n, index + n if index < 0 else index)) # même tolérance que list.insert
+        left, right = _seq_split(self._root, index)
+        self._root = _seq_merge(_seq_merge(left, _SeqNode(value)), right)
+
+    def append(self, value):
+        self._root = _seq_merge(self._root, _SeqNode(value))
+
+    def pop(self, index=-1):
+        index = self._normalize_index(index)
+        left, rest = _seq_split(self._root, index)
+        middle, right = _seq_split(rest, 1)
+        self._root = _seq_merge(left, right)
+        return middle.value
+
+    def __delitem__(self, index):
+        self.pop(index)
+
+    def clear(self):
+        self._root = None
+
+
+class FinishReconciler:
+    """Rapprochement par position d'arrivée entre le flux des temps (buffer) et la file des dossards saisis ou scannés.
+
+    La paire n° i est (times[i], bibs[i]) : insérer ou supprimer une entrée au milieu d'un flux ne coûte
+    qu'O(log n) et ré-apparie implicitement toutes les positions suivantes. None dans la file des dossards
+    marque un dossard manquant (coureur passé sans dossard lisible)."""
+
+    def __init__(self, times, bibs=()):
+        self.times = times
+        self.bibs = IndexedSequence()
+        self._bib_counts = defaultdict(int)
+        for bib in bibs: self.add_bib(bib)
+
+    def _count(self, bib, delta):
+        if bib is None: return
+        self._bib_counts[bib] += delta
+        if self._bib_counts[bib] <= 0: del self._bib_counts[bib]
+
+    def add_bib(self, bib):
+        self.bibs.append(bib); self._count(bib, 1)
+
+    def insert_bib(self, position, bib):
+        self.bibs.insert(position, bib); self._count(bib, 1)
+
+    def remove_bib(self, position):
+        bib = self.bibs.pop(position); self._count(bib, -1)
+        return bib
+
+    def replace_bib(self, position, bib):
+        self._count(self.bibs[position], -1); self.bibs[position] = bib; self._count(bib, 1)
+
+    def clear_bibs(self):
+        self.bibs.clear(); self._bib_counts.clear()
+
+    def is_duplicate(self, bib):
+        return bib is not None and self._bib_counts.get(bib, 0) > 1
+
+    def duplicates(self):
+        return sorted(bib for bib, count in self._bib_counts.items() if count > 1)
+
+    def pair(self, position):
+        time_obj = self.times[position] if position < len(self.times) else None
+        bib = self.bibs[position] if position < len(self.bibs) else None
+        return time_obj, bib
+
+    def status(self, position, valid_bibs, ranked_bibs):
+        """État de la paire à une position ; 'OK' si elle peut être validée."""
+        has_time, has_bib = position < len(self.times), position < len(self.bibs)
+        if not has_bib: return "Dossard attendu"
+        bib = self.bibs[position]
+        if bib is None: return "Dossard manquant"
+        if not has_time: return "Temps attendu"
+        if self.is_duplicate(bib): return "Doublon"
+        if bib not in valid_bibs: return "Dossard inconnu"
+        if bib in ranked_bibs: return "Déjà classé"
+        return "OK"
+
+    def pending_count(self):
+        return max(len(self.times), len(self.bibs))
+
+    def committable_count(self, valid_bibs, ranked_bibs):
+        """Nombre de paires en tête de file qui peuvent être validées d'un bloc (arrêt à la première anomalie)."""
+        count, limit = 0, min(len(self.times), len(self.bibs))
+        while count < limit and self.status(count, valid_bibs, ranked_bibs) == "OK":
+            count += 1
+        return count
+
+    def pop_pair(self):
+        time_obj = self.times.pop(0)
+        bib = self.remove_bib(0)
+        return time_obj, bib
+
+
+class ScanCapture:
+    """Assemble les frappes d'une douchette (émulation clavier) en scans complets, sans passer par le contenu d'un Entry.
+
+    Un scan se termine par Entrée/Tab, ou, pour les douchettes sans suffixe, après max_gap secondes sans caractère.
+    Les écarts entre caractères sont mesurés sur l'horodatage des événements (event.time du serveur X) et non
+    à la réception : une boucle Tk occupée livre les frappes en rafale sans couper ni fusionner les scans.
+    Pour la fin de scan implicite, l'horloge X est ramenée à l'horloge monotone par le plus petit écart
+    réception - événement observé (celui de la frappe livrée le plus vite)."""
+
+    def __init__(self, max_gap=None):
+        self.max_gap = max_gap
+        self.completed = deque()
+        self._chars = []
+        self._last_char_time = None
+        self._clock_offset = None # monotone - horloge des événements, None tant qu'aucune frappe n'a été reçue
+
+    def feed(self, char, timestamp, received=None):
+        """timestamp: instant de la frappe (secondes, horloge des événements); received: instant monotone de réception."""
+        if self._last_char_time is not None and timestamp < self._last_char_time:
+            self._clock_offset = None # Rebouclage ou redémarrage de l'horloge X: l'écart est réappris
+        if self._chars and self.max_gap is not None and timestamp - self._last_char_time > self.max_gap:
+            self._finalize()
+        self._chars.append(char)
+        self._last_char_time = timestamp
+        if received is not None:
+            offset = received - timestamp
+            if self._clock_offset is None or offset < self._clock_offset: self._clock_offset = offset
+
+    def terminate(self):
+        self._finalize()
+
+    def flush_idle(self, now):
+        """now: instant monotone courant, converti dans l'horloge des événements."""
+        if not self._chars or self.max_gap is None or self._clock_offset is None: return
+        if now - self._clock_offset - self._last_char_time > self.max_gap:
+            self._finalize()
+
+    def _finalize(self):
+        text = ''.join(self._chars).strip()
+        self._chars.clear()
+        if text:
+            self.completed.append(text)
+
+    def drain(self):
+        scans = list(self.completed)
+        self.completed.clear()
+        return scans
+
+
+def build_memory_report(structures):
+    """Mesure l'empreinte mémoire de chaque structure avec tracemalloc.
+
+    structures: liste de (nom, objet, possède_ses_éléments). Une structure qui possède ses éléments est
+    reconstruite (pickle) sous tracemalloc pour mesurer tout ce qu'elle référence ; une simple liste de
+    références partagées n'est comptée que pour son conteneur. Retourne une liste de lignes de texte."""
+    lines, total = [], 0
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing: tracemalloc.start()
+    try:
+        for name, obj, owns_items in structures:
+            if owns_items:
+                payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+                before = tracemalloc.get_traced_memory()[0]
+                clone = pickle.loads(payload)
+                size = tracemalloc.get_traced_memory()[0] - before
+                del clone
+            else:
+                size = sys.getsizeof(obj)
+            total += size
+            count = len(obj) if hasattr(obj, '__len__') else 0
+            per_item = f", {size / count:.0f} o/élément" if count else ""
+            kind = "" if owns_items else " (références partagées)"
+            lines.append(f"{name}: {size / 1024:.1f} Kio pour {count} élément(s){per_item}{kind}")
+    finally:
+        if not was_tracing: tracemalloc.stop()
+    lines.append(f"Total: {total / 1024:.1f} Kio")
+    return lines
+
+
+def longest_increasing_subsequence(values):
+    """Valeurs (distinctes) d'une plus longue sous-suite croissante, en O(n log n)."""
+    tails, tail_index, previous = [], [], [None] * len(values)
+    for i, value in enumerate(values):
+        pos = bisect.bisect_left(tails, value)
+        if pos == len(tails): tails.append(value); tail_index.append(i)
+        else: tails[pos] = value; tail_index[pos] = i
+        previous[i] = tail_index[pos - 1] if pos else None
+    result, i = [], tail_index[-1] if tail_index else None
+    while i is not None:
+        result.append(values[i]); i = previous[i]
+    return result[::-1]
+
+class NameSearchIndex:
+    """Index de trigrammes sur nom et prénom normalisés (sans accents, casse ni ponctuation) pour la recherche floue.
+
+    Chaque participant contribue les trigrammes de "$nom$" et "$prénom$" (formes primaires déjà calculées pour le tri).
+    Les listes de trigrammes sont tenues par catégorie : une recherche limitée à une catégorie ne touche jamais les
+    autres. Une requête ne génère ses candidats qu'à partir de ses trigrammes les plus rares (un candidat qui partage
+    au moins `seuil` trigrammes figure forcément dans l'un d'eux), puis les compte par intersections d'ensembles et
+    les classe par coefficient de Dice. Une requête trop peu sélective (un prénom courant dans une très grande
+    catégorie) exige davantage de trigrammes communs jusqu'à retomber sous MAX_CANDIDATES, ou, à défaut, ne classe
+    que MAX_CANDIDATES porteurs de son trigramme le plus rare : le coût d'une frappe reste borné, au prix d'un
+    classement approché tant que la requête ne départage pas mieux les coureurs."""
+
+    MAX_CANDIDATES = 500
+
+    def __init__(self):
+        self.postings = {} # catégorie -> {trigramme -> {dossards}}
+        self.sizes = {} # dossard -> nombre de trigrammes distincts
+        self._token_cache = {} # Les noms et surtout les prénoms se répètent: trigrammes calculés une fois par forme
+
+    @staticmethod
+    def _trigrams_of(token):
+        padded = f"${token}$"
+        return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    def _token_trigrams(self, token):
+        grams = self._token_cache.get(token)
+        if grams is None: grams = self._token_cache[token] = self._trigrams_of(token)
+        return grams
+
+    def query_trigrams(self, query):
+        grams = set()
+        for token in query.split(): grams |= self._trigrams_of(collation_primary(token))
+        return grams
+
+    def _participant_trigrams(self, participant):
+        return (self._token_trigrams(participant.sort_nom.partition('\x00')[0])
+                | self._token_trigrams(participant.sort_prenom.partition('\x00')[0]))
+
+    def rebuild(self, participants):
+        self.postings.clear(); self.sizes.clear(); self._token_cache.clear()
+        for participant in participants:
+            self.add(participant)
+
+    def add(self, participant):
+        grams = self._participant_trigrams(participant)
+        postings = self.postings.get(participant.cat)
+        if postings is None: postings = self.postings[participant.cat] = defaultdict(set)
+        for gram in grams:
+            postings[gram].add(participant.bib)
+        self.sizes[participant.bib] = len(grams)
+
+    def remove(self, participant):
+        if self.sizes.pop(participant.bib, None) is None: return
+        postings = self.postings.get(participant.cat)
+        if postings is None: return
+        for gram in self._participant_trigrams(participant):
+            posting = postings.get(gram)
+            if posting is None: continue
+            posting.discard(participant.bib)
+            if not posting: del postings[gram]
+        if not postings: del self.postings[participant.cat]
+
+    def search(self, query, limit=10, cat=None):
+        """[(score, dossard)] les mieux classés, limités à la catégorie cat si elle est donnée."""
+        query_grams = self.query_trigrams(query)
+        if not query_grams: return []
+        if cat: scored = self._search_postings(self.postings.get(cat, {}), query_grams, limit)
+        else: scored = [hit for postings in self.postings.values() for hit in self._search_postings(postings, query_grams, limit)]
+        return heapq.nlargest(limit, scored)
+
+    def _search_postings(self, category_postings, query_grams, limit):
+        postings = sorted(filter(None, (category_postings.get(gram) for gram in query_grams)), key=len)
+        min_shared = max(1, len(query_grams) // 2) # Au moins la moitié des trigrammes (un des deux mots, ou une faute de frappe)
+        # Union des (n - seuil + 1) listes les plus rares ; si elle est trop grande, le seuil est relevé
+        keep = len(postings) - min_shared + 1
+        if keep < 1: return []
+        while keep > 1 and sum(map(len, postings[:keep])) > self.MAX_CANDIDATES:
+            keep -= 1
+        min_shared = len(postings) - keep + 1
+        if keep > 1 or len(postings[0]) <= self.MAX_CANDIDATES: candidates = set().union(*postings[:keep])
+        else: candidates = set(itertools.islice(postings[0], self.MAX_CANDIDATES))
+        counts = Counter()
+        for posting in postings:
+            counts.update(candidates.intersection(posting))
+        sizes, query_size = self.sizes, len(query_grams)
+        scored = ((2.0 * shared / (query_size + sizes[bib]), bib) for bib, shared in counts.items() if shared >= min_shared)
+        return heapq.nlargest(limit, scored)
+
+
+class ParticipantIndex:
+    """Index dossard -> participant et partition catégorie -> participants, maintenus au chargement, à l'ajout et à la suppression.
+
+    Les listes de la partition sont partagées (pas de copie) ; les vues triées par nom sont mises en cache par
+    catégorie et invalidées seulement quand cette catégorie change. La table des profils de performance
+    (distance, sexe, âge par dossard) est suivie à l'ajout et à la suppression."""
+
+    def __init__(self, participants=()):
+        self.rebuild(participants)
+
+    def rebuild(self, participants):
+        self.by_bib = {}
+        self.by_category = defaultdict(list)
+        self._sorted_views = {}
+        self._categories = None
+        self._profiles = None # (distances, année, {dossard: (distance, sexe, âge)}) construit à la demande
+        for p in participants:
+            self.by_bib[p.bib] = p
+            self.by_category[p.cat].append(p)
+        self.bibs = BibAllocator(self.by_bib)
+        self.names = NameSearchIndex()
+        self.names.rebuild(participants)
+
+    def _invalidate(self, cat):
+        self._sorted_views.pop(cat, None)
+        self._categories = None
+
+    def add(self, participant):
+        self.by_bib[participant.bib] = participant
+        self.by_category[participant.cat].append(participant)
+        self.bibs.add(participant.bib)
+        self.names.add(participant)
+        if self._profiles is not None:
+            distances, year, profiles = self._profiles
+            profiles[participant.bib] = self._profile(participant, distances, year)
+        self._invalidate(participant.cat)
+
+    def remove_bibs(self, bibs):
+        for bib in bibs:
+            participant = self.by_bib.pop(bib, None)
+            if participant is None: continue
+            members = self.by_category[participant.cat]
+            members.remove(participant)
+            if not members: del self.by_category[participant.cat]
+            self.bibs.discard(bib)
+            self.names.remove(participant)
+            if self._profiles is not None: self._profiles[2].pop(bib, None)
+            self._invalidate(participant.cat)
+
+    @staticmethod
+    def _profile(participant, distances, year):
+        nan = float('nan')
+        return (distances.get(participant.sexe, {}).get(participant.cat, nan), participant.sexe,
+                year - participant.annee if participant.annee else nan)
+
+    def performance_profiles(self, distances, year):
+        """{dossard: (distance, sexe, âge)} pour les colonnes de performance ; reconstruit seulement si la
+        configuration des distances (nouvel objet) ou l'année de la course change."""
+        if self._profiles is None or self._profiles[0] is not distances or self._profiles[1] != year:
+            self._profiles = (distances, year, {p.bib: self._profile(p, distances, year) for p in self.by_bib.values()})
+        return self._profiles[2]
+
+    def members(self, cat):
+        return self.by_category.get(cat, [])
+
+    def in_category(self, bib, cat):
+        participant = self.by_bib.get(bib)
+        return participant is not None and participant.cat == cat
+
+    def sorted_by_name(self, cat):
+        view = self._sorted_views.get(cat)
+        if view is None:
+            view = self._sorted_views[cat] = sorted(self.members(cat), key=lambda p: (p.sort_nom, p.sort_prenom))
+        return view
+
+    def search_names(self, query, limit=10, cat=None):
+        """Recherche floue par nom/prénom : [(score, participant)], limitée à une catégorie si demandée."""
+        return [(score, self.by_bib[bib]) for score, bib in self.names.search(query, limit, cat)]
+
+    def categories(self):
+        if self._categories is None:
+            self._categories = sorted(cat for cat in self.by_category if cat)
+        return self._categories
 
 
 class RaceTimerApp(tk.Tk):
     def __init__(self):
+        self._startup_t0 = time.perf_counter()
         super().__init__()
         self.title("Chronométreur de course")
         self.geometry("800x820") 
         
         self.participants = [] 
-        self.filtered_participants_for_chrono = [] 
+        self.participant_index = ParticipantIndex()
+        self.filtered_participants_for_chrono = [] # Liste partagée de la partition par catégorie (ne pas modifier)
         self.distances = {'h': {}, 'f': {}}
         self.annees_categories = {} 
+        self.category_year_index = CategoryYearIndex()
+        self.dossards_categories = {} # Plages de dossards réservées par catégorie ('1-99')
+        self.bib_range_index = BibRangeIndex()
         # self.tours_categories = {} # Supprimé
 
-        self.buffer = [] 
+        self.buffer = IndexedSequence() 
+        self.reconciler = FinishReconciler(self.buffer) # File des dossards pré-saisis, appariée au buffer par position
+        self.reconcile_popup = None
+        self.scan_capture = ScanCapture(max_gap=SCAN_MAX_GAP_SECONDS)
+        self._scan_batch_id = None
         self.rankings = []
         self.current_category = None 
         self._running = False
         self.start_time = None 
+        self._start_monotonic = None # Ancre monotone du départ, utilisée pour l'affichage et les temps d'arrivée
         self.race_instance_counter = defaultdict(int)
         self.last_imported_file_path = None 
 
         # Map pour stocker les ID des timers de feedback pour les labels des popups
         self._feedback_clear_id_map_popup = {}
+        self._import_job = None # Import de liste de départ en cours dans un thread
+        self.disk_writer = DiskWriter() # Toutes les écritures disque passent par ce thread, jamais par le thread Tk
+        self._pending_config_text = None # Contenu de categories.ini en file d'écriture, pas encore sur disque
+        self.live_feed = None # Flux de résultats en direct de la course en cours (LiveResultsFeed)
+        self.action_journal = None # Journal des actions de la course en cours (ActionJournal), rejouable par --replay
+        self.live_feed_ndjson = True
+        self.live_feed_csv = False
+        self.team_size = TEAM_SIZE_DEFAULT
+        self.team_scorer = TeamScorer(self.team_size) # Classement clubs tenu à jour à chaque résultat
+        self.arrival_analytics = ArrivalAnalytics() # Débit de la ligne d'arrivée, mis à jour à chaque événement
+        self._analytics_refresh_id = None
+        self.offsets_popup = None
+        self.cat_popup = None # Popups gardés en vie (masqués) entre deux ouvertures
+        self.chip_popup = None
+        self._chip_job = None # Lecture d'un journal de puces en cours dans un thread
+        self.race_list_popup = None
+        self._race_list_rows = {} # iid -> valeurs affichées dans la liste de course
+        self._participant_tree_sort = (None, False) # (colonne, décroissant) de la liste des participants
+        self._startup_cache = StartupCache(STARTUP_CACHE_FILE)
+        self.age_grade_table = AgeGradeTable.read(AGE_FACTORS_FILENAME)
+        self.settings = self._load_settings()
+        # Dossard -> décalage de départ (s): handicap, poursuite, départ tardif. Saisis avant la course, ils sont
+        # relus depuis leur propre fichier et ne dépendent pas de la sauvegarde de récupération
+        self.start_offsets = self._load_start_offsets()
+        self.clock_ticker = ClockTicker(self)
+        self.big_clock_window = None
 
 
         restored_from_file = self.attempt_restore_state()
@@ -56,6 +2564,12 @@ class RaceTimerApp(tk.Tk):
 
         self.create_widgets() 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.stall_watchdog = StallWatchdog(self, DIAGNOSTICS_LOG_FILENAME)
+        # Démarré une fois la boucle Tk lancée : la fin de l'initialisation n'est pas un blocage
+        self.after_idle(self.stall_watchdog.start)
+        self.backup_mirror = None
+        self._start_backup_mirror(self.settings.get('mirror_dir'))
+        self.after(DISK_WRITER_POLL_MS, self._poll_disk_writer)
 
         self.update_ui_after_restore_or_init() 
 
@@ -65,11 +2579,13 @@ class RaceTimerApp(tk.Tk):
         if restored_from_file and hasattr(self, 'notebook') and hasattr(self, 'timer_frame'):
             self.notebook.select(self.timer_frame)
 
+        self._startup_cache.save(self.disk_writer)
+        logging.info(f"Démarrage: données et interface prêtes en {(time.perf_counter() - self._startup_t0) * 1000:.0f} ms")
+        self.after_idle(lambda: logging.info(f"Démarrage: fenêtre affichée en {(time.perf_counter() - self._startup_t0) * 1000:.0f} ms"))
+
 
     def normalize_category_name_for_display_and_key(self, cat_name):
-        if isinstance(cat_name, str):
-            return cat_name.strip().capitalize() 
-        return "" 
+        return normalize_category_name(cat_name)
 
     def show_feedback(self, label_widget, message, color, duration=3000, parent_widget=None):
         _after_method = parent_widget.after if parent_widget else self.after
@@ -119,29 +2635,18 @@ class RaceTimerApp(tk.Tk):
             self._update_chrono_tab_for_category()
 
 
-        if hasattr(self, 'buf_list'): 
-            self.buf_list.delete(0, tk.END)
-            for i, time_obj in enumerate(self.buffer):
-                total_seconds = int(time_obj.total_seconds())
-                hours, remainder = divmod(total_seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                time_str = f"{hours:02}:{minutes:02}:{seconds:02}"
-                self.buf_list.insert(tk.END, f"{i + 1}. {time_str}")
+        self._refresh_buffer_listbox()
         
         if hasattr(self, 'lbl_time'):
             if self.start_time and self._running:
                  pass # Timer is updated by update_timer()
             elif self.start_time and not self._running: # Race was started but is now stopped
-                elapsed = datetime.datetime.now() - self.start_time 
-                total_seconds = int(elapsed.total_seconds()) 
-                hours, remainder = divmod(total_seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                self.lbl_time.config(text=f"{hours:02}:{minutes:02}:{seconds:02}")
+                self.clock_ticker.show_all(self._elapsed_timedelta().total_seconds())
             else: # Not started or reset
-                self.lbl_time.config(text="00:00:00")
+                self.clock_ticker.show_all(0)
 
         if self.current_category and self.participants:
-             self.filtered_participants_for_chrono = [p for p in self.participants if p['cat'] == self.current_category]
+             self.filtered_participants_for_chrono = self.participant_index.members(self.current_category)
         else:
              self.filtered_participants_for_chrono = []
 
@@ -150,21 +2655,135 @@ class RaceTimerApp(tk.Tk):
         state = {
             'start_time_iso': self.start_time.isoformat() if self.start_time else None,
             'buffer_seconds': [td.total_seconds() for td in self.buffer],
-            'rankings': [{'bib': r['bib'], 
-                          'time_seconds': r['time'].total_seconds() if r['time'] else None, 
-                          'abandon': r['abandon']} for r in self.rankings],
+            'bib_queue': list(self.reconciler.bibs),
+            'rankings': [{'bib': r.bib, 
+                          'time_seconds': r.time.total_seconds() if r.time else None, 
+                          'abandon': r.abandon} for r in self.rankings],
             'current_category': self.current_category, 
             '_running': self._running,
             'race_instance_counter': dict(self.race_instance_counter),
-            'last_imported_file_path': self.last_imported_file_path
+            'last_imported_file_path': self.last_imported_file_path,
+            'live_feed': self.live_feed.state() if self.live_feed else None,
+            'action_journal': self.action_journal.state() if self.action_journal else None,
+            'live_feed_options': {'ndjson': self.live_feed_ndjson, 'csv': self.live_feed_csv},
+            'team_size': self.team_size,
+            'start_offsets': {str(bib): seconds for bib, seconds in self.start_offsets.items()},
+            'arrival_analytics': self.arrival_analytics.state(),
         }
         try:
-            with RECOVERY_FILE.open('w') as f: 
-                json.dump(state, f, indent=4)
-            logging.info(f"État de la course sauvegardé dans {RECOVERY_FILE}")
+            # Write-behind: une sauvegarde encore en file est remplacée par la plus récente
+            self.disk_writer.replace(RECOVERY_FILE, json.dumps(state, indent=4), coalesce=True, callback=self._on_state_saved)
         except Exception as e:
             logging.error(f"Erreur lors de la sauvegarde de l'état : {e}")
 
+    def _on_state_saved(self, error):
+        if error is None: logging.info(f"État de la course sauvegardé dans {RECOVERY_FILE}")
+        else: logging.error(f"Erreur lors de la sauvegarde de l'état : {error}")
+
+    def _poll_disk_writer(self):
+        self.disk_writer.poll_acks()
+        pending = self.disk_writer.pending_count()
+        backed_up = pending >= DISK_BACKLOG_WARN_COUNT or self.disk_writer.oldest_pending_age() > DISK_BACKLOG_WARN_SECONDS
+        text = f"Écritures disque en attente: {pending}" if backed_up else ""
+        mirror_text = self._backup_mirror_status()
+        if mirror_text and not mirror_text.startswith("Miroir à jour"):
+            text = f"{text} - {mirror_text}" if text else mirror_text
+        if hasattr(self, 'mirror_status_label') and self.mirror_status_label.cget('text') != mirror_text:
+            self.mirror_status_label.config(text=mirror_text)
+        if hasattr(self, 'disk_backlog_label') and self.disk_backlog_label.cget('text') != text:
+            self.disk_backlog_label.config(text=text)
+        self.after(DISK_WRITER_POLL_MS, self._poll_disk_writer)
+
+    def _load_settings(self):
+        try:
+            return json.loads(SETTINGS_FILENAME.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Réglages {SETTINGS_FILENAME.name} illisibles, valeurs par défaut: {e}")
+            return {}
+
+    def _save_settings(self):
+        self.disk_writer.replace(SETTINGS_FILENAME, json.dumps(self.settings, ensure_ascii=False, indent=2), coalesce=True,
+                                 callback=lambda error: error and logging.error(f"Réglages non enregistrés: {error}"))
+
+    def _load_start_offsets(self):
+        try:
+            data = json.loads(START_OFFSETS_FILENAME.read_text(encoding='utf-8'))
+            return {int(bib): float(seconds) for bib, seconds in data.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"Décalages de départ {START_OFFSETS_FILENAME.name} illisibles, ignorés: {e}")
+            return {}
+
+    def _save_start_offsets(self):
+        data = {str(bib): seconds for bib, seconds in sorted(self.start_offsets.items())}
+        self.disk_writer.replace(START_OFFSETS_FILENAME, json.dumps(data, indent=2), coalesce=True,
+                                 callback=lambda error: error and logging.error(f"Décalages de départ non enregistrés: {error}"))
+
+    def _mirror_sources(self):
+        return [RECOVERY_FILE, CONFIG_FILENAME, LISTE_DEPARTS_FILENAME, START_OFFSETS_FILENAME, RESULTS_DIR]
+
+    def _start_backup_mirror(self, target):
+        if self.backup_mirror is not None:
+            self.backup_mirror.stop(timeout=0); self.backup_mirror = None
+        if not target: return
+        self.backup_mirror = BackupMirror(self._mirror_sources(), target)
+        self.backup_mirror.start()
+        logging.info(f"Miroir de secours actif vers {target} (passe toutes les {MIRROR_INTERVAL_SECONDS:.0f} s)")
+
+    def _backup_mirror_status(self):
+        mirror = self.backup_mirror
+        if mirror is None: return ""
+        if mirror.last_error is not None: return f"Miroir indisponible: {mirror.last_error}"
+        lag = mirror.lag()
+        if lag is None: return "Miroir: première copie en cours..."
+        if lag > MIRROR_LAG_WARN_SECONDS: return f"Miroir en retard ({lag:.0f} s)"
+        return f"Miroir à jour ({mirror.bytes_written // 1024} Ko écrits)"
+
+    def _choose_backup_mirror_dir(self):
+        folder = filedialog.askdirectory(parent=self, title="Dossier de la copie de secours (clé USB, partage)")
+        if not folder: return
+        target = pathlib.Path(folder).resolve()
+        for source in self._mirror_sources():
+            source = source.resolve()
+            if target == source or source in target.parents or target == BASE_PATH.resolve():
+                messagebox.showerror("Miroir", "Choisissez un dossier hors du dossier de l'application et du dossier résultats."); return
+        self.settings['mirror_dir'] = str(target)
+        self._save_settings()
+        self._start_backup_mirror(str(target))
+        self.mirror_dir_var.set(str(target))
+
+    def _disable_backup_mirror(self):
+        if self.backup_mirror is None: return
+        self.settings.pop('mirror_dir', None)
+        self._save_settings()
+        self._start_backup_mirror(None)
+        self.mirror_dir_var.set("(aucun)")
+        logging.info("Miroir de secours désactivé.")
+
+    def _known_categories(self):
+        return set(self.distances['h']) | set(self.distances['f']) | set(self.annees_categories) | set(self.dossards_categories)
+
+    def _set_participants(self, participants):
+        self.participants = participants
+        self.participant_index.rebuild(participants)
+        if self.current_category:
+            self.filtered_participants_for_chrono = self.participant_index.members(self.current_category)
+        self._rebuild_team_scores()
+
+    def _rebuild_team_scores(self):
+        self.team_scorer.rebuild(self.rankings, self.participant_index.by_bib, self.team_size, self.start_offsets)
+
+    def _participants_cache_key(self):
+        # La catégorie déduite de l'année dépend de categories.ini : le cache de la liste en tient compte
+        return tuple(sorted(self.annees_categories.items()))
+
+    def _log_import_issues(self, result):
+        for line_no, bib_s, message in result.issues:
+            logging.warning(f"Import {pathlib.Path(result.file_path).name} ligne {line_no} (dossard '{bib_s}'): {message}")
+
     def _load_participants_from_path_quiet(self, file_path_str, is_auto_load=False): 
         if not file_path_str :
             if not is_auto_load: logging.warning(f"Chemin du fichier participants non fourni.")
@@ -178,78 +2797,20 @@ class RaceTimerApp(tk.Tk):
                 messagebox.showerror("Erreur Import", f"Fichier non trouvé:\n{file_path}")
             return False
         
-        current_participants_before_load = []
-        possible_encodings = ('utf-8-sig', 'utf-8', 'cp1252', 'mbcs', 'latin-1')
-        # Prioritize semicolon as per user file example and write operations
-        common_delimiters = [';', ',']
-        loaded_successfully = False
-        
-        for encoding in possible_encodings:
-            if loaded_successfully: break
-            sniffed_delimiter = None
-            try: 
-                with file_path.open('r', encoding=encoding, newline='') as fs:
-                    sample = fs.read(2048) 
-                    if sample: 
-                        dialect = csv.Sniffer().sniff(sample, delimiters=''.join(common_delimiters))
-                        sniffed_delimiter = dialect.delimiter
-            except Exception: 
-                pass 
-
-            delimiters_to_try = [sniffed_delimiter] if sniffed_delimiter else common_delimiters
-            
-            for delimiter in delimiters_to_try:
-                try:
-                    temp_participants_this_attempt = []
-                    with file_path.open(newline='', encoding=encoding) as fc:
-                        reader = csv.DictReader(fc, delimiter=delimiter)
-                        if not reader.fieldnames: continue
-                        original_fieldnames = reader.fieldnames
-                        norm_to_orig_map = { (fn.strip().lower() if fn else ''): fn for fn in original_fieldnames} 
-                        
-                        bib_key = next((k for k in ['n° dossard', 'n. dossard', 'dossard', 'n','no dossard', 'no. dossard'] if k in norm_to_orig_map), None)
-                        nom_key = next((k for k in ['nom'] if k in norm_to_orig_map), None)
-                        prenom_key = next((k for k in ['prénom', 'prenom'] if k in norm_to_orig_map), None)
-                        sexe_key = next((k for k in ['sexe', 'sex'] if k in norm_to_orig_map), None)
-                        cat_key = next((k for k in ['catégorie', 'categorie', 'cat'] if k in norm_to_orig_map), None)
-
-                        bib_h_orig = norm_to_orig_map.get(bib_key) if bib_key else None
-                        nom_h_orig = norm_to_orig_map.get(nom_key) if nom_key else None
-                        prenom_h_orig = norm_to_orig_map.get(prenom_key) if prenom_key else None
-                        sexe_h_orig = norm_to_orig_map.get(sexe_key) if sexe_key else None
-                        cat_h_orig = norm_to_orig_map.get(cat_key) if cat_key else None
-
-                        if not all([bib_h_orig, nom_h_orig, prenom_h_orig, sexe_h_orig, cat_h_orig]): 
-                            if not is_auto_load: logging.warning(f"Headers manquants pour import ({file_path}) avec enc {encoding} delim '{delimiter}'. Fields: {original_fieldnames}")
-                            continue
-                        
-                        for row_idx, row in enumerate(reader):
-                            bib_s = (row.get(bib_h_orig) or '').strip()
-                            if not bib_s: 
-                                if all(not (row.get(h) or '').strip() for h in [nom_h_orig, prenom_h_orig, sexe_h_orig, cat_h_orig]):
-                                    continue 
-                            if not bib_s.isdigit(): 
-                                if not is_auto_load: logging.warning(f"Dossard non numérique ignoré (ligne {row_idx+2}): '{bib_s}'")
-                                continue
-                            nom_val = (row.get(nom_h_orig) or '').strip()
-                            prenom_val = (row.get(prenom_h_orig) or '').strip()
-                            sexe_val = (row.get(sexe_h_orig) or '').strip().lower() 
-                            cat_val = self.normalize_category_name_for_display_and_key(row.get(cat_h_orig)) 
-                            if not (nom_val and prenom_val and sexe_val and cat_val): 
-                                if not is_auto_load: logging.warning(f"Données manquantes pour dossard {bib_s} (ligne {row_idx+2}), ligne ignorée.")
-                                continue 
-                            temp_participants_this_attempt.append({'bib': int(bib_s), 'nom': nom_val, 'prenom': prenom_val, 'sexe': sexe_val, 'cat': cat_val})
-                    
-                    if temp_participants_this_attempt or not current_participants_before_load: 
-                        current_participants_before_load = temp_participants_this_attempt 
-                        loaded_successfully = True; break 
-                except Exception as e_inner_load: 
-                    if not is_auto_load: logging.debug(f"Erreur interne chargement participants (enc:{encoding}, delim:'{delimiter}'): {e_inner_load}")
-            if loaded_successfully: break
-        
-        if loaded_successfully:
-            self.participants = current_participants_before_load 
+        cache_key = self._participants_cache_key()
+        cached_participants = self._startup_cache.get('participants', file_path, cache_key)
+        if cached_participants is not None:
+            self._set_participants(list(cached_participants))
+            self.last_imported_file_path = str(file_path)
+            logging.info(f"{len(self.participants)} participants chargés depuis le cache ({file_path.name} inchangé)")
+            return True
+
+        result = read_participants_file(file_path, self.category_year_index, self._known_categories())
+        if result is not None:
+            if not is_auto_load: self._log_import_issues(result)
+            self._set_participants(result.participants)
             self.last_imported_file_path = str(file_path) 
+            self._startup_cache.put('participants', file_path, list(self.participants), cache_key)
             logging.info(f"{len(self.participants)} participants chargés depuis {file_path}")
             return True
         else:
@@ -258,6 +2819,90 @@ class RaceTimerApp(tk.Tk):
                 messagebox.showerror("Erreur Import", f"Impossible de lire le fichier {file_path.name}.\nVérifiez le format, le délimiteur (virgule ou point-virgule attendu) et l'encodage.")
             return False
 
+    def _start_background_import(self, file_path, on_done):
+        """Lance la lecture d'une liste de départ dans un thread ; on_done(result) est appelé sur le thread Tk."""
+        if self._import_job is not None:
+            messagebox.showinfo("Import en cours", "Un import est déjà en cours. Patientez ou annulez-le.")
+            return False
+        file_path = pathlib.Path(file_path)
+        if not file_path.exists():
+            messagebox.showerror("Erreur Import", f"Fichier non trouvé:\n{file_path}")
+            return False
+        year_index, known_categories = self.category_year_index, self._known_categories()
+        read = lambda progress, cancel_event: read_participants_file(file_path, year_index, known_categories,
+                                                                     progress_callback=progress, cancel_event=cancel_event)
+        return self._launch_import_job(file_path, read, on_done)
+
+    def _launch_import_job(self, file_path, read, on_done):
+        # read(progress_callback, cancel_event) s'exécute dans le thread d'import et retourne un ParticipantImport
+        events = queue.Queue()
+        cancel_event = threading.Event()
+
+        def worker():
+            try:
+                result = read(lambda fraction: events.put(('progress', fraction)), cancel_event)
+                report = None
+                if result is not None and result.issues and not result.cancelled:
+                    # Texte construit ici ; le fichier est mis en file d'écriture à la fin de l'import (thread Tk)
+                    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+                    result.report_path = str(RESULTS_DIR / f"rapport_import_{file_path.stem}_{stamp}.csv")
+                    report = result.report_text()
+                events.put(('done', (result, report)))
+            except Exception as e:
+                logging.exception(f"Erreur import en arrière-plan de {file_path}")
+                events.put(('error', e))
+
+        self._import_job = {'events': events, 'cancel': cancel_event, 'on_done': on_done, 'file_path': file_path}
+        if hasattr(self, 'import_progress_frame'):
+            self.import_progress_var.set(0)
+            self.import_progress_label.config(text=f"Import de {file_path.name}...")
+            self.import_progress_frame.pack(side='top', fill='x', pady=(5,0))
+        threading.Thread(target=worker, name="import-participants", daemon=True).start()
+        self.after(100, self._poll_background_import)
+        return True
+
+    def _cancel_background_import(self):
+        if self._import_job is not None:
+            self._import_job['cancel'].set()
+            if hasattr(self, 'import_progress_label'): self.import_progress_label.config(text="Annulation...")
+
+    def _poll_background_import(self):
+        job = self._import_job
+        if job is None: return
+        finished, result, report, error = False, None, None, None
+        try:
+            while True:
+                kind, payload = job['events'].get_nowait()
+                if kind == 'progress':
+                    if hasattr(self, 'import_progress_var'): self.import_progress_var.set(payload * 100)
+                elif kind == 'done':
+                    finished, (result, report) = True, payload
+                else:
+                    finished, error = True, payload
+        except queue.Empty:
+            pass
+        if not finished:
+            self.after(100, self._poll_background_import)
+            return
+        self._import_job = None
+        if hasattr(self, 'import_progress_frame'): self.import_progress_frame.pack_forget()
+        if result is not None and report is not None:
+            report_path = result.report_path
+            self.disk_writer.replace(report_path, report, encoding='utf-8-sig',
+                                     callback=lambda error: error and logging.error(f"Rapport d'import {report_path} non écrit: {error}"))
+        if error is not None:
+            messagebox.showerror("Erreur Import", f"Erreur pendant l'import de {job['file_path'].name}:\n{error}")
+            return
+        if result is None:
+            logging.error(f"Échec du chargement des participants depuis {job['file_path']}")
+            messagebox.showerror("Erreur Import", f"Impossible de lire le fichier {job['file_path'].name}.\nVérifiez le format, le délimiteur (virgule ou point-virgule attendu) et l'encodage.")
+            return
+        if result.cancelled:
+            logging.info(f"Import de {job['file_path']} annulé, liste actuelle conservée.")
+            messagebox.showinfo("Import Annulé", "Import annulé. La liste de participants actuelle est conservée.")
+            return
+        self._log_import_issues(result)
+        job['on_done'](result)
 
     def _auto_load_initial_participants(self):
         logging.info(f"Tentative de chargement automatique de: {LISTE_DEPARTS_FILENAME}")
@@ -274,24 +2919,33 @@ class RaceTimerApp(tk.Tk):
         if RECOVERY_FILE.exists(): 
             try:
                 if not messagebox.askyesno("Restauration de Session", "État précédent trouvé. Restaurer ?"):
-                    try: RECOVERY_FILE.unlink(missing_ok=True); logging.info(f"{RECOVERY_FILE} supprimé (refus restauration).")
-                    except Exception: pass
+                    self.disk_writer.delete(RECOVERY_FILE); logging.info(f"{RECOVERY_FILE} supprimé (refus restauration).")
                     return False 
                 with RECOVERY_FILE.open('r') as f: state = json.load(f) 
                 self.start_time = datetime.datetime.fromisoformat(state['start_time_iso']) if state['start_time_iso'] else None
-                self.buffer = [datetime.timedelta(seconds=s) for s in state['buffer_seconds']]
-                self.rankings = [{'bib': r['bib'], 'time': datetime.timedelta(seconds=r['time_seconds']) if r['time_seconds'] is not None else None, 'abandon': r['abandon']} for r in state['rankings']]
+                self._anchor_start_monotonic()
+                self.buffer = IndexedSequence(datetime.timedelta(seconds=s) for s in state['buffer_seconds'])
+                self.reconciler = FinishReconciler(self.buffer, state.get('bib_queue', []))
+                self.rankings = [Result(r['bib'], datetime.timedelta(seconds=r['time_seconds']) if r['time_seconds'] is not None else None, r['abandon']) for r in state['rankings']]
                 self.current_category = self.normalize_category_name_for_display_and_key(state.get('current_category')) 
                 self._running = state.get('_running', False)
                 self.race_instance_counter = defaultdict(int, state.get('race_instance_counter', {}))
                 self.last_imported_file_path = state.get('last_imported_file_path')
+                feed_options = state.get('live_feed_options', {})
+                self.live_feed_ndjson = feed_options.get('ndjson', True); self.live_feed_csv = feed_options.get('csv', False)
+                if state.get('live_feed'): self.live_feed = LiveResultsFeed.from_state(self.disk_writer, state['live_feed'])
+                if state.get('action_journal'): self.action_journal = ActionJournal.from_state(self.disk_writer, state['action_journal'])
+                self.team_size = state.get('team_size', TEAM_SIZE_DEFAULT)
+                if 'start_offsets' in state:
+                    self.start_offsets = {int(bib): seconds for bib, seconds in state['start_offsets'].items()}
+                self.arrival_analytics = ArrivalAnalytics.from_state(state.get('arrival_analytics', {}))
                 
                 self.load_config() 
                 
                 if self.last_imported_file_path:
                     if not self._load_participants_from_path_quiet(self.last_imported_file_path, is_auto_load=True): 
                          messagebox.showwarning("Info Restauration", "Impossible de recharger la dernière liste de participants. Veuillez l'importer manuellement.")
-                         self.participants = [] 
+                         self._set_participants([])
                 elif LISTE_DEPARTS_FILENAME.exists(): 
                     logging.info("Aucun chemin de fichier sauvegardé, tentative de chargement de liste_departs.csv pour la restauration.")
                     self._load_participants_from_path_quiet(str(LISTE_DEPARTS_FILENAME), is_auto_load=True)
@@ -299,21 +2953,25 @@ class RaceTimerApp(tk.Tk):
                      messagebox.showinfo("Info Restauration", "Aucun fichier de participants à recharger automatiquement. Importez manuellement si nécessaire.")
 
                 logging.info(f"État restauré depuis {RECOVERY_FILE}"); messagebox.showinfo("Restauration Réussie", "État précédent restauré.")
-                try: RECOVERY_FILE.unlink(missing_ok=True) 
-                except Exception as e: logging.error(f"Err suppression {RECOVERY_FILE}: {e}")
+                self.disk_writer.delete(RECOVERY_FILE)
                 return True 
             except Exception as e:
                 logging.error(f"Err restauration: {e}"); messagebox.showerror("Erreur Restauration", f"Err restauration: {e}")
-                try: RECOVERY_FILE.unlink(missing_ok=True)
-                except OSError: pass 
+                self.disk_writer.delete(RECOVERY_FILE)
                 return False 
         return False 
 
     def on_closing(self):
+        self.stall_watchdog.stop() # L'attente du disque ci-dessous est voulue, ce n'est pas un blocage
         if self._running or self.buffer or self.rankings or self.start_time: self.save_state()
         elif RECOVERY_FILE.exists(): 
-             try: RECOVERY_FILE.unlink(missing_ok=True); logging.info(f"Nettoyage {RECOVERY_FILE} (fermeture).")
-             except Exception as e: logging.error(f"Err nettoyage {RECOVERY_FILE}: {e}")
+             self.disk_writer.delete(RECOVERY_FILE); logging.info(f"Nettoyage {RECOVERY_FILE} (fermeture).")
+        self._startup_cache.save(self.disk_writer)
+        # Seul endroit où l'on attend le disque: ne pas perdre les écritures encore en file
+        if not self.disk_writer.flush(timeout=15):
+            logging.error(f"Fermeture: {self.disk_writer.pending_count()} écriture(s) disque non terminée(s).")
+        self.disk_writer.stop()
+        if self.backup_mirror is not None: self.backup_mirror.stop() # Dernière passe après les écritures finales
         self.destroy()
 
     def load_config(self):
@@ -321,6 +2979,7 @@ class RaceTimerApp(tk.Tk):
         config.optionxform = str 
         self.distances = {'h': {}, 'f': {}} 
         self.annees_categories = {}
+        self.dossards_categories = {}
         # self.tours_categories = {} # Supprimé
         
         logging.info(f"Tentative de chargement du fichier de configuration depuis: {CONFIG_FILENAME.resolve()}")
@@ -335,6 +2994,13 @@ class RaceTimerApp(tk.Tk):
             messagebox.showerror("Erreur Config", f"Fichier '{CONFIG_FILENAME.name}' introuvable à l'emplacement attendu:\n{CONFIG_FILENAME.parent}")
             return
 
+        cached_config = self._startup_cache.get('config', CONFIG_FILENAME)
+        if cached_config is not None:
+            self.distances, self.annees_categories, self.dossards_categories = cached_config
+            logging.info(f"Config chargée depuis le cache ({CONFIG_FILENAME.name} inchangé).")
+            self._rebuild_category_year_index()
+            return
+
         try:
             read_files = config.read(CONFIG_FILENAME, encoding='utf-8')
             if not read_files: 
@@ -347,25 +3013,62 @@ class RaceTimerApp(tk.Tk):
                 messagebox.showerror("Erreur Config", f"Impossible de lire '{CONFIG_FILENAME.name}'.")
                 return
             
-            for section_name in config.sections():
-                normalized_cat_name = self.normalize_category_name_for_display_and_key(section_name)
-                if not normalized_cat_name: continue
-
-                if config.has_option(section_name, 'distance_h'):
-                    self.distances['h'][normalized_cat_name] = float(config.get(section_name, 'distance_h'))
-                if config.has_option(section_name, 'distance_f'):
-                    self.distances['f'][normalized_cat_name] = float(config.get(section_name, 'distance_f'))
-                if config.has_option(section_name, 'annees'): 
-                    self.annees_categories[normalized_cat_name] = config.get(section_name, 'annees')
-                
-                # Logic for nb_tours_h and nb_tours_f removed
-
+            self._apply_config(config)
             logging.info(f"Config loaded successfully from '{CONFIG_FILENAME}'. Distances: {self.distances}, Annees: {self.annees_categories}")
+            self._startup_cache.put('config', CONFIG_FILENAME, (self.distances, self.annees_categories, self.dossards_categories))
         except Exception as e:
             logging.exception(f"Erreur chargement {CONFIG_FILENAME}"); messagebox.showerror("Erreur config", f"Erreur {CONFIG_FILENAME.name}: {e}")
             self.distances = {'h': {}, 'f': {}}
             self.annees_categories = {}
-            # self.tours_categories = {} # Supprimé
+            self.dossards_categories = {}
+            self._rebuild_category_year_index()
+
+    def _apply_config(self, config):
+        """Applique un ConfigParser déjà lu (fichier ou contenu en attente d'écriture) aux catégories en mémoire."""
+        self.distances = {'h': {}, 'f': {}}
+        self.annees_categories = {}
+        self.dossards_categories = {}
+        for section_name in config.sections():
+            normalized_cat_name = self.normalize_category_name_for_display_and_key(section_name)
+            if not normalized_cat_name: continue
+
+            if config.has_option(section_name, 'distance_h'):
+                self.distances['h'][normalized_cat_name] = float(config.get(section_name, 'distance_h'))
+            if config.has_option(section_name, 'distance_f'):
+                self.distances['f'][normalized_cat_name] = float(config.get(section_name, 'distance_f'))
+            if config.has_option(section_name, 'annees'): 
+                self.annees_categories[normalized_cat_name] = config.get(section_name, 'annees')
+            if config.has_option(section_name, 'dossards'):
+                self.dossards_categories[normalized_cat_name] = config.get(section_name, 'dossards')
+            
+            # Logic for nb_tours_h and nb_tours_f removed
+        self._rebuild_category_year_index()
+
+    def _read_config_for_update(self):
+        """ConfigParser à modifier: le contenu encore en file d'écriture prime sur le fichier."""
+        config = configparser.ConfigParser()
+        config.optionxform = str 
+        if self._pending_config_text is not None:
+            config.read_string(self._pending_config_text)
+        elif CONFIG_FILENAME.exists():
+            config.read(CONFIG_FILENAME, encoding='utf-8')
+        return config
+
+    def _on_config_written(self, text, error):
+        if self._pending_config_text == text: self._pending_config_text = None
+        if error is not None:
+            logging.error(f"Erreur sauvegarde {CONFIG_FILENAME}: {error}")
+            messagebox.showerror("Erreur Config", f"Impossible d'écrire {CONFIG_FILENAME.name}:\n{error}")
+        else:
+            logging.info(f"{CONFIG_FILENAME} écrit sur disque.")
+
+    def _rebuild_category_year_index(self):
+        self.category_year_index = CategoryYearIndex(self.annees_categories)
+        for issue in self.category_year_index.validate():
+            logging.warning(f"Catégories/années ({CONFIG_FILENAME.name}): {issue}")
+        self.bib_range_index = BibRangeIndex(self.dossards_categories)
+        for issue in self.bib_range_index.validate():
+            logging.warning(f"Plages de dossards ({CONFIG_FILENAME.name}): {issue}")
 
     def create_widgets(self):
         main_app_frame = ttk.Frame(self)
@@ -384,20 +3087,42 @@ class RaceTimerApp(tk.Tk):
         
         self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
         
-        self.setup_inscriptions_tab() 
-        self.setup_liste_participants_tab() 
+        # Les onglets sont construits à leur première sélection, sauf le Chrono (chrono, buffer et restauration en dépendent)
+        self._tab_builders = {str(self.inscriptions_frame): self.setup_inscriptions_tab,
+                              str(self.liste_participants_frame): self._build_liste_participants_tab,
+                              str(self.export_frame): self.setup_export_tab}
         self.setup_timer_tab()
-        self.setup_export_tab()
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_notebook_tab_changed)
+        self.after_idle(self._on_notebook_tab_changed) # Onglet affiché au démarrage (le Chrono après une restauration)
         
         current_year = datetime.datetime.now().year
         copyright_label = ttk.Label(main_app_frame, text=f"© Rihen {current_year}", anchor='center')
         copyright_label.pack(side='bottom', fill='x', pady=5)
+        # Indicateur affiché uniquement quand la file d'écriture disque prend du retard (disque lent, synchro cloud)
+        self.disk_backlog_label = ttk.Label(main_app_frame, text="", foreground="orange", anchor='center')
+        self.disk_backlog_label.pack(side='bottom', fill='x')
+
+    def _on_notebook_tab_changed(self, event=None):
+        builder = self._tab_builders.pop(self.notebook.select(), None)
+        if builder is None: return
+        t0 = time.perf_counter()
+        builder()
+        logging.debug(f"Onglet {self.notebook.tab(self.notebook.select(), 'text')} construit en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    def _show_popup(self, popup, focus_widget=None):
+        popup.deiconify(); popup.lift(); popup.grab_set()
+        if focus_widget is not None: focus_widget.focus()
+
+    def _hide_popup(self, popup):
+        # Masqué plutôt que détruit : la prochaine ouverture ne reconstruit ni les widgets ni les lignes
+        popup.grab_release(); popup.withdraw()
 
     def _populate_all_category_comboboxes(self):
         all_config_cats = set()
         all_config_cats.update(self.distances['h'].keys())
         all_config_cats.update(self.distances['f'].keys())
         all_config_cats.update(self.annees_categories.keys())
+        all_config_cats.update(self.dossards_categories.keys())
         # all_config_cats.update(self.tours_categories.keys()) # Supprimé
         defined_categories = sorted(list(all_config_cats))
 
@@ -411,11 +3136,12 @@ class RaceTimerApp(tk.Tk):
                  except tk.TclError: self.insc_categorie_combo.set('')
             else:
                 self.insc_categorie_combo.set('')
+            self._suggest_next_bib()
         
         if hasattr(self, 'cat_combo'):
             chrono_cats_display = []
             if self.participants: 
-                chrono_cats_display = sorted(list(set(p['cat'] for p in self.participants if p['cat'])))
+                chrono_cats_display = self.participant_index.categories()
             elif defined_categories: 
                 chrono_cats_display = defined_categories
             
@@ -439,6 +3165,9 @@ class RaceTimerApp(tk.Tk):
         ttk.Label(form_frame, text="N° Dossard:").grid(row=0, column=0, padx=5, pady=5, sticky='w')
         self.insc_dossard_entry = ttk.Entry(form_frame, width=10)
         self.insc_dossard_entry.grid(row=0, column=1, padx=5, pady=5, sticky='ew')
+        self.insc_bib_hint_label = ttk.Label(form_frame, text="", foreground="grey")
+        self.insc_bib_hint_label.grid(row=0, column=2, padx=5, pady=5, sticky='w')
+        self._suggested_bib = None
         ttk.Label(form_frame, text="Nom:").grid(row=1, column=0, padx=5, pady=5, sticky='w')
         self.insc_nom_entry = ttk.Entry(form_frame, width=30)
         self.insc_nom_entry.grid(row=1, column=1, padx=5, pady=5, sticky='ew')
@@ -450,14 +3179,19 @@ class RaceTimerApp(tk.Tk):
         self.insc_sexe_combo = ttk.Combobox(form_frame, textvariable=self.insc_sexe_var, values=['h', 'f'], width=8, state="readonly")
         self.insc_sexe_combo.grid(row=3, column=1, padx=5, pady=5, sticky='ew')
         self.insc_sexe_combo.current(0) 
+        ttk.Label(form_frame, text="Année naissance:").grid(row=4, column=0, padx=5, pady=5, sticky='w')
+        self.insc_annee_entry = ttk.Entry(form_frame, width=10)
+        self.insc_annee_entry.grid(row=4, column=1, padx=5, pady=5, sticky='w')
+        self.insc_annee_entry.bind("<KeyRelease>", self._on_insc_annee_changed)
 
         cat_insc_frame = ttk.Frame(form_frame)
-        cat_insc_frame.grid(row=4, column=1, padx=5, pady=5, sticky='ew')
+        cat_insc_frame.grid(row=5, column=1, padx=5, pady=5, sticky='ew')
         self.insc_categorie_combo = ttk.Combobox(cat_insc_frame, width=27, state="readonly") 
         self.insc_categorie_combo.pack(side="left", expand=True, fill="x")
+        self.insc_categorie_combo.bind("<<ComboboxSelected>>", self._suggest_next_bib)
         manage_cat_button = ttk.Button(cat_insc_frame, text="Gérer", command=self._open_manage_categories_popup, width=8)
         manage_cat_button.pack(side="left", padx=(5,0))
-        ttk.Label(form_frame, text="Catégorie:").grid(row=4, column=0, padx=5, pady=5, sticky='w')
+        ttk.Label(form_frame, text="Catégorie:").grid(row=5, column=0, padx=5, pady=5, sticky='w')
         
         form_frame.columnconfigure(1, weight=1) 
         self.insc_feedback_label = ttk.Label(self.inscriptions_frame, text="")
@@ -470,8 +3204,102 @@ class RaceTimerApp(tk.Tk):
         self._populate_all_category_comboboxes() 
 
 
+    def _on_insc_annee_changed(self, event=None):
+        annee_txt = self.insc_annee_entry.get().strip()
+        if not (len(annee_txt) == 4 and annee_txt.isdigit()): return
+        candidates = self.category_year_index.lookup(int(annee_txt))
+        if not candidates:
+            self.show_feedback(self.insc_feedback_label, f"Aucune catégorie pour l'année {annee_txt}.", "orange"); return
+        if candidates[0] in self.insc_categorie_combo['values']:
+            self.insc_categorie_combo.set(candidates[0])
+            self._suggest_next_bib()
+        if len(candidates) > 1:
+            self.show_feedback(self.insc_feedback_label, f"Année {annee_txt}: plusieurs catégories possibles ({', '.join(candidates)}).", "orange")
+
+    def _start_list_file_bibs(self):
+        """Dossards de liste_departs.csv quand la liste chargée vient d'un autre fichier (None sinon).
+
+        Le fichier n'est relu que s'il a changé (taille, date) depuis la dernière lecture."""
+        if self.last_imported_file_path and pathlib.Path(self.last_imported_file_path) == LISTE_DEPARTS_FILENAME:
+            return None
+        try:
+            stat = LISTE_DEPARTS_FILENAME.stat()
+        except FileNotFoundError:
+            return None
+        stat_key = (stat.st_size, stat.st_mtime_ns)
+        cached = getattr(self, '_start_list_file_bib_cache', None)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+        bibs = BibAllocator()
+        try:
+            with LISTE_DEPARTS_FILENAME.open('r', newline='', encoding='utf-8-sig') as f_read:
+                # Même délimiteur que l'écriture (';' pour les fichiers de l'application, ',' pour certains exports)
+                reader = csv.reader(f_read, delimiter=sniff_csv_delimiter(f_read.read(2048)))
+                f_read.seek(0)
+                header = next(reader, None)
+                normalized = [column.strip().lower() for column in header] if header else []
+                dossard_col_index = next((normalized.index(alias) for alias in BIB_HEADER_ALIASES if alias in normalized), None)
+                if dossard_col_index is None:
+                    dossard_col_index = 0
+                    if header and header[0].strip().isdigit():
+                        bibs.add(int(header[0].strip())) # Pas d'en-tête: la première ligne est un participant
+                for row in reader:
+                    if row and len(row) > dossard_col_index and row[dossard_col_index].strip().isdigit():
+                        bibs.add(int(row[dossard_col_index].strip()))
+        except Exception as e:
+            logging.error(f"Erreur lors de la vérification des dossards dans {LISTE_DEPARTS_FILENAME}: {e}")
+        self._start_list_file_bib_cache = (stat_key, bibs)
+        return bibs
+
+    def _bib_taken(self, bib):
+        file_bibs = self._start_list_file_bibs()
+        return bib in self.participant_index.bibs or (file_bibs is not None and bib in file_bibs)
+
+    def _next_free_bib(self, low, high):
+        allocators = [self.participant_index.bibs]
+        file_bibs = self._start_list_file_bibs()
+        if file_bibs is not None: allocators.append(file_bibs)
+        candidate = low
+        while candidate is not None:
+            # Point fixe: chaque ensemble repousse le candidat au-delà de son intervalle pris
+            moved = candidate
+            for bibs in allocators:
+                moved = bibs.next_free(moved, high)
+                if moved is None: return None
+            if moved == candidate: return candidate
+            candidate = moved
+        return None
+
+    def _suggest_next_bib(self, event=None):
+        """Affiche (et pré-remplit si le champ est vide) le prochain dossard libre de la plage de la catégorie choisie."""
+        if not hasattr(self, 'insc_bib_hint_label'): return
+        bib_range = self.bib_range_index.range_of(self.insc_categorie_combo.get())
+        current = self.insc_dossard_entry.get().strip()
+        if bib_range is None:
+            self.insc_bib_hint_label.config(text="", foreground="grey")
+            if current and current == self._suggested_bib: self.insc_dossard_entry.delete(0, tk.END)
+            self._suggested_bib = None
+            return
+        low, high = bib_range
+        bib = self._next_free_bib(low, high)
+        if bib is None:
+            self.insc_bib_hint_label.config(text=f"Plage {low}-{high} complète", foreground="orange")
+            if current and current == self._suggested_bib: self.insc_dossard_entry.delete(0, tk.END)
+            self._suggested_bib = None
+            return
+        self.insc_bib_hint_label.config(text=f"Prochain libre: {bib} (plage {low}-{high})", foreground="grey")
+        if not current or current == self._suggested_bib:
+            self.insc_dossard_entry.delete(0, tk.END); self.insc_dossard_entry.insert(0, str(bib))
+        self._suggested_bib = str(bib)
+
     def _open_manage_categories_popup(self):
-        popup = tk.Toplevel(self)
+        if self.cat_popup is not None and self.cat_popup.winfo_exists():
+            for var in self.cat_popup_entry_vars: var.set('')
+            self.cat_popup_feedback_label.config(text="")
+            self._refresh_cat_popup_tree()
+            self._show_popup(self.cat_popup, self.cat_popup_focus)
+            return
+        popup = self.cat_popup = tk.Toplevel(self)
         popup.title("Gérer les Catégories et Informations")
         popup.geometry("700x400") 
         popup.transient(self)
@@ -480,7 +3308,7 @@ class RaceTimerApp(tk.Tk):
         tree_frame = ttk.Frame(popup, padding=(10,10,10,5)) 
         tree_frame.pack(expand=True, fill='both')
         
-        cols = ('Catégorie', 'Années', 'Dist. H (m)', 'Dist. F (m)')
+        cols = ('Catégorie', 'Années', 'Dist. H (m)', 'Dist. F (m)', 'Dossards')
         self.cat_popup_tree = ttk.Treeview(tree_frame, columns=cols, show='headings', height=7)
         
         self.cat_popup_tree.heading('Catégorie', text='Catégorie')
@@ -491,6 +3319,8 @@ class RaceTimerApp(tk.Tk):
         self.cat_popup_tree.column('Dist. H (m)', width=100, anchor='w')
         self.cat_popup_tree.heading('Dist. F (m)', text='Dist. F (m)')
         self.cat_popup_tree.column('Dist. F (m)', width=100, anchor='w')
+        self.cat_popup_tree.heading('Dossards', text='Dossards')
+        self.cat_popup_tree.column('Dossards', width=90, anchor='w')
         
         tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.cat_popup_tree.yview)
         self.cat_popup_tree.configure(yscrollcommand=tree_scrollbar.set)
@@ -519,57 +3349,43 @@ class RaceTimerApp(tk.Tk):
         dist_f_entry_var = tk.StringVar()
         dist_f_entry = ttk.Entry(edit_frame, textvariable=dist_f_entry_var, width=15)
         dist_f_entry.grid(row=1, column=3, padx=5, pady=3, sticky='ew')
+
+        ttk.Label(edit_frame, text="Dossards (ex: 1-99):").grid(row=2, column=0, padx=5, pady=3, sticky='w')
+        dossards_entry_var = tk.StringVar()
+        dossards_entry = ttk.Entry(edit_frame, textvariable=dossards_entry_var, width=15)
+        dossards_entry.grid(row=2, column=1, padx=5, pady=3, sticky='ew')
         
         edit_frame.columnconfigure(1, weight=1)
         edit_frame.columnconfigure(3, weight=1)
 
-        feedback_cat_popup_label = ttk.Label(edit_frame, text="")
-        feedback_cat_popup_label.grid(row=2, column=0, columnspan=4, pady=5, sticky='ew') 
-
-        def populate_cat_popup_tree_detailed():
-            for i in self.cat_popup_tree.get_children():
-                self.cat_popup_tree.delete(i)
-            
-            all_cats = sorted(list(set(
-                list(self.distances['h'].keys()) + 
-                list(self.distances['f'].keys()) +
-                list(self.annees_categories.keys())
-            )))
-
-            for cat_norm in all_cats:
-                dist_h = self.distances['h'].get(cat_norm, "")
-                dist_f = self.distances['f'].get(cat_norm, "")
-                annees_info = self.annees_categories.get(cat_norm, "") 
-                
-                dist_h_str = f"{int(dist_h)}" if isinstance(dist_h, (int, float)) else ""
-                dist_f_str = f"{int(dist_f)}" if isinstance(dist_f, (int, float)) else ""
-                
-                self.cat_popup_tree.insert('', tk.END, values=(cat_norm, annees_info, dist_h_str, dist_f_str))
-
+        feedback_cat_popup_label = self.cat_popup_feedback_label = ttk.Label(edit_frame, text="")
+        feedback_cat_popup_label.grid(row=3, column=0, columnspan=4, pady=5, sticky='ew') 
+        self.cat_popup_entry_vars = (cat_name_entry_var, annees_entry_var, dist_h_entry_var, dist_f_entry_var, dossards_entry_var)
+        self.cat_popup_focus = cat_name_entry
+        self._cat_popup_rows = {}
 
         def on_tree_select_popup(event):
             selected_item = self.cat_popup_tree.focus()
             if selected_item:
                 values = self.cat_popup_tree.item(selected_item, 'values')
-                if len(values) == 4: 
+                if len(values) == 5: 
                     cat_name_entry_var.set(values[0])    
                     annees_entry_var.set(values[1])      
                     dist_h_entry_var.set(values[2] if values[2] != "N/A" else "") 
                     dist_f_entry_var.set(values[3] if values[3] != "N/A" else "") 
+                    dossards_entry_var.set(values[4])
                 else: # Should not happen with corrected populate function
-                    cat_name_entry_var.set('')
-                    annees_entry_var.set('')
-                    dist_h_entry_var.set('')
-                    dist_f_entry_var.set('')
+                    for var in self.cat_popup_entry_vars: var.set('')
 
         self.cat_popup_tree.bind('<<TreeviewSelect>>', on_tree_select_popup)
-        populate_cat_popup_tree_detailed()
+        self._refresh_cat_popup_tree()
 
         def save_category_action_popup():
             cat_name_raw = cat_name_entry_var.get()
             dist_h_str = dist_h_entry_var.get()
             dist_f_str = dist_f_entry_var.get()
             annees_str = annees_entry_var.get() 
+            dossards_str = dossards_entry_var.get().strip()
             
             cat_name_normalized = self.normalize_category_name_for_display_and_key(cat_name_raw)
 
@@ -581,11 +3397,10 @@ class RaceTimerApp(tk.Tk):
                 dist_f = float(dist_f_str) if dist_f_str else None
             except ValueError:
                 self.show_feedback(feedback_cat_popup_label, "Distances doivent être numériques.", "red", parent_widget=popup); return
+            if dossards_str and parse_bib_range(dossards_str) is None:
+                self.show_feedback(feedback_cat_popup_label, "Plage de dossards invalide (ex: 1-99).", "red", parent_widget=popup); return
 
-            config = configparser.ConfigParser()
-            config.optionxform = str 
-            if CONFIG_FILENAME.exists():
-                config.read(CONFIG_FILENAME, encoding='utf-8')
+            config = self._read_config_for_update()
 
             section_name = cat_name_normalized 
             if not config.has_section(section_name):
@@ -599,6 +3414,9 @@ class RaceTimerApp(tk.Tk):
             
             if annees_str: config.set(section_name, 'annees', annees_str) 
             else: config.remove_option(section_name, 'annees', fallback=None)
+
+            if dossards_str: config.set(section_name, 'dossards', dossards_str)
+            else: config.remove_option(section_name, 'dossards', fallback=None)
             
             # Ensure old tour-related keys are removed
             config.remove_option(section_name, 'nb_tours', fallback=None)
@@ -607,18 +3425,24 @@ class RaceTimerApp(tk.Tk):
             config.remove_option(section_name, 'age_info', fallback=None) # Also remove old 'age_info' key
 
             try:
-                with CONFIG_FILENAME.open('w', encoding='utf-8') as configfile:
-                    config.write(configfile)
+                config_buffer = io.StringIO()
+                config.write(config_buffer)
+                config_text = self._pending_config_text = config_buffer.getvalue()
+                self.disk_writer.replace(CONFIG_FILENAME, config_text, coalesce=True,
+                                         callback=lambda error, text=config_text: self._on_config_written(text, error))
                 self.show_feedback(feedback_cat_popup_label, f"Catégorie '{cat_name_raw}' enregistrée!", "green", parent_widget=popup)
                 logging.info(f"Catégorie '{cat_name_raw}' (normalisée: {cat_name_normalized}) sauvegardée dans {CONFIG_FILENAME}")
                 
-                self.load_config() 
+                self._apply_config(config) # Appliqué en mémoire, sans attendre ni relire le fichier
+                year_issues = self.category_year_index.validate() + self.bib_range_index.validate()
+                if year_issues:
+                    self.show_feedback(feedback_cat_popup_label, f"Catégorie '{cat_name_raw}' enregistrée. Attention: {year_issues[0]}", "orange", duration=6000, parent_widget=popup)
                 self._populate_all_category_comboboxes() 
                 self._update_chrono_tab_for_category() 
-                populate_cat_popup_tree_detailed() 
+                self._refresh_cat_popup_tree() 
 
                 cat_name_entry_var.set(''); dist_h_entry_var.set(''); dist_f_entry_var.set('')
-                annees_entry_var.set(''); 
+                annees_entry_var.set(''); dossards_entry_var.set('')
                 self.cat_popup_tree.selection_remove(self.cat_popup_tree.focus()) 
 
             except Exception as e:
@@ -628,10 +3452,22 @@ class RaceTimerApp(tk.Tk):
         button_frame_popup = ttk.Frame(popup) 
         button_frame_popup.pack(pady=10)
         ttk.Button(button_frame_popup, text="Enregistrer/Modifier", command=save_category_action_popup).pack(side='left', padx=5)
-        ttk.Button(button_frame_popup, text="Fermer", command=popup.destroy).pack(side='left', padx=5)
+        ttk.Button(button_frame_popup, text="Fermer", command=lambda: self._hide_popup(popup)).pack(side='left', padx=5)
+        popup.protocol("WM_DELETE_WINDOW", lambda: self._hide_popup(popup))
         
         cat_name_entry.focus()
 
+    def _refresh_cat_popup_tree(self):
+        rows = []
+        for cat_norm in sorted(self._known_categories()):
+            dist_h = self.distances['h'].get(cat_norm, "")
+            dist_f = self.distances['f'].get(cat_norm, "")
+            dist_h_str = f"{int(dist_h)}" if isinstance(dist_h, (int, float)) else ""
+            dist_f_str = f"{int(dist_f)}" if isinstance(dist_f, (int, float)) else ""
+            rows.append((cat_norm, (cat_norm, self.annees_categories.get(cat_norm, ""), dist_h_str, dist_f_str,
+                                    self.dossards_categories.get(cat_norm, ""))))
+        self._sync_tree_rows(self.cat_popup_tree, rows, self._cat_popup_rows)
+
 
     def add_participant_to_csv(self):
         dossard_str = self.insc_dossard_entry.get().strip()
@@ -646,57 +3482,78 @@ class RaceTimerApp(tk.Tk):
             self.show_feedback(self.insc_feedback_label, "Le N° Dossard doit être un nombre.", "red"); return
         
         dossard_to_add = int(dossard_str)
+        annee_txt = self.insc_annee_entry.get().strip()
+        annee = parse_birth_year(annee_txt) if annee_txt else None
+        if annee_txt and (annee is None or len(annee_txt) != 4):
+            self.show_feedback(self.insc_feedback_label, "L'année de naissance doit comporter 4 chiffres.", "red"); return
+
+        if self._bib_taken(dossard_to_add):
+            messagebox.showwarning("Dossard Existant", f"Le dossard N°{dossard_str} est déjà utilisé. Veuillez en choisir un autre.")
+            self.insc_dossard_entry.focus()
+            return
 
-        # Vérifier si le dossard existe déjà dans liste_departs.csv
-        if LISTE_DEPARTS_FILENAME.exists():
-            try:
-                with LISTE_DEPARTS_FILENAME.open('r', newline='', encoding='utf-8-sig') as f_read:
-                    reader = csv.reader(f_read, delimiter=',') 
-                    header = next(reader, None) 
-                    if header: # Check if header exists
-                        try:
-                            dossard_col_index = header.index('N° Dossard')
-                        except ValueError: # If 'N° Dossard' is not in header, assume it's the first column
-                            dossard_col_index = 0 
-                            logging.warning("En-tête 'N° Dossard' non trouvé dans liste_departs.csv, utilisation de la première colonne pour la vérification des dossards.")
-                    else: # No header, assume first column
-                        dossard_col_index = 0
-                        # Rewind file to read from beginning if there was no header
-                        f_read.seek(0)
-                        reader = csv.reader(f_read, delimiter=',') # Re-initialize reader
-
-                    for row in reader:
-                        if row and len(row) > dossard_col_index and row[dossard_col_index].strip() == dossard_str:
-                            messagebox.showwarning("Dossard Existant", f"Le dossard N°{dossard_str} est déjà utilisé. Veuillez en choisir un autre.")
-                            self.insc_dossard_entry.focus()
-                            return
-            except Exception as e:
-                logging.error(f"Erreur lors de la vérification du dossard dans {LISTE_DEPARTS_FILENAME}: {e}")
-                # Consider not blocking the add if file is unreadable for check, but log it.
+        bib_range = self.bib_range_index.range_of(categorie_selected)
+        owner = self.bib_range_index.owner(dossard_to_add)
+        if bib_range is not None and not bib_range[0] <= dossard_to_add <= bib_range[1]:
+            out_of_range = f"Le dossard N°{dossard_str} est hors de la plage {bib_range[0]}-{bib_range[1]} réservée à '{categorie_selected}'."
+        elif owner is not None and owner != categorie_selected:
+            out_of_range = f"Le dossard N°{dossard_str} est dans la plage réservée à '{owner}'."
+        else:
+            out_of_range = None
+        if out_of_range and not messagebox.askyesno("Plage de Dossards", f"{out_of_range}\nL'inscrire quand même ?"):
+            self.insc_dossard_entry.focus()
+            return
 
-        participant_data = [dossard_str, nom, prenom, sexe, categorie_selected] 
+        participant = Participant(dossard_to_add, nom, prenom, sexe, categorie_selected, annee)
         
-        file_exists_for_write = LISTE_DEPARTS_FILENAME.exists()
+        def append_participant_row(path=LISTE_DEPARTS_FILENAME):
+            # Exécuté sur le thread d'écriture: délimiteur et colonnes dépendent de l'état du fichier au moment de l'écriture
+            append_participant_csv_row(path, participant)
+
+        def on_appended(error):
+            if error is not None:
+                self.show_feedback(self.insc_feedback_label, f"Erreur écriture CSV: {error}", "red")
+                logging.error(f"Erreur écriture {LISTE_DEPARTS_FILENAME}: {error}")
+            else:
+                logging.info(f"Participant {dossard_str} écrit dans {LISTE_DEPARTS_FILENAME}")
+                if reload_after_write: self._reload_liste_departs_csv(show_success_message=False)
+
+        # Liste chargée depuis un autre fichier: on relit liste_departs.csv une fois la ligne écrite
+        reload_after_write = not (self.last_imported_file_path and pathlib.Path(self.last_imported_file_path) == LISTE_DEPARTS_FILENAME)
         try:
-            with LISTE_DEPARTS_FILENAME.open('a', newline='', encoding='utf-8-sig') as f_append:
-                writer = csv.writer(f_append, delimiter=',') 
-                if not file_exists_for_write or LISTE_DEPARTS_FILENAME.stat().st_size == 0: 
-                    writer.writerow(['N° Dossard', 'Nom', 'Prénom', 'Sexe', 'Catégorie'])
-                writer.writerow(participant_data)
+            self.disk_writer.call(append_participant_row, callback=on_appended)
             
             self.show_feedback(self.insc_feedback_label, f"Participant {dossard_str} ajouté à {LISTE_DEPARTS_FILENAME.name}!", "green")
             self.insc_dossard_entry.delete(0, tk.END); self.insc_nom_entry.delete(0, tk.END)
             self.insc_prenom_entry.delete(0, tk.END); self.insc_sexe_combo.current(0)
+            self.insc_annee_entry.delete(0, tk.END)
             if self.insc_categorie_combo['values']: self.insc_categorie_combo.current(0)
             else: self.insc_categorie_combo.set('')
-            logging.info(f"Participant {dossard_str} ajouté à {LISTE_DEPARTS_FILENAME}")
+            logging.info(f"Participant {dossard_str} ajouté à {LISTE_DEPARTS_FILENAME} (écriture en file)")
             
-            self._reload_liste_departs_csv(show_success_message=False) 
+            if not reload_after_write:
+                # Ajout incrémental: seule la catégorie concernée est invalidée, pas de relecture du CSV
+                self._add_loaded_participant(participant)
+            else:
+                file_bibs = self._start_list_file_bibs()
+                if file_bibs is not None: file_bibs.add(dossard_to_add) # Ligne en file d'écriture: déjà prise
+                self._suggest_next_bib()
 
         except Exception as e:
             self.show_feedback(self.insc_feedback_label, f"Erreur écriture CSV: {e}", "red")
             logging.error(f"Erreur écriture {LISTE_DEPARTS_FILENAME}: {e}")
 
+    def _add_loaded_participant(self, participant):
+        self.participants.append(participant)
+        self.participant_index.add(participant)
+        if participant.cat == self.current_category:
+            self.filtered_participants_for_chrono = self.participant_index.members(self.current_category)
+        if hasattr(self, 'tree') and self._participant_matches_search(participant):
+            self.tree.insert('', tk.END, iid=str(participant.bib), values=(participant.bib, participant.nom, participant.prenom, participant.sexe, participant.cat))
+            if self._participant_tree_sort[0] is not None: self._sort_participant_tree() # Une seule ligne à déplacer
+        self._populate_all_category_comboboxes()
+        if not self.current_category: self.update_ui_after_restore_or_init()
+
     def _reload_liste_departs_csv(self, show_success_message=True):
         """Recharge liste_departs.csv et met à jour l'UI."""
         logging.info(f"Rechargement de {LISTE_DEPARTS_FILENAME}...")
@@ -708,7 +3565,7 @@ class RaceTimerApp(tk.Tk):
         # Store current category to try and reselect it after load
         previous_current_category = self.current_category
 
-        self.participants.clear() 
+        self._set_participants([])
         # Don't clear cat_combo values here, _populate_all_category_comboboxes will do it based on new data.
         # self.current_category = None # Will be reset by _populate or selection
         self.filtered_participants_for_chrono = []
@@ -739,6 +3596,16 @@ class RaceTimerApp(tk.Tk):
         action_button_frame.pack(side='top', fill='x', pady=(0,5))
         ttk.Button(action_button_frame, text="Recharger Liste (liste_departs.csv)", command=self._reload_liste_departs_csv_manual_trigger).pack(side='left', padx=(0,10))
         ttk.Button(action_button_frame, text="Supprimer Participant(s) Sélectionné(s)", command=self._delete_selected_participants).pack(side='left')
+        ttk.Button(action_button_frame, text="Importer un Dossier...", command=lambda: self._import_participant_files_dialog(directory=True)).pack(side='right')
+        ttk.Button(action_button_frame, text="Importer des Fichiers (clubs)...", command=self._import_participant_files_dialog).pack(side='right', padx=(0,5))
+
+        # Progression de l'import en arrière-plan (affichée seulement pendant un import)
+        self.import_progress_frame = ttk.Frame(top_frame)
+        self.import_progress_label = ttk.Label(self.import_progress_frame, text="")
+        self.import_progress_label.pack(side='left', padx=(0,5))
+        self.import_progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(self.import_progress_frame, variable=self.import_progress_var, maximum=100).pack(side='left', expand=True, fill='x')
+        ttk.Button(self.import_progress_frame, text="Annuler", command=self._cancel_background_import).pack(side='left', padx=(5,0))
 
         search_frame = ttk.Frame(top_frame)
         search_frame.pack(side='top', fill='x', pady=(5,0)) 
@@ -752,15 +3619,15 @@ class RaceTimerApp(tk.Tk):
         tree_container.pack(expand=True, fill='both', padx=10, pady=5)
 
         self.tree = ttk.Treeview(tree_container, columns=('Dossard', 'Nom', 'Prénom', 'Sexe', 'Catégorie'), show='headings', selectmode="extended") 
-        self.tree.heading('Dossard', text='Dossard') 
+        self.tree.heading('Dossard', text='Dossard', command=lambda: self._on_participant_heading_click('Dossard')) 
         self.tree.column('Dossard', width=80, anchor='w', minwidth=60)
-        self.tree.heading('Nom', text='Nom')
+        self.tree.heading('Nom', text='Nom', command=lambda: self._on_participant_heading_click('Nom'))
         self.tree.column('Nom', width=150, anchor='w', minwidth=100)
-        self.tree.heading('Prénom', text='Prénom')
+        self.tree.heading('Prénom', text='Prénom', command=lambda: self._on_participant_heading_click('Prénom'))
         self.tree.column('Prénom', width=150, anchor='w', minwidth=100)
-        self.tree.heading('Sexe', text='Sexe')
+        self.tree.heading('Sexe', text='Sexe', command=lambda: self._on_participant_heading_click('Sexe'))
         self.tree.column('Sexe', width=50, anchor='center', minwidth=40)
-        self.tree.heading('Catégorie', text='Catégorie')
+        self.tree.heading('Catégorie', text='Catégorie', command=lambda: self._on_participant_heading_click('Catégorie'))
         self.tree.column('Catégorie', width=100, anchor='w', minwidth=80)
         
         tree_scrollbar_y = ttk.Scrollbar(tree_container, orient="vertical", command=self.tree.yview)
@@ -775,17 +3642,100 @@ class RaceTimerApp(tk.Tk):
         if self._running or self.rankings or self.buffer:
             if not messagebox.askyesno("Attention", "Données de course en cours. Recharger effacera ces données de course. Continuer ?"): 
                 return
-        
+        # La lecture se fait dans un thread ; la liste en mémoire n'est remplacée qu'à la fin de l'import
+        self._start_background_import(LISTE_DEPARTS_FILENAME, self._on_manual_reload_done)
+
+    def _on_manual_reload_done(self, result):
         # Reset application state related to current race if any
-        self.participants.clear()
         if hasattr(self, 'cat_combo'): self.cat_combo['values'] = []; self.cat_combo.set('')
         self.current_category = None; self.filtered_participants_for_chrono = []
         # For a manual reload, we should reset the race state more thoroughly
         self._reset_race_state(clear_instance_counter=True) # Reset instance counter as well
 
-        if self._load_participants_from_path_quiet(str(LISTE_DEPARTS_FILENAME), is_auto_load=False):
-            messagebox.showinfo("Rechargement Réussi", f"{len(self.participants)} participants chargés depuis\n{LISTE_DEPARTS_FILENAME.name}")
-        # Error message is handled by _load_participants_from_path_quiet if not is_auto_load
+        self._set_participants(result.participants)
+        self.last_imported_file_path = str(result.file_path)
+        self._startup_cache.put('participants', result.file_path, list(self.participants), self._participants_cache_key())
+        self._startup_cache.save(self.disk_writer)
+        logging.info(f"{len(self.participants)} participants chargés depuis {result.file_path}")
+        msg = f"{len(self.participants)} participants chargés depuis\n{LISTE_DEPARTS_FILENAME.name}"
+        if result.issues:
+            msg += f"\n\n{len(result.issues)} problème(s) détecté(s). Rapport:\n{result.report_path}"
+        messagebox.showinfo("Rechargement Réussi", msg)
+        self.update_ui_after_restore_or_init()
+
+    def _import_participant_files_dialog(self, directory=False):
+        """Import de plusieurs listes (une par club/école), lues en parallèle puis fusionnées dans liste_departs.csv."""
+        if self._import_job is not None:
+            messagebox.showinfo("Import en cours", "Un import est déjà en cours. Patientez ou annulez-le.")
+            return
+        if directory:
+            folder = filedialog.askdirectory(parent=self, title="Dossier des listes de départ (CSV)")
+            if not folder: return
+            source = pathlib.Path(folder)
+            paths = [p for p in participant_files_in(source) if p.resolve() != LISTE_DEPARTS_FILENAME.resolve()]
+        else:
+            selected = filedialog.askopenfilenames(parent=self, title="Listes de départ à fusionner",
+                                                   filetypes=[("CSV", "*.csv"), ("Tous les fichiers", "*.*")])
+            if not selected: return
+            paths = [pathlib.Path(p) for p in selected]
+            source = paths[0].parent
+        if not paths:
+            messagebox.showinfo("Import", f"Aucun fichier CSV trouvé dans\n{source}")
+            return
+
+        existing = ()
+        if self.participants:
+            choice = messagebox.askyesnocancel("Import Multi-fichiers",
+                f"{len(paths)} fichier(s) à importer.\n\nOui : ajouter à la liste actuelle ({len(self.participants)} participants).\n"
+                f"Non : remplacer la liste actuelle.\nAnnuler : ne rien faire.")
+            if choice is None: return
+            if choice:
+                existing = list(self.participants)
+            elif (self._running or self.rankings or self.buffer) and not messagebox.askyesno(
+                    "Attention", "Données de course en cours. Remplacer la liste effacera ces données de course. Continuer ?"):
+                return
+
+        annees_categories, known_categories = dict(self.annees_categories), self._known_categories()
+
+        def read(progress, cancel_event):
+            results = read_participant_files(paths, annees_categories, known_categories,
+                                             progress_callback=progress, cancel_event=cancel_event)
+            merged = merge_participant_imports(results, source, existing, LISTE_DEPARTS_FILENAME.name)
+            merged.cancelled = cancel_event.is_set()
+            return merged
+
+        logging.info(f"Import de {len(paths)} fichier(s) depuis {source}")
+        self._launch_import_job(source, read, lambda result: self._on_multi_import_done(result, bool(existing)))
+
+    def _on_multi_import_done(self, result, appended):
+        added = len(result.participants) - (len(self.participants) if appended else 0)
+        if added <= 0:
+            msg = f"Aucun nouveau participant lu dans les {len(result.source_files)} fichier(s)."
+            if result.issues: msg += f"\n\n{len(result.issues)} problème(s) détecté(s). Rapport:\n{result.report_path}"
+            messagebox.showwarning("Import Multi-fichiers", msg)
+            return
+        if not appended:
+            if hasattr(self, 'cat_combo'): self.cat_combo['values'] = []; self.cat_combo.set('')
+            self.current_category = None; self.filtered_participants_for_chrono = []
+            self._reset_race_state(clear_instance_counter=True)
+        self._set_participants(result.participants)
+        self.last_imported_file_path = str(LISTE_DEPARTS_FILENAME)
+        logging.info(f"{added} participants importés depuis {len(result.source_files)} fichier(s), {len(self.participants)} au total")
+
+        def on_written(error):
+            if error is not None:
+                logging.error(f"Erreur lors de l'écriture de {LISTE_DEPARTS_FILENAME}: {error}")
+                messagebox.showerror("Erreur Fichier", f"Liste fusionnée chargée mais non enregistrée dans {LISTE_DEPARTS_FILENAME.name}:\n{error}")
+                return
+            self._startup_cache.put('participants', LISTE_DEPARTS_FILENAME, list(self.participants), self._participants_cache_key())
+            self._startup_cache.save(self.disk_writer)
+            msg = (f"{added} participant(s) importé(s) depuis {len(result.source_files)} fichier(s).\n"
+                   f"{len(self.participants)} participants enregistrés dans {LISTE_DEPARTS_FILENAME.name}.")
+            if result.issues:
+                msg += f"\n\n{len(result.issues)} problème(s) (dont doublons entre fichiers). Rapport:\n{result.report_path}"
+            messagebox.showinfo("Import Multi-fichiers", msg)
+
+        self.disk_writer.replace(LISTE_DEPARTS_FILENAME, participants_csv_text(self.participants), encoding='utf-8-sig', callback=on_written)
         self.update_ui_after_restore_or_init()
 
 
@@ -815,40 +3765,116 @@ class RaceTimerApp(tk.Tk):
         if not bibs_to_delete: return
 
         initial_count = len(self.participants)
-        self.participants = [p for p in self.participants if p['bib'] not in bibs_to_delete]
+        self.participants = [p for p in self.participants if p.bib not in bibs_to_delete]
+        self.participant_index.remove_bibs(bibs_to_delete)
+        self._rebuild_team_scores()
         deleted_count = initial_count - len(self.participants)
 
         if deleted_count > 0:
-            try:
-                with LISTE_DEPARTS_FILENAME.open('w', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.writer(f, delimiter=';')
-                    writer.writerow(['N° Dossard', 'Nom', 'Prénom', 'Sexe', 'Catégorie']) 
-                    for p_data in self.participants:
-                        writer.writerow([p_data['bib'], p_data['nom'], p_data['prenom'], p_data['sexe'], p_data['cat']])
-                logging.info(f"{deleted_count} participant(s) supprimé(s) et {LISTE_DEPARTS_FILENAME.name} mis à jour.")
-                messagebox.showinfo("Suppression Réussie", f"{deleted_count} participant(s) supprimé(s).\nLe fichier {LISTE_DEPARTS_FILENAME.name} a été mis à jour.")
-            except Exception as e:
-                logging.error(f"Erreur lors de la réécriture de {LISTE_DEPARTS_FILENAME}: {e}")
-                messagebox.showerror("Erreur Fichier", f"Erreur lors de la mise à jour du fichier des départs:\n{e}")
+            def on_rewritten(error):
+                if error is None:
+                    logging.info(f"{deleted_count} participant(s) supprimé(s) et {LISTE_DEPARTS_FILENAME.name} mis à jour.")
+                    messagebox.showinfo("Suppression Réussie", f"{deleted_count} participant(s) supprimé(s).\nLe fichier {LISTE_DEPARTS_FILENAME.name} a été mis à jour.")
+                    return
+                logging.error(f"Erreur lors de la réécriture de {LISTE_DEPARTS_FILENAME}: {error}")
+                messagebox.showerror("Erreur Fichier", f"Erreur lors de la mise à jour du fichier des départs:\n{error}")
                 # Attempt to reload to reflect in-memory state if file write failed
                 self._reload_liste_departs_csv(show_success_message=False) 
+
+            self.disk_writer.replace(LISTE_DEPARTS_FILENAME, participants_csv_text(self.participants), encoding='utf-8-sig', callback=on_rewritten)
         else:
             messagebox.showinfo("Info", "Aucun participant correspondant n'a été trouvé dans la liste en mémoire pour suppression.")
 
         self.update_ui_after_restore_or_init() 
 
 
+    def _participant_matches_search(self, p, search_term=None):
+        # search_term: forme normalisée (collation_primary), comparée aux clés de tri: "lefevre" trouve "Lefèvre"
+        if search_term is None: search_term = collation_primary(self.search_var.get())
+        return (search_term in str(p.bib) or
+                search_term in p.sort_nom or
+                search_term in p.sort_prenom or
+                (p.cat and search_term in category_collation_key(p.cat)))
+
+    def _build_liste_participants_tab(self):
+        self.setup_liste_participants_tab()
+        self.filter_participant_treeview()
+
     def filter_participant_treeview(self, *args):
-        search_term = self.search_var.get().lower()
+        if not hasattr(self, 'tree'): return # Onglet pas encore construit : rempli à sa première ouverture
+        search_term = collation_primary(self.search_var.get())
         for i in self.tree.get_children():
             self.tree.delete(i)
-        for p in self.participants: 
-            bib_str = str(p['bib'])
-            if (search_term in bib_str or
-                search_term in p['nom'].lower() or
-                search_term in p['prenom'].lower() or
-                (p['cat'] and search_term in p['cat'].lower()) ): 
-                self.tree.insert('', tk.END, values=(p['bib'], p['nom'], p['prenom'], p['sexe'], p['cat']))
+        matches = [p for p in self.participants if self._participant_matches_search(p, search_term)]
+        for p in self._sorted_for_tree(matches): 
+            self.tree.insert('', tk.END, iid=str(p.bib), values=(p.bib, p.nom, p.prenom, p.sexe, p.cat))
+
+    # Clés de tri par colonne de la liste des participants (clés de collation précalculées sur Participant)
+    PARTICIPANT_SORT_KEYS = {
+        'Dossard': lambda p: p.bib,
+        'Nom': lambda p: (p.sort_nom, p.sort_prenom, p.bib),
+        'Prénom': lambda p: (p.sort_prenom, p.sort_nom, p.bib),
+        'Sexe': lambda p: (p.sexe, p.sort_nom, p.sort_prenom, p.bib),
+        'Catégorie': lambda p: (category_collation_key(p.cat), p.sort_nom, p.sort_prenom, p.bib),
+    }
+    TREE_MOVE_LIMIT = 64 # Au-delà, un seul appel 'children' réordonne la liste plutôt que des 'move' unitaires
+
+    def _on_participant_heading_click(self, column):
+        sort_column, reverse = self._participant_tree_sort
+        self._participant_tree_sort = (column, not reverse if column == sort_column else False)
+        for col in self.PARTICIPANT_SORT_KEYS:
+            arrow = (" ▼" if self._participant_tree_sort[1] else " ▲") if col == column else ""
+            self.tree.heading(col, text=col + arrow)
+        self._sort_participant_tree()
+
+    def _sorted_for_tree(self, participants):
+        column, reverse = self._participant_tree_sort
+        if column is None: return participants
+        return sorted(participants, key=self.PARTICIPANT_SORT_KEYS[column], reverse=reverse)
+
+    def _sort_participant_tree(self):
+        """Trie les lignes visibles: tri des clés en Python, puis déplacement des seules lignes mal placées."""
+        current = self.tree.get_children()
+        by_bib = self.participant_index.by_bib
+        visible = [by_bib[int(iid)] for iid in current if int(iid) in by_bib]
+        self._reorder_tree(self.tree, [str(p.bib) for p in self._sorted_for_tree(visible)], current)
+
+    def _reorder_tree(self, tree, target, current=None):
+        """Met les lignes (déjà présentes) de tree dans l'ordre target en ne déplaçant que les lignes mal placées."""
+        if current is None: current = tree.get_children()
+        if list(current) == target: return
+        # Les lignes d'une plus longue sous-suite déjà dans le bon ordre restent en place
+        old_position = {iid: index for index, iid in enumerate(current)}
+        keep = longest_increasing_subsequence([old_position[iid] for iid in target])
+        to_move = len(target) - len(keep)
+        if to_move > self.TREE_MOVE_LIMIT:
+            tree.set_children('', *target)
+            return
+        keep_iids = {current[index] for index in keep}
+        for index, iid in enumerate(target):
+            if iid in keep_iids: continue
+            if index == 0:
+                tree.move(iid, '', 0); continue
+            # 'move' compte les positions sans la ligne déplacée: juste après la précédente de l'ordre cible
+            previous_index = tree.index(target[index - 1])
+            tree.move(iid, '', previous_index if tree.index(iid) < previous_index else previous_index + 1)
+
+    def _sync_tree_rows(self, tree, rows, shown):
+        """Aligne tree sur rows [(iid, valeurs)] sans tout reconstruire : seules les lignes disparues, nouvelles ou
+        modifiées sont touchées, puis l'ordre est corrigé par _reorder_tree. shown (iid -> valeurs) suit l'affichage."""
+        wanted = dict(rows)
+        stale = [iid for iid in shown if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale: del shown[iid]
+        for iid, values in rows:
+            previous = shown.get(iid)
+            if previous is None:
+                tree.insert('', tk.END, iid=iid, values=values)
+            elif previous != values:
+                tree.item(iid, values=values)
+            shown[iid] = values
+        self._reorder_tree(tree, [iid for iid, _ in rows])
 
     def import_participants_manual(self): 
         self._reload_liste_departs_csv_manual_trigger()
@@ -873,14 +3899,24 @@ class RaceTimerApp(tk.Tk):
         self.lbl_dist_f.grid(row=2, column=0, columnspan=2, padx=5, pady=2, sticky='w')
         cat_dist_frame.columnconfigure(1, weight=1) 
 
-        show_list_button = ttk.Button(top_section_frame, text="Afficher Liste de Course (Cat. Actuelle)", command=self._show_current_race_list_popup)
-        show_list_button.pack(side='right', padx=10, pady=5)
+        top_buttons_frame = ttk.Frame(top_section_frame)
+        top_buttons_frame.pack(side='right', padx=10, pady=5)
+        show_list_button = ttk.Button(top_buttons_frame, text="Afficher Liste de Course (Cat. Actuelle)", command=self._show_current_race_list_popup)
+        show_list_button.pack(side='top', fill='x')
+        ttk.Button(top_buttons_frame, text="File des Dossards / Rapprochement", command=self._open_reconcile_popup).pack(side='top', fill='x', pady=(5,0))
+        ttk.Button(top_buttons_frame, text="Décalages de Départ", command=self._open_offsets_popup).pack(side='top', fill='x', pady=(5,0))
+        ttk.Button(top_buttons_frame, text="Import Journal Puces", command=self._open_chip_import_popup).pack(side='top', fill='x', pady=(5,0))
 
 
         timer_controls_frame = ttk.Frame(main_timer_frame)
         timer_controls_frame.pack(pady=5, fill='x')
         self.lbl_time = ttk.Label(timer_controls_frame, text="00:00:00", font=('TkDefaultFont', 24))
         self.lbl_time.pack(side='left', padx=10, expand=True) 
+        self.main_clock = ClockDisplay(self.lbl_time, self._race_elapsed_seconds)
+        self.clock_ticker.add(self.main_clock)
+        self.tenths_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(timer_controls_frame, text="1/10 s", variable=self.tenths_var, command=self._on_tenths_toggled).pack(side='left', padx=5)
+        ttk.Button(timer_controls_frame, text="Grand affichage", command=self._open_big_clock_window).pack(side='left', padx=5)
         ttk.Button(timer_controls_frame, text="Start", command=self.start_race, width=10).pack(side='left', padx=5)
         ttk.Button(timer_controls_frame, text="Fin Course", command=self.finish_race, width=10).pack(side='left', padx=5) 
         ttk.Button(timer_controls_frame, text="Réinit.", command=self.reset_race_with_confirmation, width=10).pack(side='left', padx=5)
@@ -893,8 +3929,28 @@ class RaceTimerApp(tk.Tk):
         self.entry_bib.pack(side='left', padx=5); self.entry_bib.bind("<Return>", lambda event: self.assign_arrival()) 
         ttk.Button(arrival_frame, text="Valider Dossard", command=self.assign_arrival).pack(side='left', padx=5)
         ttk.Button(arrival_frame, text="Marquer Abandon", command=lambda: self.assign_arrival(mark_as_abandon=True)).pack(side='left', padx=5)
+        self.scan_mode_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(arrival_frame, text="Mode scanner", variable=self.scan_mode_var, command=self._on_scan_mode_toggled).pack(side='left', padx=5)
+        self.bind_class("ScanCapture", "<KeyPress>", self._on_scan_key)
         self.assign_feedback_label = ttk.Label(arrival_frame, text="", width=40) 
         self.assign_feedback_label.pack(side='left', padx=5, fill='x', expand=True)
+        self.analytics_label = ttk.Label(main_timer_frame, text="", foreground="gray")
+        self.analytics_label.pack(fill='x', padx=5)
+
+        name_lookup_frame = ttk.LabelFrame(main_timer_frame, text="Dossard illisible : recherche par nom")
+        name_lookup_frame.pack(pady=5, fill='x', padx=5)
+        self.name_lookup_var = tk.StringVar()
+        name_lookup_entry = ttk.Entry(name_lookup_frame, textvariable=self.name_lookup_var, width=25)
+        name_lookup_entry.grid(row=0, column=0, padx=5, pady=5, sticky='nw')
+        name_lookup_entry.bind("<Down>", lambda event: (self.name_lookup_list.focus_set(), self.name_lookup_list.selection_set(0)))
+        self.name_lookup_var.trace_add("write", self._on_name_lookup_changed)
+        self.name_lookup_list = tk.Listbox(name_lookup_frame, height=4)
+        self.name_lookup_list.grid(row=0, column=1, padx=5, pady=5, sticky='ew')
+        self.name_lookup_list.bind("<Double-Button-1>", lambda event: self._assign_from_name_lookup())
+        self.name_lookup_list.bind("<Return>", lambda event: self._assign_from_name_lookup())
+        ttk.Button(name_lookup_frame, text="Attribuer ce dossard", command=self._assign_from_name_lookup).grid(row=0, column=2, padx=5, pady=5, sticky='n')
+        name_lookup_frame.columnconfigure(1, weight=1)
+        self._name_lookup_bibs = []
         
         buffer_list_frame = ttk.Frame(main_timer_frame)
         buffer_list_frame.pack(pady=5, fill='both', expand=True)
@@ -925,6 +3981,35 @@ class RaceTimerApp(tk.Tk):
         self.manual_feedback_label.grid(row=1, column=0, columnspan=6, sticky='ew', padx=5)
         manual_entry_frame.columnconfigure(1, weight=1); manual_entry_frame.columnconfigure(3, weight=1)
 
+    NAME_LOOKUP_LIMIT = 8
+
+    def _on_name_lookup_changed(self, *args):
+        """Recherche floue (index de trigrammes) dans la catégorie en cours, à chaque frappe."""
+        query = self.name_lookup_var.get()
+        matches = self.participant_index.search_names(query, self.NAME_LOOKUP_LIMIT, self.current_category) if query.strip() else []
+        ranked_bibs = {r.bib for r in self.rankings} if matches else set()
+        self.name_lookup_list.delete(0, tk.END)
+        self._name_lookup_bibs = [p.bib for _, p in matches]
+        for score, p in matches:
+            self.name_lookup_list.insert(tk.END, f"{p.bib} - {p.nom} {p.prenom} ({p.sexe.upper()}){'  [déjà classé]' if p.bib in ranked_bibs else ''}")
+        if matches: self.name_lookup_list.selection_set(0)
+
+    def _assign_from_name_lookup(self):
+        selection = self.name_lookup_list.curselection()
+        if not selection or selection[0] >= len(self._name_lookup_bibs):
+            self.show_feedback(self.assign_feedback_label, "Aucun coureur sélectionné dans la recherche.", "red"); return
+        bib = self._name_lookup_bibs[selection[0]]
+        if self.reconciler.bibs:
+            # File des dossards active: le dossard trouvé rejoint la file, comme une saisie
+            self.reconciler.add_bib(bib)
+            committed = self._commit_reconciled_pairs() if self._running or self.start_time else 0
+            self._refresh_buffer_listbox(); self._refresh_reconcile_popup(); self.save_state()
+            self.show_feedback(self.assign_feedback_label, f"Dossard {bib} ajouté à la file ({committed} classé(s)).", "green")
+        else:
+            self.entry_bib.delete(0, tk.END); self.entry_bib.insert(0, str(bib))
+            self.assign_arrival()
+        self.name_lookup_var.set('')
+
     def _show_current_race_list_popup(self):
         if not self.current_category:
             messagebox.showinfo("Info", "Aucune catégorie sélectionnée pour afficher la liste de course.")
@@ -933,7 +4018,13 @@ class RaceTimerApp(tk.Tk):
             messagebox.showinfo("Info", f"Aucun participant pour la catégorie '{self.current_category}'.")
             return
 
-        popup = tk.Toplevel(self)
+        if self.race_list_popup is not None and self.race_list_popup.winfo_exists():
+            self.race_list_popup.title(f"Liste de Course - Catégorie: {self.current_category}")
+            self.race_list_search_var.set('') # La trace met la liste à jour (seules les lignes qui changent)
+            self._show_popup(self.race_list_popup, self.race_list_search_entry)
+            return
+
+        popup = self.race_list_popup = tk.Toplevel(self)
         popup.title(f"Liste de Course - Catégorie: {self.current_category}")
         popup.geometry("600x400")
         popup.transient(self) 
@@ -942,14 +4033,14 @@ class RaceTimerApp(tk.Tk):
         search_frame_popup = ttk.Frame(popup)
         search_frame_popup.pack(pady=5, padx=10, fill='x')
         ttk.Label(search_frame_popup, text="Rechercher:").pack(side='left', padx=(0,5))
-        popup_search_var = tk.StringVar()
-        popup_search_entry = ttk.Entry(search_frame_popup, textvariable=popup_search_var, width=30)
+        popup_search_var = self.race_list_search_var = tk.StringVar()
+        popup_search_entry = self.race_list_search_entry = ttk.Entry(search_frame_popup, textvariable=popup_search_var, width=30)
         popup_search_entry.pack(side='left', expand=True, fill='x')
         
         popup_tree_frame = ttk.Frame(popup)
         popup_tree_frame.pack(expand=True, fill='both', padx=10, pady=5)
 
-        popup_tree = ttk.Treeview(popup_tree_frame, columns=('Bib', 'Nom', 'Prénom', 'Sexe'), show='headings')
+        popup_tree = self.race_list_tree = ttk.Treeview(popup_tree_frame, columns=('Bib', 'Nom', 'Prénom', 'Sexe'), show='headings')
         for col in popup_tree['columns']:
             popup_tree.heading(col, text=col)
             popup_tree.column(col, width=120, anchor='w')
@@ -960,29 +4051,637 @@ class RaceTimerApp(tk.Tk):
         popup_tree.pack(side='left', expand=True, fill='both')
         popup_tree_scrollbar.pack(side='right', fill='y')
 
+        self._race_list_rows = {}
+        popup_search_var.trace_add("write", lambda *args: self._refresh_race_list_popup())
+        self._refresh_race_list_popup()
 
-        sorted_participants_for_popup = sorted(self.filtered_participants_for_chrono, key=lambda p: p['nom'])
+        ttk.Button(popup, text="Fermer", command=lambda: self._hide_popup(popup)).pack(pady=10)
+        popup.protocol("WM_DELETE_WINDOW", lambda: self._hide_popup(popup))
+        popup_search_entry.focus()
 
-        def populate_popup_tree(filter_term=""):
-            for i in popup_tree.get_children():
-                popup_tree.delete(i)
-            for p in sorted_participants_for_popup:
-                bib_str = str(p['bib'])
-                if (not filter_term or 
-                    filter_term in bib_str or
-                    filter_term in p['nom'].lower() or
-                    filter_term in p['prenom'].lower()):
-                    popup_tree.insert('', tk.END, values=(p['bib'], p['nom'], p['prenom'], p['sexe']))
-        
-        popup_search_var.trace_add("write", lambda *args: populate_popup_tree(popup_search_var.get().lower()))
-        populate_popup_tree() 
+    def _refresh_race_list_popup(self):
+        filter_term = collation_primary(self.race_list_search_var.get())
+        rows = [(str(p.bib), (p.bib, p.nom, p.prenom, p.sexe))
+                for p in self.participant_index.sorted_by_name(self.current_category)
+                if (not filter_term or
+                    filter_term in str(p.bib) or
+                    filter_term in p.sort_nom or
+                    filter_term in p.sort_prenom)]
+        self._sync_tree_rows(self.race_list_tree, rows, self._race_list_rows)
+
+
+    def _open_reconcile_popup(self):
+        """Fenêtre de la file des dossards : saisie anticipée, appariement par position avec le buffer, corrections au milieu."""
+        if self.reconcile_popup is not None and self.reconcile_popup.winfo_exists():
+            self.reconcile_popup.deiconify(); self.reconcile_popup.lift(); return
+        if not self.current_category:
+            messagebox.showinfo("Info", "Aucune catégorie sélectionnée pour le rapprochement.")
+            return
 
-        ttk.Button(popup, text="Fermer", command=popup.destroy).pack(pady=10)
-        popup_search_entry.focus()
+        popup = tk.Toplevel(self)
+        popup.title(f"Rapprochement Temps / Dossards - Catégorie: {self.current_category}")
+        popup.geometry("700x450")
+        popup.transient(self) # Pas de grab_set: "Nouvelle arrivée" doit rester utilisable dans la fenêtre principale
+
+        entry_frame = ttk.Frame(popup)
+        entry_frame.pack(pady=5, padx=10, fill='x')
+        ttk.Label(entry_frame, text="Dossard:").pack(side='left', padx=(0,5))
+        self.reconcile_bib_entry = ttk.Entry(entry_frame, width=8)
+        self.reconcile_bib_entry.pack(side='left')
+        self.reconcile_bib_entry.bind("<Return>", lambda event: self._reconcile_add_bib())
+        ttk.Button(entry_frame, text="Ajouter à la file", command=self._reconcile_add_bib).pack(side='left', padx=5)
+        ttk.Button(entry_frame, text="Insérer avant sélection", command=lambda: self._reconcile_add_bib(insert_before=True)).pack(side='left', padx=5)
+        ttk.Button(entry_frame, text="Dossard manquant", command=lambda: self._reconcile_add_bib(placeholder=True)).pack(side='left', padx=5)
+
+        tree_frame = ttk.Frame(popup)
+        tree_frame.pack(expand=True, fill='both', padx=10, pady=5)
+        self.reconcile_tree = ttk.Treeview(tree_frame, columns=('Pos.', 'Temps', 'Dossard', 'Nom', 'État'), show='headings', selectmode='browse')
+        for col, width in (('Pos.', 50), ('Temps', 90), ('Dossard', 70), ('Nom', 220), ('État', 130)):
+            self.reconcile_tree.heading(col, text=col)
+            self.reconcile_tree.column(col, width=width, anchor='w')
+        self.reconcile_tree.tag_configure('anomalie', foreground='red')
+        tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.reconcile_tree.yview)
+        self.reconcile_tree.configure(yscrollcommand=tree_scrollbar.set)
+        self.reconcile_tree.pack(side='left', expand=True, fill='both')
+        tree_scrollbar.pack(side='right', fill='y')
+
+        action_frame = ttk.Frame(popup)
+        action_frame.pack(padx=10, fill='x')
+        ttk.Button(action_frame, text="Remplacer dossard", command=self._reconcile_replace_bib).pack(side='left', padx=(0,5))
+        ttk.Button(action_frame, text="Supprimer dossard", command=self._reconcile_remove_bib).pack(side='left', padx=5)
+        ttk.Button(action_frame, text="Supprimer temps", command=self._reconcile_remove_time).pack(side='left', padx=5)
+        ttk.Button(action_frame, text="Valider les paires OK", command=self._reconcile_commit).pack(side='right')
+
+        self.reconcile_summary_label = ttk.Label(popup, text="")
+        self.reconcile_summary_label.pack(padx=10, pady=(5,0), anchor='w')
+        self.reconcile_feedback_label = ttk.Label(popup, text="")
+        self.reconcile_feedback_label.pack(padx=10, pady=(0,5), anchor='w')
+
+        def close_reconcile_popup():
+            self.reconcile_popup = None
+            popup.destroy()
+        popup.protocol("WM_DELETE_WINDOW", close_reconcile_popup)
+        ttk.Button(popup, text="Fermer", command=close_reconcile_popup).pack(pady=5)
+        self.reconcile_popup = popup
+        self._reconcile_shown = [] # (valeurs, tags) affichés par position : seules les lignes qui changent sont réécrites
+        self._refresh_reconcile_popup()
+        self.reconcile_bib_entry.focus()
+
+    def _reconcile_lookup_sets(self):
+        participants_by_bib = {p.bib: p for p in self.filtered_participants_for_chrono}
+        ranked_bibs = {r.bib for r in self.rankings}
+        return participants_by_bib, ranked_bibs
+
+    def _refresh_reconcile_popup(self):
+        if self.reconcile_popup is None or not self.reconcile_popup.winfo_exists(): return
+        self.reconcile_popup.title(f"Rapprochement Temps / Dossards - Catégorie: {self.current_category}")
+        participants_by_bib, ranked_bibs = self._reconcile_lookup_sets()
+        tree = self.reconcile_tree
+        shown = self._reconcile_shown
+        pending = self.reconciler.pending_count()
+        for position in range(pending):
+            time_obj, bib = self.reconciler.pair(position)
+            status = self.reconciler.status(position, participants_by_bib, ranked_bibs)
+            participant = participants_by_bib.get(bib)
+            values = (position + 1,
+                      format_elapsed(time_obj.total_seconds()) if time_obj is not None else "",
+                      "?" if bib is None and position < len(self.reconciler.bibs) else (bib if bib is not None else ""),
+                      f"{participant.nom} {participant.prenom}" if participant else "",
+                      status)
+            tags = () if status == "OK" else ('anomalie',)
+            # Une arrivée ou un scan ne change que la fin de la file : les autres lignes ne sont pas retouchées
+            if position < len(shown):
+                if shown[position] != (values, tags):
+                    tree.item(str(position), values=values, tags=tags)
+                    shown[position] = (values, tags)
+            else:
+                tree.insert('', tk.END, iid=str(position), values=values, tags=tags)
+                shown.append((values, tags))
+        if len(shown) > pending:
+            tree.delete(*(str(position) for position in range(pending, len(shown))))
+            del shown[pending:]
+
+        gap = len(self.buffer) - len(self.reconciler.bibs)
+        summary = f"Temps: {len(self.buffer)}  Dossards: {len(self.reconciler.bibs)}"
+        if gap > 0: summary += f"  ({gap} temps sans dossard)"
+        elif gap < 0: summary += f"  ({-gap} dossard(s) sans temps)"
+        duplicates = self.reconciler.duplicates()
+        if duplicates: summary += f"  Doublons: {', '.join(map(str, duplicates))}"
+        summary += f"  Prêtes à valider: {self.reconciler.committable_count(participants_by_bib, ranked_bibs)}"
+        self.reconcile_summary_label.config(text=summary)
+
+    def _reconcile_selected_position(self):
+        selection = self.reconcile_tree.selection()
+        return int(selection[0]) if selection else None
+
+    def _reconcile_read_bib(self):
+        bib_txt = self.reconcile_bib_entry.get().strip()
+        if not bib_txt.isdigit():
+            self.show_feedback(self.reconcile_feedback_label, "Dossard invalide.", "red", parent_widget=self.reconcile_popup)
+            return None
+        return int(bib_txt)
+
+    def _reconcile_changed(self, message):
+        self.reconcile_bib_entry.delete(0, tk.END)
+        self._refresh_buffer_listbox(); self._refresh_reconcile_popup(); self.save_state()
+        self.show_feedback(self.reconcile_feedback_label, message, "green", parent_widget=self.reconcile_popup)
+
+    def _reconcile_add_bib(self, insert_before=False, placeholder=False):
+        bib = None if placeholder else self._reconcile_read_bib()
+        if bib is None and not placeholder: return
+        position = self._reconcile_selected_position() if insert_before or placeholder else None
+        if insert_before and position is None:
+            self.show_feedback(self.reconcile_feedback_label, "Sélectionnez une ligne.", "red", parent_widget=self.reconcile_popup); return
+        if position is None or position >= len(self.reconciler.bibs):
+            self.reconciler.add_bib(bib)
+            position = len(self.reconciler.bibs) - 1
+        else:
+            self.reconciler.insert_bib(position, bib)
+        label = "manquant" if bib is None else str(bib)
+        self._reconcile_changed(f"Dossard {label} en position {position + 1}.")
+        if self.reconciler.is_duplicate(bib):
+            self.show_feedback(self.reconcile_feedback_label, f"Attention: dossard {bib} déjà dans la file.", "orange", parent_widget=self.reconcile_popup)
+
+    def _reconcile_replace_bib(self):
+        position = self._reconcile_selected_position()
+        if position is None or position >= len(self.reconciler.bibs):
+            self.show_feedback(self.reconcile_feedback_label, "Sélectionnez une ligne avec dossard.", "red", parent_widget=self.reconcile_popup); return
+        bib = self._reconcile_read_bib()
+        if bib is None: return
+        self.reconciler.replace_bib(position, bib)
+        self._reconcile_changed(f"Position {position + 1}: dossard {bib}.")
+
+    def _reconcile_remove_bib(self):
+        position = self._reconcile_selected_position()
+        if position is None or position >= len(self.reconciler.bibs):
+            self.show_feedback(self.reconcile_feedback_label, "Sélectionnez une ligne avec dossard.", "red", parent_widget=self.reconcile_popup); return
+        bib = self.reconciler.remove_bib(position)
+        self._reconcile_changed(f"Dossard {bib if bib is not None else '?'} retiré de la position {position + 1}.")
+
+    def _reconcile_remove_time(self):
+        position = self._reconcile_selected_position()
+        if position is None or position >= len(self.buffer):
+            self.show_feedback(self.reconcile_feedback_label, "Sélectionnez une ligne avec temps.", "red", parent_widget=self.reconcile_popup); return
+        self.arrival_analytics.consume(self.buffer[position].total_seconds(), self._analytics_now(), 'suppression')
+        self._journal({'op': 'drop', 't': self.buffer[position].total_seconds()})
+        del self.buffer[position]
+        self._reconcile_changed(f"Temps en position {position + 1} supprimé.")
+
+    def _commit_reconciled_pairs(self):
+        participants_by_bib, ranked_bibs = self._reconcile_lookup_sets()
+        count = self.reconciler.committable_count(participants_by_bib, ranked_bibs)
+        assigned = []
+        for _ in range(count):
+            time_obj, bib = self.reconciler.pop_pair()
+            self.arrival_analytics.consume(time_obj.total_seconds(), self._analytics_now())
+            self._append_result(Result(bib, time_obj, False), 'rapprochement')
+            assigned.append({'op': 'assign', 'bib': bib, 't': time_obj.total_seconds(), 'src': 'rapprochement'})
+        self._journal(*assigned)
+        if count: logging.info(f"Rapprochement: {count} paire(s) validée(s) pour {self.current_category}")
+        return count
+
+    def _reconcile_commit(self):
+        count = self._commit_reconciled_pairs()
+        if not count:
+            self.show_feedback(self.reconcile_feedback_label, "Aucune paire valide en tête de file.", "orange", parent_widget=self.reconcile_popup); return
+        self._reconcile_changed(f"{count} paire(s) validée(s).")
+
+    def _open_offsets_popup(self):
+        """Table des décalages de départ par dossard : saisie unitaire, collage en masse ou import CSV."""
+        if self.offsets_popup is not None and self.offsets_popup.winfo_exists():
+            self.offsets_popup.deiconify(); self.offsets_popup.lift(); return
+
+        popup = tk.Toplevel(self)
+        popup.title("Décalages de Départ (handicap, poursuite, départ tardif)")
+        popup.geometry("600x520")
+        popup.transient(self)
+
+        entry_frame = ttk.Frame(popup)
+        entry_frame.pack(pady=5, padx=10, fill='x')
+        ttk.Label(entry_frame, text="Dossard:").pack(side='left', padx=(0,5))
+        self.offset_bib_entry = ttk.Entry(entry_frame, width=8)
+        self.offset_bib_entry.pack(side='left')
+        ttk.Label(entry_frame, text="Décalage (HH:MM:SS, MM:SS ou s):").pack(side='left', padx=(10,5))
+        self.offset_value_entry = ttk.Entry(entry_frame, width=10)
+        self.offset_value_entry.pack(side='left')
+        self.offset_value_entry.bind("<Return>", lambda event: self._offsets_set_single())
+        ttk.Button(entry_frame, text="Appliquer", command=self._offsets_set_single).pack(side='left', padx=5)
+
+        tree_frame = ttk.Frame(popup)
+        tree_frame.pack(expand=True, fill='both', padx=10, pady=5)
+        self.offsets_tree = ttk.Treeview(tree_frame, columns=('Dossard', 'Nom', 'Catégorie', 'Décalage'), show='headings')
+        for col, width in (('Dossard', 70), ('Nom', 220), ('Catégorie', 120), ('Décalage', 90)):
+            self.offsets_tree.heading(col, text=col)
+            self.offsets_tree.column(col, width=width, anchor='w')
+        tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.offsets_tree.yview)
+        self.offsets_tree.configure(yscrollcommand=tree_scrollbar.set)
+        self.offsets_tree.pack(side='left', expand=True, fill='both')
+        tree_scrollbar.pack(side='right', fill='y')
+
+        bulk_frame = ttk.LabelFrame(popup, text="Saisie en masse (une ligne 'dossard décalage' par coureur)")
+        bulk_frame.pack(padx=10, pady=5, fill='x')
+        self.offsets_bulk_text = tk.Text(bulk_frame, height=5, width=40)
+        self.offsets_bulk_text.pack(side='left', padx=5, pady=5, fill='x', expand=True)
+        ttk.Button(bulk_frame, text="Appliquer la liste", command=self._offsets_apply_bulk_text).pack(side='left', padx=5)
+
+        action_frame = ttk.Frame(popup)
+        action_frame.pack(padx=10, fill='x')
+        ttk.Button(action_frame, text="Importer CSV...", command=self._offsets_import_csv).pack(side='left', padx=(0,5))
+        ttk.Button(action_frame, text="Supprimer sélection", command=self._offsets_remove_selected).pack(side='left', padx=5)
+        ttk.Button(action_frame, text="Tout effacer", command=self._offsets_clear_all).pack(side='left', padx=5)
+
+        self.offsets_feedback_label = ttk.Label(popup, text="")
+        self.offsets_feedback_label.pack(padx=10, pady=5, anchor='w')
+
+        def close_offsets_popup():
+            self.offsets_popup = None
+            popup.destroy()
+        popup.protocol("WM_DELETE_WINDOW", close_offsets_popup)
+        ttk.Button(popup, text="Fermer", command=close_offsets_popup).pack(pady=5)
+        self.offsets_popup = popup
+        self._refresh_offsets_popup()
+        self.offset_bib_entry.focus()
+
+    def _refresh_offsets_popup(self):
+        if self.offsets_popup is None or not self.offsets_popup.winfo_exists(): return
+        self.offsets_tree.delete(*self.offsets_tree.get_children())
+        by_bib = self.participant_index.by_bib
+        for bib in sorted(self.start_offsets):
+            p = by_bib.get(bib)
+            name = f"{p.nom} {p.prenom}" if p else "(inconnu)"
+            self.offsets_tree.insert('', tk.END, iid=str(bib), values=(bib, name, p.cat if p else '', format_elapsed(self.start_offsets[bib], tenths=True)))
+
+    def _apply_start_offsets(self, changes, reason, replace_all=False):
+        """changes: {dossard: secondes ou None pour retirer}. Seuls les dossards modifiés déjà classés sont re-publiés
+        (correction dans le flux direct) ; le classement clubs est reconstruit en une passe."""
+        before = dict(self.start_offsets)
+        if replace_all: self.start_offsets.clear()
+        for bib, seconds in changes.items():
+            if seconds: self.start_offsets[bib] = seconds
+            else: self.start_offsets.pop(bib, None)
+        changed_bibs = {bib for bib in set(before) | set(self.start_offsets) if before.get(bib) != self.start_offsets.get(bib)}
+        if not changed_bibs: return 0
+        self._journal({'op': 'offsets', 'changes': {str(bib): self.start_offsets.get(bib) for bib in changed_bibs}, 'reason': reason})
+        affected = [r for r in self.rankings if r.bib in changed_bibs and r.time is not None]
+        if affected:
+            self._rebuild_team_scores()
+            if self.live_feed is not None:
+                by_bib = self.participant_index.by_bib
+                for r_data, values in zip(affected, zip(*self._performance_for(affected))):
+                    offset = self.start_offsets.get(r_data.bib, 0.0)
+                    self.live_feed.amend(r_data.bib, by_bib.get(r_data.bib), self.current_category, reason,
+                                         **LiveResultsFeed.times_fields(r_data.time, offset), **performance_fields(*values))
+        logging.info(f"Décalages de départ: {len(changed_bibs)} dossard(s) modifié(s), {len(affected)} résultat(s) recalculé(s) ({reason})")
+        self._refresh_offsets_popup()
+        self._save_start_offsets()
+        self.save_state()
+        return len(changed_bibs)
+
+    def _offsets_set_single(self):
+        bib_txt = self.offset_bib_entry.get().strip()
+        if not bib_txt.isdigit():
+            self.show_feedback(self.offsets_feedback_label, "Dossard invalide.", "red", parent_widget=self.offsets_popup); return
+        seconds = parse_duration(self.offset_value_entry.get())
+        if seconds is None:
+            self.show_feedback(self.offsets_feedback_label, "Décalage invalide (HH:MM:SS, MM:SS ou secondes).", "red", parent_widget=self.offsets_popup); return
+        bib = int(bib_txt)
+        self._apply_start_offsets({bib: seconds}, f"Décalage de départ du dossard {bib}")
+        msg = f"Dossard {bib}: décalage {format_elapsed(seconds, tenths=True)}."
+        color = "green"
+        if bib not in self.participant_index.by_bib:
+            msg += " (dossard absent de la liste)"; color = "orange"
+        self.show_feedback(self.offsets_feedback_label, msg, color, parent_widget=self.offsets_popup)
+        self.offset_bib_entry.delete(0, tk.END); self.offset_value_entry.delete(0, tk.END); self.offset_bib_entry.focus()
+
+    def _offsets_report(self, offsets, issues, source):
+        for line_no, text, message in issues:
+            logging.warning(f"Décalages ({source}) ligne {line_no} ('{text}'): {message}")
+        msg = f"{len(offsets)} décalage(s) appliqué(s) depuis {source}."
+        if issues: msg += f" {len(issues)} ligne(s) ignorée(s) (voir journal)."
+        self.show_feedback(self.offsets_feedback_label, msg, "orange" if issues else "green", duration=6000, parent_widget=self.offsets_popup)
+
+    def _offsets_apply_bulk_text(self):
+        offsets, issues = parse_start_offsets(self.offsets_bulk_text.get('1.0', tk.END).splitlines())
+        if offsets: self._apply_start_offsets(offsets, "Décalages de départ (saisie en masse)")
+        self._offsets_report(offsets, issues, "la saisie")
+        if not issues: self.offsets_bulk_text.delete('1.0', tk.END)
+
+    def _offsets_import_csv(self):
+        file_path = filedialog.askopenfilename(parent=self.offsets_popup, title="Importer les décalages de départ",
+                                               filetypes=[('CSV', '*.csv'), ('Texte', '*.txt'), ('Tous', '*.*')])
+        if not file_path: return
+        try:
+            offsets, issues = read_start_offsets_file(file_path)
+        except Exception as e:
+            logging.error(f"Erreur lecture décalages {file_path}: {e}")
+            self.show_feedback(self.offsets_feedback_label, f"Erreur lecture: {e}", "red", parent_widget=self.offsets_popup); return
+        if offsets: self._apply_start_offsets(offsets, f"Décalages importés ({pathlib.Path(file_path).name})")
+        self._offsets_report(offsets, issues, pathlib.Path(file_path).name)
+
+    def _offsets_remove_selected(self):
+        selected = self.offsets_tree.selection()
+        if not selected:
+            self.show_feedback(self.offsets_feedback_label, "Aucune ligne sélectionnée.", "red", parent_widget=self.offsets_popup); return
+        count = self._apply_start_offsets({int(iid): None for iid in selected}, "Décalage de départ retiré")
+        self.show_feedback(self.offsets_feedback_label, f"{count} décalage(s) retiré(s).", "green", parent_widget=self.offsets_popup)
+
+    def _offsets_clear_all(self):
+        if not self.start_offsets: return
+        if not messagebox.askyesno("Confirmation", f"Effacer les {len(self.start_offsets)} décalages de départ ?", parent=self.offsets_popup): return
+        self._apply_start_offsets({}, "Décalages de départ effacés", replace_all=True)
+        self.show_feedback(self.offsets_feedback_label, "Tous les décalages ont été effacés.", "green", parent_widget=self.offsets_popup)
+
+    def _open_chip_import_popup(self):
+        """Import en masse d'un journal brut de lecteur de puces dans les résultats de la catégorie en cours."""
+        if self.chip_popup is not None and self.chip_popup.winfo_exists():
+            if not self.chip_start_var.get() and self.start_time:
+                self.chip_start_var.set(self.start_time.isoformat(sep=' ', timespec='milliseconds'))
+            self.chip_popup.deiconify(); self.chip_popup.lift()
+            return
+        popup = self.chip_popup = tk.Toplevel(self)
+        popup.title("Import d'un Journal de Lecteur de Puces")
+        popup.geometry("640x460")
+        popup.transient(self)
+
+        form = ttk.Frame(popup, padding=10)
+        form.pack(fill='x')
+        self.chip_log_var = tk.StringVar()
+        self.chip_map_var = tk.StringVar()
+        self.chip_start_var = tk.StringVar(value=self.start_time.isoformat(sep=' ', timespec='milliseconds') if self.start_time else "")
+        self.chip_min_var = tk.StringVar(value=f"{CHIP_MIN_ELAPSED_SECONDS:.0f}")
+        ttk.Label(form, text="Journal (lecteur,antenne,puce,horodatage):").grid(row=0, column=0, sticky='w', pady=3)
+        ttk.Entry(form, textvariable=self.chip_log_var, width=40).grid(row=0, column=1, sticky='ew', padx=5)
+        ttk.Button(form, text="Parcourir...", command=lambda: self._chip_browse(self.chip_log_var, "Journal du lecteur")).grid(row=0, column=2)
+        ttk.Label(form, text="Correspondance puce/dossard (optionnel):").grid(row=1, column=0, sticky='w', pady=3)
+        ttk.Entry(form, textvariable=self.chip_map_var, width=40).grid(row=1, column=1, sticky='ew', padx=5)
+        ttk.Button(form, text="Parcourir...", command=lambda: self._chip_browse(self.chip_map_var, "Correspondance puce -> dossard")).grid(row=1, column=2)
+        ttk.Label(form, text="Départ (horloge du lecteur):").grid(row=2, column=0, sticky='w', pady=3)
+        ttk.Entry(form, textvariable=self.chip_start_var, width=26).grid(row=2, column=1, sticky='w', padx=5)
+        ttk.Label(form, text="Lectures ignorées avant (s après départ):").grid(row=3, column=0, sticky='w', pady=3)
+        ttk.Entry(form, textvariable=self.chip_min_var, width=8).grid(row=3, column=1, sticky='w', padx=5)
+        form.columnconfigure(1, weight=1)
+        ttk.Label(popup, text="Sans fichier de correspondance, le code de la puce est le numéro de dossard.", foreground="grey").pack(padx=10, anchor='w')
+
+        action_frame = ttk.Frame(popup)
+        action_frame.pack(padx=10, pady=5, fill='x')
+        self.chip_import_button = ttk.Button(action_frame, text="Importer", command=self._chip_import_start)
+        self.chip_import_button.pack(side='left')
+        ttk.Button(action_frame, text="Annuler l'import", command=lambda: self._chip_job and self._chip_job['cancel'].set()).pack(side='left', padx=5)
+        self.chip_progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(action_frame, variable=self.chip_progress_var, maximum=100).pack(side='left', expand=True, fill='x', padx=5)
+
+        self.chip_summary_text = tk.Text(popup, height=12, wrap='word', state='disabled')
+        self.chip_summary_text.pack(padx=10, pady=5, expand=True, fill='both')
+        popup.protocol("WM_DELETE_WINDOW", lambda: self._hide_popup(popup))
+        ttk.Button(popup, text="Fermer", command=lambda: self._hide_popup(popup)).pack(pady=5)
+
+    def _chip_browse(self, var, title):
+        file_path = filedialog.askopenfilename(parent=self.chip_popup, title=title,
+                                               filetypes=[('Journal / CSV', '*.txt *.log *.csv'), ('Tous', '*.*')])
+        if file_path: var.set(file_path)
+
+    def _chip_show_summary(self, lines):
+        self.chip_summary_text.config(state='normal')
+        self.chip_summary_text.delete('1.0', tk.END)
+        self.chip_summary_text.insert('1.0', '\n'.join(lines))
+        self.chip_summary_text.config(state='disabled')
+
+    def _chip_parse_start(self, text):
+        text = text.strip()
+        try:
+            return datetime.datetime.fromisoformat(text)
+        except ValueError:
+            pass
+        # Heure seule : jour du départ de la course (ou aujourd'hui)
+        clock = datetime.time.fromisoformat(text)
+        return datetime.datetime.combine((self.start_time or datetime.datetime.now()).date(), clock)
+
+    def _chip_import_start(self):
+        if self._chip_job is not None: return
+        if not self.current_category:
+            self._chip_show_summary(["Aucune catégorie sélectionnée."]); return
+        log_path = pathlib.Path(self.chip_log_var.get().strip())
+        if not log_path.is_file():
+            self._chip_show_summary([f"Journal introuvable: {log_path}"]); return
+        try:
+            start = self._chip_parse_start(self.chip_start_var.get())
+        except ValueError:
+            self._chip_show_summary(["Départ invalide (AAAA-MM-JJ HH:MM:SS.fff ou HH:MM:SS attendu)."]); return
+        min_elapsed = parse_duration(self.chip_min_var.get())
+        if min_elapsed is None:
+            self._chip_show_summary(["Délai minimal invalide."]); return
+        tag_to_bib, map_lines = None, []
+        if self.chip_map_var.get().strip():
+            try:
+                tag_to_bib, issues = read_chip_tag_map(self.chip_map_var.get().strip())
+            except Exception as e:
+                logging.error(f"Erreur lecture correspondance puces: {e}")
+                self._chip_show_summary([f"Correspondance illisible: {e}"]); return
+            map_lines.append(f"Correspondance: {len(tag_to_bib)} puces" + (f", {len(issues)} ligne(s) ignorée(s)." if issues else "."))
+            for line_no, tag, message in issues:
+                logging.warning(f"Correspondance puces ligne {line_no} ('{tag}'): {message}")
+
+        events, cancel_event = queue.Queue(), threading.Event()
+        chip = ChipLogImport(start, tag_to_bib, dict(self.start_offsets), min_elapsed)
+
+        def worker():
+            try:
+                t0 = time.perf_counter()
+                chip.read(log_path, progress_callback=lambda fraction: events.put(('progress', fraction)), cancel_event=cancel_event)
+                logging.info(f"Journal de puces {log_path.name}: {chip.lines} lignes lues en {time.perf_counter() - t0:.1f} s")
+                events.put(('done', chip))
+            except Exception as e:
+                logging.exception(f"Erreur lecture du journal de puces {log_path}")
+                events.put(('error', e))
+
+        self._chip_job = {'events': events, 'cancel': cancel_event, 'category': self.current_category,
+                          'file_path': log_path, 'header': map_lines}
+        self.chip_import_button.config(state='disabled')
+        self.chip_progress_var.set(0)
+        self._chip_show_summary([f"Lecture de {log_path.name}..."])
+        threading.Thread(target=worker, name="import-puces", daemon=True).start()
+        self.after(100, self._poll_chip_import)
+
+    def _poll_chip_import(self):
+        job = self._chip_job
+        if job is None: return
+        finished, payload = None, None
+        try:
+            while True:
+                kind, value = job['events'].get_nowait()
+                if kind == 'progress': self.chip_progress_var.set(value * 100)
+                else: finished, payload = kind, value
+        except queue.Empty:
+            pass
+        if finished is None:
+            self.after(100, self._poll_chip_import); return
+        self._chip_job = None
+        self.chip_import_button.config(state='normal')
+        if finished == 'error':
+            self._chip_show_summary([f"Erreur pendant la lecture de {job['file_path'].name}: {payload}"]); return
+        if payload.cancelled:
+            self._chip_show_summary(["Import annulé, aucun résultat ajouté."]); return
+        if job['category'] != self.current_category:
+            self._chip_show_summary(["La catégorie a changé pendant la lecture : import abandonné, relancez-le."]); return
+        self._apply_chip_import(payload, job)
+
+    def _apply_chip_import(self, chip, job):
+        """Ajoute en une fois les premières lectures valides des dossards de la catégorie encore non classés.
+        Un dossard déjà classé n'est jamais modifié : un écart avec la puce est signalé comme conflit."""
+        by_bib = self.participant_index.by_bib
+        ranked = {r.bib: r for r in self.rankings}
+        new_results, conflicts, other_category, unknown_bibs = [], [], 0, []
+        for bib, (elapsed, tag, reader) in sorted(chip.first_read.items(), key=lambda item: item[1][0]):
+            if not self.participant_index.in_category(bib, self.current_category):
+                if bib in by_bib: other_category += 1
+                else: unknown_bibs.append(bib)
+                continue
+            existing = ranked.get(bib)
+            if existing is None:
+                new_results.append(Result(bib, datetime.timedelta(seconds=elapsed)))
+            elif existing.time is None or abs(existing.time.total_seconds() - elapsed) > CHIP_CONFLICT_TOLERANCE_SECONDS:
+                conflicts.append((bib, tag, reader, elapsed, "Abandon" if existing.abandon else format_elapsed(existing.time.total_seconds(), tenths=True)))
+
+        lines = job['header'] + chip.summary_lines()
+        if other_category: lines.append(f"{other_category} dossards d'autres catégories ignorés.")
+        if unknown_bibs: lines.append(f"{len(unknown_bibs)} dossards absents de la liste de départ ignorés (ex: {', '.join(map(str, unknown_bibs[:5]))}).")
+        if conflicts: lines.append(f"{len(conflicts)} conflit(s): dossard déjà classé avec un autre temps (résultat existant conservé).")
+        for bib, tag, reader, elapsed, current in conflicts[:10]:
+            lines.append(f"  - Dossard {bib}: saisi {current}, puce {tag} ({reader}) {format_elapsed(elapsed, tenths=True)}")
+        if conflicts or chip.multi_tag_bibs or unknown_bibs:
+            lines.append(f"Détail dans {self._write_chip_report(chip, conflicts, unknown_bibs).name}")
+
+        if new_results and messagebox.askyesno("Import Journal Puces", '\n'.join(lines[:12]) + f"\n\nAjouter {len(new_results)} résultat(s) à '{self.current_category}' ?", parent=self.chip_popup):
+            self.rankings.extend(new_results)
+            self._journal(*({'op': 'result', 'bib': r.bib, 't': r.time.total_seconds(), 'abandon': False, 'src': 'puce'} for r in new_results))
+            self._rebuild_team_scores()
+            if self.live_feed is not None:
+                extras = [performance_fields(*values) for values in zip(*self._performance_for(new_results))]
+                self.live_feed.results([(r, by_bib.get(r.bib), self.start_offsets.get(r.bib, 0.0)) for r in new_results], self.current_category, 'puce', extras)
+            self.save_state()
+            lines.insert(0, f"{len(new_results)} résultat(s) ajouté(s) à '{self.current_category}'.")
+            logging.info(f"Journal de puces {job['file_path'].name}: {len(new_results)} résultats ajoutés, {len(conflicts)} conflits")
+        elif not new_results:
+            lines.insert(0, "Aucun nouveau résultat à ajouter.")
+        else:
+            lines.insert(0, "Import non appliqué.")
+        self._chip_show_summary(lines)
+
+    def _write_chip_report(self, chip, conflicts, unknown_bibs):
+        f = io.StringIO(newline='')
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Dossard', 'Puce', 'Lecteur', 'Temps puce', 'Résultat actuel', 'Problème'])
+        for bib, tag, reader, elapsed, current in conflicts:
+            writer.writerow([bib, tag, reader, format_elapsed(elapsed, tenths=True), current, "Temps différent du résultat saisi"])
+        for bib, tags in sorted(chip.multi_tag_bibs.items()):
+            elapsed, tag, reader = chip.first_read[bib]
+            writer.writerow([bib, ' '.join(sorted(tags)), reader, format_elapsed(elapsed, tenths=True), '', f"Plusieurs puces lues, {tag} retenue"])
+        for bib in unknown_bibs:
+            elapsed, tag, reader = chip.first_read[bib]
+            writer.writerow([bib, tag, reader, format_elapsed(elapsed, tenths=True), '', "Dossard absent de la liste de départ"])
+        for tag, count in chip.unknown_tags.most_common():
+            writer.writerow(['', tag.decode('utf-8', 'replace'), '', '', '', f"Puce sans dossard ({count} lectures)"])
+        cat_name_for_file = self.current_category.replace(' ', '_').replace('/', '-')
+        report_path = RESULTS_DIR / f"rapport_puces_{cat_name_for_file}_{datetime.datetime.now():%Y%m%d_%H%M%S}.csv"
+        self.disk_writer.replace(report_path, f.getvalue(), encoding='utf-8-sig',
+                                 callback=lambda error: error and logging.error(f"Rapport puces non écrit: {error}"))
+        return report_path
+
+    def _on_scan_mode_toggled(self):
+        tags = [tag for tag in self.entry_bib.bindtags() if tag != "ScanCapture"]
+        if self.scan_mode_var.get():
+            # Le bindtag passe avant celui de l'Entry: les frappes sont bufferisées sans modifier le widget
+            self.entry_bib.bindtags(("ScanCapture",) + tuple(tags))
+            self.entry_bib.delete(0, tk.END); self.entry_bib.focus_set()
+            if self._scan_batch_id is None:
+                self._scan_batch_id = self.after(SCAN_BATCH_INTERVAL_MS, self._process_scan_batch)
+            self.show_feedback(self.assign_feedback_label, "Mode scanner actif (dossards vers la file).", "green")
+        else:
+            self.entry_bib.bindtags(tuple(tags))
+            self.scan_capture.terminate()
+            if self._scan_batch_id is not None:
+                self.after_cancel(self._scan_batch_id); self._scan_batch_id = None
+            self._process_scan_batch(reschedule=False)
+
+    def _on_scan_key(self, event):
+        if event.keysym in ('Return', 'KP_Enter', 'Tab'):
+            self.scan_capture.terminate()
+        elif event.char and event.char.isprintable():
+            self.scan_capture.feed(event.char, event.time / 1000.0, time.monotonic())
+        return "break"
+
+    def _process_scan_batch(self, reschedule=True):
+        """Traite en une fois les scans accumulés : file des dossards, validation des paires, un seul retour visuel."""
+        self.scan_capture.flush_idle(time.monotonic())
+        scans = self.scan_capture.drain()
+        if scans:
+            rejected = []
+            for scan in scans:
+                if scan.isdigit():
+                    self.reconciler.add_bib(int(scan))
+                else:
+                    # Un scan illisible correspond quand même à un coureur: sa position est conservée
+                    self.reconciler.add_bib(None); rejected.append(scan)
+            committed = self._commit_reconciled_pairs() if self._running or self.start_time else 0
+            self._refresh_buffer_listbox(); self._refresh_reconcile_popup(); self.save_state()
+            msg = f"Scanner: {len(scans)} scan(s), dernier {scans[-1]}, {committed} classé(s)"
+            if rejected:
+                logging.warning(f"Scans non numériques mis en 'dossard manquant': {rejected}")
+                msg += f", {len(rejected)} illisible(s)"
+            self.show_feedback(self.assign_feedback_label, msg, "orange" if rejected else "green")
+        if reschedule and self.scan_mode_var.get():
+            self._scan_batch_id = self.after(SCAN_BATCH_INTERVAL_MS, self._process_scan_batch)
+        else:
+            self._scan_batch_id = None
 
 
     def setup_export_tab(self):
         ttk.Button(self.export_frame, text="Exporter résultats", command=self.export_results).pack(pady=20)
+        ttk.Button(self.export_frame, text="Exporter analyse arrivées", command=self.export_arrival_analytics).pack(pady=5)
+        ttk.Button(self.export_frame, text="Rapport mémoire", command=self.show_memory_report).pack(pady=5)
+
+        feed_frame = ttk.LabelFrame(self.export_frame, text="Flux de résultats en direct (dossier résultats)")
+        feed_frame.pack(pady=10, padx=10, fill='x')
+        self.live_feed_ndjson_var = tk.BooleanVar(value=self.live_feed_ndjson)
+        self.live_feed_csv_var = tk.BooleanVar(value=self.live_feed_csv)
+        ttk.Checkbutton(feed_frame, text="NDJSON (une ligne JSON par arrivée)", variable=self.live_feed_ndjson_var, command=self._on_live_feed_toggled).pack(anchor='w', padx=5)
+        ttk.Checkbutton(feed_frame, text="CSV (point-virgule)", variable=self.live_feed_csv_var, command=self._on_live_feed_toggled).pack(anchor='w', padx=5)
+
+        mirror_frame = ttk.LabelFrame(self.export_frame, text="Copie de secours (récupération, listes et dossier résultats)")
+        mirror_frame.pack(pady=10, padx=10, fill='x')
+        self.mirror_dir_var = tk.StringVar(value=self.settings.get('mirror_dir') or "(aucun)")
+        ttk.Label(mirror_frame, textvariable=self.mirror_dir_var).pack(side='top', anchor='w', padx=5)
+        self.mirror_status_label = ttk.Label(mirror_frame, text=self._backup_mirror_status(), foreground="grey")
+        self.mirror_status_label.pack(side='top', anchor='w', padx=5)
+        ttk.Button(mirror_frame, text="Choisir le dossier...", command=self._choose_backup_mirror_dir).pack(side='left', padx=5, pady=5)
+        ttk.Button(mirror_frame, text="Désactiver", command=self._disable_backup_mirror).pack(side='left', padx=5, pady=5)
+
+        team_frame = ttk.LabelFrame(self.export_frame, text="Classement par équipes (colonne Club)")
+        team_frame.pack(pady=10, padx=10, fill='x')
+        ttk.Label(team_frame, text="Coureurs qui marquent par club:").pack(side='left', padx=5)
+        self.team_size_var = tk.StringVar(value=str(self.team_size))
+        ttk.Spinbox(team_frame, from_=1, to=20, width=4, textvariable=self.team_size_var, command=self._on_team_size_changed).pack(side='left', padx=5)
+        self.team_size_var.trace_add('write', lambda *args: self._on_team_size_changed())
+
+    def _on_team_size_changed(self):
+        try: team_size = int(self.team_size_var.get())
+        except ValueError: return
+        if team_size < 1 or team_size == self.team_size: return
+        self.team_size = team_size
+        # Les tas sont bornés à N: changer N impose de les reconstruire depuis les résultats
+        self._rebuild_team_scores()
+        if self.rankings or self._running: self.save_state()
+
+    def show_memory_report(self):
+        lines = build_memory_report([
+            ("Participants", self.participants, True),
+            ("Participants catégorie chrono", self.filtered_participants_for_chrono, False),
+            ("Classements", self.rankings, True),
+            ("Buffer arrivées", self.buffer, True),
+            ("File des dossards", self.reconciler.bibs, True),
+        ])
+        for line in lines: logging.info(f"Mémoire - {line}")
+        messagebox.showinfo("Rapport Mémoire", "\n".join(lines))
 
     def _update_chrono_tab_for_category(self):
         if self.current_category: 
@@ -992,7 +4691,7 @@ class RaceTimerApp(tk.Tk):
             dist_f_str = f"{int(dist_f)}m" if isinstance(dist_f, (int, float)) else "N/A"
             if hasattr(self, 'lbl_dist_h'): self.lbl_dist_h.config(text=f"Distance Hommes: {dist_h_str}")
             if hasattr(self, 'lbl_dist_f'): self.lbl_dist_f.config(text=f"Distance Femmes: {dist_f_str}")
-            self.filtered_participants_for_chrono = [p for p in self.participants if p['cat'] == self.current_category]
+            self.filtered_participants_for_chrono = self.participant_index.members(self.current_category)
         else:
             if hasattr(self, 'lbl_dist_h'): self.lbl_dist_h.config(text="Distance Hommes: N/A")
             if hasattr(self, 'lbl_dist_f'): self.lbl_dist_f.config(text="Distance Femmes: N/A")
@@ -1031,20 +4730,123 @@ class RaceTimerApp(tk.Tk):
         if self.rankings: 
             if not messagebox.askyesno("Confirmation", f"Résultats existent pour '{self.current_category}'. Relancer effacera. Continuer ?"): return
             self._reset_race_state(clear_instance_counter=True) # Full reset here
-        self.start_time = datetime.datetime.now(); self._running = True
+        self.start_time = datetime.datetime.now(); self._start_monotonic = time.monotonic(); self._running = True
+        self._open_live_feed(); self.arrival_analytics.clear()
+        self.action_journal = ActionJournal.for_race(self.disk_writer, RESULTS_DIR, self.current_category, self.race_instance_counter[self.current_category] + 1)
+        self._journal({'op': 'start', 'category': self.current_category, 'start_time': self.start_time.isoformat(),
+                       'offsets': {str(bib): seconds for bib, seconds in self.start_offsets.items()}})
         self.update_timer(); logging.info(f"Course démarrée: {self.current_category} à {self.start_time}")
         self.show_feedback(self.assign_feedback_label, f"Course '{self.current_category}' démarrée!", "green")
 
+    def _journal(self, *entries):
+        if self.action_journal is not None: self.action_journal.record(*entries)
+
+    def _open_live_feed(self):
+        if not (self.live_feed_ndjson or self.live_feed_csv):
+            self.live_feed = None; return
+        run_number = self.race_instance_counter[self.current_category] + 1
+        self.live_feed = LiveResultsFeed.for_race(self.disk_writer, RESULTS_DIR, self.current_category, run_number,
+                                                  self.live_feed_ndjson, self.live_feed_csv)
+        logging.info(f"Flux direct: {self.live_feed.base_path}.{'/'.join(ext for ext, on in (('ndjson', self.live_feed_ndjson), ('csv', self.live_feed_csv)) if on)}")
+
+    def _on_live_feed_toggled(self):
+        self.live_feed_ndjson = self.live_feed_ndjson_var.get(); self.live_feed_csv = self.live_feed_csv_var.get()
+        if self.live_feed is not None:
+            # Pris en compte immédiatement pour la course en cours (les lignes suivantes seulement)
+            self.live_feed.ndjson = self.live_feed_ndjson; self.live_feed.csv_enabled = self.live_feed_csv
+        elif self._running and self.start_time:
+            self._open_live_feed()
+        if self._running or self.rankings: self.save_state()
+
+    def _anchor_start_monotonic(self):
+        # Après une restauration, l'ancre monotone est recalculée à partir de l'heure de départ sauvegardée
+        if self.start_time:
+            self._start_monotonic = time.monotonic() - (datetime.datetime.now() - self.start_time).total_seconds()
+        else:
+            self._start_monotonic = None
+
+    def _elapsed_timedelta(self):
+        if self._start_monotonic is not None:
+            return datetime.timedelta(seconds=time.monotonic() - self._start_monotonic)
+        return datetime.datetime.now() - self.start_time
+
+    def _race_elapsed_seconds(self):
+        if not (self._running and self._start_monotonic is not None): return None
+        return time.monotonic() - self._start_monotonic
+
     def update_timer(self):
         if self._running and self.start_time:
-            elapsed = datetime.datetime.now() - self.start_time; total_s = int(elapsed.total_seconds())
-            h,rem=divmod(total_s,3600); m,s=divmod(rem,60)
-            self.lbl_time.config(text=f"{h:02}:{m:02}:{s:02}"); self.after(1000, self.update_timer) 
+            if self._start_monotonic is None: self._anchor_start_monotonic()
+            self.clock_ticker.start(self._start_monotonic)
+            self._refresh_analytics_label()
+
+    def _analytics_now(self):
+        return self._elapsed_timedelta().total_seconds() if self.start_time else 0.0
+
+    def _refresh_analytics_label(self):
+        """Débits glissants affichés dans l'onglet Chrono ; rafraîchi chaque seconde tant que la course tourne."""
+        if self._analytics_refresh_id is not None:
+            self.after_cancel(self._analytics_refresh_id); self._analytics_refresh_id = None
+        if not hasattr(self, 'analytics_label'): return
+        text = self.arrival_analytics.summary_text(self._analytics_now()) if self.start_time else ""
+        if self.analytics_label.cget('text') != text: self.analytics_label.config(text=text)
+        if self._running:
+            self._analytics_refresh_id = self.after(1000, self._refresh_analytics_label)
+
+    def export_arrival_analytics(self):
+        if not self.arrival_analytics.arrivals:
+            messagebox.showinfo("Info", "Aucune arrivée enregistrée à analyser."); return
+        category = self.current_category or "course"
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        run_number = self.race_instance_counter[category] + 1
+        file_path = filedialog.asksaveasfilename(
+            initialdir=str(RESULTS_DIR), defaultextension='.csv',
+            initialfile=f"analyse_arrivees_{category.replace(' ', '_').replace('/', '-')}_course_{run_number}.csv",
+            filetypes=[('CSV (point-virgule)', '*.csv'), ('Tous', '*.*')])
+        if not file_path: return
+        f = io.StringIO(newline='')
+        self.arrival_analytics.write_csv(f, category)
+
+        def on_written(error):
+            if error is None:
+                logging.info(f"Analyse des arrivées exportée: {file_path}")
+                messagebox.showinfo("Succès", f"Analyse des arrivées exportée vers:\n{file_path}")
+            else:
+                logging.error(f"Erreur écriture fichier {file_path}: {error}")
+                messagebox.showerror("Erreur d'écriture", f"Impossible d'écrire fichier (ouvert/protégé):\n{file_path}\n\n{error}")
+        self.disk_writer.replace(file_path, f.getvalue(), encoding='utf-8-sig', callback=on_written)
+
+    def _on_tenths_toggled(self):
+        tenths = self.tenths_var.get()
+        for clock in self.clock_ticker.clocks: clock.tenths = tenths
+        if self.clock_ticker.running:
+            self.clock_ticker.reschedule()
+        else:
+            self.clock_ticker.show_all(self._elapsed_timedelta().total_seconds() if self.start_time else 0)
+
+    def _open_big_clock_window(self):
+        """Fenêtre d'affichage grand format (écran externe), alimentée par la même source de ticks."""
+        if self.big_clock_window is not None and self.big_clock_window.winfo_exists():
+            self.big_clock_window.deiconify(); self.big_clock_window.lift(); return
+        window = tk.Toplevel(self)
+        window.title("Chrono")
+        label = tk.Label(window, text=self.lbl_time.cget('text'), font=('TkDefaultFont', 96, 'bold'), bg='black', fg='white')
+        label.pack(expand=True, fill='both')
+        big_clock = ClockDisplay(label, self._race_elapsed_seconds, tenths=self.tenths_var.get())
+        self.clock_ticker.add(big_clock)
+
+        def close_big_clock():
+            self.clock_ticker.remove(big_clock)
+            self.big_clock_window = None
+            window.destroy()
+        window.protocol("WM_DELETE_WINDOW", close_big_clock)
+        self.big_clock_window = window
 
     def finish_race(self):
         if not self.start_time: self.show_feedback(self.assign_feedback_label, "Course non démarrée.", "red"); return
         if not self._running: self.show_feedback(self.assign_feedback_label, "Course déjà terminée/réinit.", "orange"); return
-        self._running = False; logging.info(f"Course terminée: {self.current_category}")
+        self._running = False; self.clock_ticker.stop(); logging.info(f"Course terminée: {self.current_category}")
+        self._journal({'op': 'finish'})
         self.show_feedback(self.assign_feedback_label, f"Course '{self.current_category}' terminée.", "green")
         self.save_state() 
         if self.rankings and self.current_category:
@@ -1052,11 +4854,21 @@ class RaceTimerApp(tk.Tk):
             except Exception as e: logging.error(f"Export auto échec: {e}"); messagebox.showerror("Erreur Export Auto", f"Erreur export auto:\n{e}\nExportez manuellement.")
 
     def _reset_race_state(self, clear_instance_counter=True): 
-        self._running = False
-        if hasattr(self, 'lbl_time'): self.lbl_time.config(text="00:00:00")
-        self.start_time = None; self.buffer.clear()
-        if hasattr(self, 'buf_list'): self.buf_list.delete(0, tk.END)
-        self.rankings.clear()
+        was_running = self._running
+        self._running = False; self.clock_ticker.stop()
+        self.clock_ticker.show_all(0)
+        self.start_time = None; self._start_monotonic = None; self.buffer.clear(); self.reconciler.clear_bibs()
+        if self.live_feed is not None:
+            # Les lignes déjà publiées restent: les consommateurs reçoivent un enregistrement d'annulation
+            if self.rankings: self.live_feed.reset("Course réinitialisée")
+            self.live_feed = None
+        if self.action_journal is not None:
+            # Une course terminée garde son journal intact (rejouable) ; seule une course en cours est annulée
+            if was_running: self._journal({'op': 'reset'})
+            self.action_journal = None
+        self._refresh_buffer_listbox(); self._refresh_reconcile_popup()
+        self.rankings.clear(); self.team_scorer.clear()
+        self.arrival_analytics.clear(); self._refresh_analytics_label()
         if clear_instance_counter: 
             if self.current_category: # Only clear counter for the *current* category if one is set
                 self.race_instance_counter[self.current_category] = 0 
@@ -1080,47 +4892,102 @@ class RaceTimerApp(tk.Tk):
 
     def new_arrival(self):
         if not self._running or not self.start_time: self.show_feedback(self.assign_feedback_label, "Course non démarrée/terminée.", "red"); return
-        arr_time_obj = datetime.datetime.now() - self.start_time; self.buffer.append(arr_time_obj)
-        total_s = int(arr_time_obj.total_seconds()); h,r=divmod(total_s,3600); m,s=divmod(r,60)
-        self.buf_list.insert(tk.END, f"{self.buf_list.size() + 1}. {h:02}:{m:02}:{s:02}")
-        self.buf_list.see(tk.END); logging.debug(f"Nvelle arrivée buffer: {h:02}:{m:02}:{s:02}"); self.save_state() 
+        arr_time_obj = self._elapsed_timedelta(); self.buffer.append(arr_time_obj)
+        self._journal({'op': 'arrival', 't': arr_time_obj.total_seconds()})
+        self.arrival_analytics.arrival(arr_time_obj.total_seconds())
+        position = len(self.buffer) - 1
+        self.buf_list.insert(tk.END, self._buffer_line_text(position))
+        self.buf_list.see(tk.END); logging.debug(f"Nvelle arrivée buffer: {format_elapsed(arr_time_obj.total_seconds())}")
+        self._refresh_reconcile_popup(); self.save_state() 
 
     def delete_selected_buffer_time(self):
         sel_indices = self.buf_list.curselection()
         if not sel_indices: self.show_feedback(self.assign_feedback_label, "Aucune arrivée sélectionnée.", "red"); return
+        dropped = []
         for index in sorted(sel_indices, reverse=True):
-            try: del self.buffer[index]; self.buf_list.delete(index)
+            try:
+                self.arrival_analytics.consume(self.buffer[index].total_seconds(), self._analytics_now(), 'suppression')
+                dropped.append({'op': 'drop', 't': self.buffer[index].total_seconds()})
+                del self.buffer[index]
             except IndexError: logging.error(f"Erreur index suppression buffer: {index}")
-        items_text = self.buf_list.get(0, tk.END); self.buf_list.delete(0, tk.END)
-        for i, item_full_text in enumerate(items_text):
-            try: time_part = item_full_text.split('. ', 1)[1]; self.buf_list.insert(tk.END, f"{i + 1}. {time_part}")
-            except IndexError: self.buf_list.insert(tk.END, item_full_text) 
+        self._journal(*dropped)
+        self._refresh_buffer_listbox(); self._refresh_reconcile_popup()
         self.save_state(); self.show_feedback(self.assign_feedback_label, "Arrivée(s) buffer supprimée(s).", "green")
 
+    def _buffer_line_text(self, position):
+        line = f"{position + 1}. {format_elapsed(self.buffer[position].total_seconds())}"
+        if position < len(self.reconciler.bibs):
+            bib = self.reconciler.bibs[position]
+            line += f"  → {bib if bib is not None else '?'}"
+        return line
+
+    def _refresh_buffer_listbox(self):
+        if not hasattr(self, 'buf_list'): return
+        self.buf_list.delete(0, tk.END)
+        for position in range(len(self.buffer)):
+            self.buf_list.insert(tk.END, self._buffer_line_text(position))
+
     def assign_arrival(self, mark_as_abandon=False):
         bib_txt = self.entry_bib.get().strip()
         if not bib_txt.isdigit(): self.show_feedback(self.assign_feedback_label, "Dossard invalide.", "red"); return
         bib = int(bib_txt)
-        if not any(p['bib'] == bib for p in self.filtered_participants_for_chrono): 
+        if not self.participant_index.in_category(bib, self.current_category): 
             self.show_feedback(self.assign_feedback_label, f"Dossard {bib} non trouvé.", "red"); return
-        if any(r['bib'] == bib for r in self.rankings):
+        if any(r.bib == bib for r in self.rankings):
             self.show_feedback(self.assign_feedback_label, f"Dossard {bib} déjà classé.", "orange"); self.entry_bib.delete(0,tk.END); return
 
         if mark_as_abandon:
-            self.rankings.append({'bib': bib, 'time': None, 'abandon': True})
+            self._append_result(Result(bib, None, True), 'arrivee')
+            self._journal({'op': 'result', 'bib': bib, 't': None, 'abandon': True, 'src': 'arrivee'})
             self.show_feedback(self.assign_feedback_label, f"Dossard {bib} abandonné.", "green")
         else: 
             if not self.buffer: self.show_feedback(self.assign_feedback_label, "Buffer vide.", "red"); return
-            time_obj = self.buffer.pop(0); self.buf_list.delete(0)    
-            items = self.buf_list.get(0, tk.END); self.buf_list.delete(0, tk.END) 
-            for i, item_text in enumerate(items): 
-                try: self.buf_list.insert(tk.END, f"{i+1}. {item_text.split('. ',1)[1]}")
-                except IndexError: self.buf_list.insert(tk.END, item_text) 
-            self.rankings.append({'bib': bib, 'time': time_obj, 'abandon': False})
-            time_str = str(time_obj).split('.')[0]
-            self.show_feedback(self.assign_feedback_label, f"Dossard {bib}: {time_str}", "green")
+            if self.reconciler.bibs:
+                # La file des dossards est appariée au buffer par position : une saisie directe décalerait les paires
+                self.show_feedback(self.assign_feedback_label, "File de dossards active: validez via Rapprochement.", "orange"); return
+            time_obj = self.buffer.pop(0)
+            self.arrival_analytics.consume(time_obj.total_seconds(), self._analytics_now())
+            self._refresh_buffer_listbox()
+            result = Result(bib, time_obj, False)
+            self._append_result(result, 'arrivee')
+            self._journal({'op': 'assign', 'bib': bib, 't': time_obj.total_seconds(), 'src': 'arrivee'})
+            time_str = str(self._net_time(result)).split('.')[0]
+            offset_note = " (net)" if bib in self.start_offsets else ""
+            pace = format_pace(self._performance_for([result])[0][0])
+            pace_note = f" - {pace} /km" if pace else ""
+            self.show_feedback(self.assign_feedback_label, f"Dossard {bib}: {time_str}{offset_note}{pace_note}", "green")
         self.entry_bib.delete(0, tk.END); self.save_state()
 
+    def _append_result(self, result, source):
+        self.rankings.append(result)
+        participant = self.participant_index.by_bib.get(result.bib)
+        offset = self.start_offsets.get(result.bib, 0.0)
+        self.team_scorer.add(result, participant, offset)
+        if self.live_feed is not None:
+            extra = performance_fields(*(column[0] for column in self._performance_for([result])))
+            self.live_feed.result(result, participant, self.current_category, source, offset, extra)
+
+    def _performance_for(self, results):
+        """Colonnes (allure, vitesse, % âge) des résultats donnés : temps net, distance de la catégorie et du sexe
+        de chaque coureur, âge atteint l'année de la course. Distance, sexe et âge viennent de la table des profils
+        tenue par l'index des participants ; seul le temps net est calculé ici. Voir performance_columns."""
+        nan = float('nan')
+        year = (self.start_time or datetime.datetime.now()).year
+        profiles = self.participant_index.performance_profiles(self.distances, year)
+        unknown, offsets = (nan, None, nan), self.start_offsets
+        rows = [profiles.get(r.bib, unknown) for r in results]
+        distances, sexes, ages = ([row[i] for row in rows] for i in range(3))
+        # Même règle que _net_time: arrivée moins décalage, jamais négatif
+        net_seconds = [max(0.0, r.time.total_seconds() - offsets.get(r.bib, 0.0)) if r.time is not None else nan for r in results]
+        return performance_columns(net_seconds, distances, sexes, ages, self.age_grade_table)
+
+    def _net_time(self, result):
+        """Temps net: arrivée moins le décalage de départ du dossard (None pour un abandon)."""
+        if result.time is None: return None
+        offset = self.start_offsets.get(result.bib)
+        if not offset: return result.time
+        return max(datetime.timedelta(0), result.time - datetime.timedelta(seconds=offset))
+
     def add_manual_result(self):
         bib_txt = self.manual_bib_entry.get().strip()
         time_str = self.manual_time_entry.get().strip()
@@ -1128,16 +4995,17 @@ class RaceTimerApp(tk.Tk):
         if not bib_txt.isdigit(): self.show_feedback(self.manual_feedback_label, "Dossard manuel invalide.", "red"); return
         bib = int(bib_txt)
         if not self.current_category: self.show_feedback(self.manual_feedback_label, "Aucune catégorie.", "red"); return
-        if not any(p['bib'] == bib for p in self.filtered_participants_for_chrono): 
+        if not self.participant_index.in_category(bib, self.current_category): 
             self.show_feedback(self.manual_feedback_label, f"Dossard {bib} non trouvé.", "red"); return
-        if any(r['bib'] == bib for r in self.rankings): 
+        if any(r.bib == bib for r in self.rankings): 
             self.show_feedback(self.manual_feedback_label, f"Dossard {bib} déjà classé.", "orange"); return
         final_time_obj = None
         if not is_abandon:
             try:
                 h, m, s = map(int, time_str.split(':')); final_time_obj = datetime.timedelta(hours=h, minutes=m, seconds=s)
             except ValueError: self.show_feedback(self.manual_feedback_label, "Format temps HH:MM:SS.", "red"); return
-        self.rankings.append({'bib': bib, 'time': final_time_obj, 'abandon': is_abandon})
+        self._append_result(Result(bib, final_time_obj, is_abandon), 'manuel')
+        self._journal({'op': 'result', 'bib': bib, 't': final_time_obj.total_seconds() if final_time_obj else None, 'abandon': is_abandon, 'src': 'manuel'})
         msg = f"Dossard {bib} abandon" if is_abandon else f"Dossard {bib} temps {time_str}"
         self.show_feedback(self.manual_feedback_label, msg + " ajouté.", "green")
         self.manual_bib_entry.delete(0, tk.END); self.manual_time_entry.delete(0, tk.END); self.manual_abandon_var.set(False)
@@ -1150,94 +5018,198 @@ class RaceTimerApp(tk.Tk):
         RESULTS_DIR.mkdir(parents=True, exist_ok=True)
         normalized_cat_for_lookup = self.current_category 
         
-        file_path = None
-        while True: 
-            if not file_path: 
-                current_run_num = self.race_instance_counter[normalized_cat_for_lookup] + 1
-                suffix = f"_course_{current_run_num}" if current_run_num > 1 else ""
-                cat_name_for_file = normalized_cat_for_lookup.replace(' ', '_').replace('/', '-') 
-                default_filename = f"resultats_{cat_name_for_file}{suffix}.csv"
-                
-                file_path = filedialog.asksaveasfilename(
-                    initialdir=str(RESULTS_DIR), 
-                    defaultextension='.csv', 
-                    initialfile=default_filename, 
-                    filetypes=[('CSV (point-virgule)', '*.csv'), ('Tous', '*.*')]
-                )
-            if not file_path: logging.info("Export annulé."); return 
-            try:
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as f: 
-                    writer = csv.writer(f, delimiter=';')
-                    writer.writerow(["Résultats Catégorie:", self.current_category, "", "", "", ""]) 
-                    
-                    dist_h_val = self.distances['h'].get(normalized_cat_for_lookup, "N/A")
-                    dist_f_val = self.distances['f'].get(normalized_cat_for_lookup, "N/A")
-                    annees_val = self.annees_categories.get(normalized_cat_for_lookup, "N/A") 
+        current_run_num = self.race_instance_counter[normalized_cat_for_lookup] + 1
+        suffix = f"_course_{current_run_num}" if current_run_num > 1 else ""
+        cat_name_for_file = normalized_cat_for_lookup.replace(' ', '_').replace('/', '-') 
+        default_filename = f"resultats_{cat_name_for_file}{suffix}.csv"
+        
+        file_path = filedialog.asksaveasfilename(
+            initialdir=str(RESULTS_DIR), 
+            defaultextension='.csv', 
+            initialfile=default_filename, 
+            filetypes=[('CSV (point-virgule)', '*.csv'), ('Tous', '*.*')]
+        )
+        if not file_path: logging.info("Export annulé."); return 
+        try:
+            # Le CSV est construit en mémoire ; l'écriture (atomique) se fait sur le thread d'écriture
+            f = io.StringIO(newline='')
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(["Résultats Catégorie:", self.current_category, "", "", "", ""]) 
+            
+            dist_h_val = self.distances['h'].get(normalized_cat_for_lookup, "N/A")
+            dist_f_val = self.distances['f'].get(normalized_cat_for_lookup, "N/A")
+            annees_val = self.annees_categories.get(normalized_cat_for_lookup, "N/A") 
 
-                    dist_h_str = f"{int(dist_h_val)}m" if isinstance(dist_h_val, (int, float)) else "N/A"
-                    dist_f_str = f"{int(dist_f_val)}m" if isinstance(dist_f_val, (int, float)) else "N/A"
-                    
-                    writer.writerow([f"Distance Hommes ({self.current_category}):", dist_h_str, 
-                                     f"Distance Femmes ({self.current_category}):", dist_f_str, "", ""])
-                    writer.writerow([f"Années:", annees_val, "", "", "", ""]) 
-                    writer.writerow([]) 
-
-                    writer.writerow(['Classement Scratch Général (valides)', "", "", "", "", ""])
-                    writer.writerow(['Pos.', 'Dossard', 'Nom', 'Prénom', 'Sexe', 'Temps'])
-                    valid_ranks = sorted([r for r in self.rankings if not r['abandon'] and r['time'] is not None], key=lambda r: r['time'])
-                    if not valid_ranks: 
-                        writer.writerow(["", "(Aucun classement scratch à afficher)", "", "", "", ""])
-                    for pos, r_data in enumerate(valid_ranks, 1):
-                        p_details = next((p for p in self.participants if p['bib'] == r_data['bib']), None) 
-                        time_s = str(r_data['time']).split('.')[0] if r_data['time'] else "Abd."
-                        if p_details: writer.writerow([pos, p_details['bib'], p_details['nom'], p_details['prenom'], p_details['sexe'].upper(), time_s])
-                        else: writer.writerow([pos, r_data['bib'], "N/A", "N/A", "N/A", time_s])
-                    
-                    category_abandons_all = [r for r in self.rankings if r['abandon']]
+            dist_h_str = f"{int(dist_h_val)}m" if isinstance(dist_h_val, (int, float)) else "N/A"
+            dist_f_str = f"{int(dist_f_val)}m" if isinstance(dist_f_val, (int, float)) else "N/A"
+            
+            writer.writerow([f"Distance Hommes ({self.current_category}):", dist_h_str, 
+                             f"Distance Femmes ({self.current_category}):", dist_f_str, "", ""])
+            writer.writerow([f"Années:", annees_val, "", "", "", ""]) 
+            writer.writerow([]) 
+
+            # Classement au temps net (arrivée - décalage de départ); temps brut et décalage ajoutés s'il y en a
+            net_times = {r.bib: self._net_time(r) for r in self.rankings if not r.abandon and r.time is not None}
+            with_offsets = any(bib in self.start_offsets for bib in net_times)
+            def offset_cols(r_data):
+                if not with_offsets: return []
+                return [str(r_data.time).split('.')[0], format_elapsed(self.start_offsets.get(r_data.bib, 0.0))]
+
+            valid_ranks = sorted([r for r in self.rankings if r.bib in net_times], key=lambda r: net_times[r.bib])
+            # Allure, vitesse et % âge de tous les classés en une passe par colonne
+            paces, speeds, pcts = self._performance_for(valid_ranks)
+            with_perf = any(pace > 0 for pace in paces)
+            with_age = with_perf and any(pct > 0 for pct in pcts)
+            perf_by_bib = {r_data.bib: index for index, r_data in enumerate(valid_ranks)}
+            perf_header = (['Allure (min/km)', 'Vitesse (km/h)'] if with_perf else []) + (['% Âge'] if with_age else [])
+            def perf_cols(r_data):
+                if not with_perf: return []
+                index = perf_by_bib[r_data.bib]
+                cols = [format_pace(paces[index]), f"{speeds[index]:.2f}" if speeds[index] > 0 else '']
+                if with_age: cols.append(f"{pcts[index]:.1f}" if pcts[index] > 0 else '')
+                return cols
+
+            writer.writerow(['Classement Scratch Général (valides)', "", "", "", "", ""])
+            writer.writerow(['Pos.', 'Dossard', 'Nom', 'Prénom', 'Sexe', 'Temps'] + (['Temps brut', 'Décalage'] if with_offsets else []) + perf_header)
+            if not valid_ranks: 
+                writer.writerow(["", "(Aucun classement scratch à afficher)", "", "", "", ""])
+            # Un seul index dossard -> participant (références partagées) au lieu d'un parcours de la liste par résultat
+            participants_by_bib = self.participant_index.by_bib
+            for pos, r_data in enumerate(valid_ranks, 1):
+                p_details = participants_by_bib.get(r_data.bib) 
+                time_s = str(net_times[r_data.bib]).split('.')[0]
+                if p_details: writer.writerow([pos, p_details.bib, p_details.nom, p_details.prenom, p_details.sexe.upper(), time_s] + offset_cols(r_data) + perf_cols(r_data))
+                else: writer.writerow([pos, r_data.bib, "N/A", "N/A", "N/A", time_s] + offset_cols(r_data) + perf_cols(r_data))
+            
+            category_abandons_all = [r for r in self.rankings if r.abandon]
 
-                    groups = defaultdict(list)
-                    for r_data in valid_ranks: 
-                        p_details = next((p for p in self.participants if p['bib'] == r_data['bib']), None) 
-                        if p_details: groups[p_details['sexe']].append((r_data, p_details))
-                    
-                    for sex_key in ['h', 'f']: 
-                        writer.writerow([]) 
-                        sex_name = "Hommes" if sex_key == 'h' else "Femmes" if sex_key == 'f' else f"Sexe {sex_key.upper()}"
-                        writer.writerow([f"Classement Catégorie {self.current_category} - {sex_name}", "", "", "", "", ""])
-                        writer.writerow(['Pos.', 'Dossard', 'Nom', 'Prénom', 'Temps', '']) 
-                        
-                        sex_ranks_tuples = groups.get(sex_key, []) 
-                        sorted_sex_group = sorted(sex_ranks_tuples, key=lambda item: item[0]['time'])
-                        
-                        if not sorted_sex_group:
-                             writer.writerow(["", "(Aucun classé)", "", "", "", ""])
-                        for pos_sex, (r_data, p_details) in enumerate(sorted_sex_group, 1):
-                            time_s = str(r_data['time']).split('.')[0] if r_data['time'] else "Abd."
-                            writer.writerow([pos_sex, p_details['bib'], p_details['nom'], p_details['prenom'], time_s, ''])
-                        
-                        sex_specific_abandons = [r for r in category_abandons_all if next((p['sexe'] for p in self.participants if p['bib'] == r['bib']), None) == sex_key]
-                        writer.writerow(["Abandons " + sex_name, "", "", "", "", ""]) 
-                        if sex_specific_abandons:
-                            writer.writerow(['Dossard', 'Nom', 'Prénom', '', '', '']) 
-                            for r_data_abandon in sex_specific_abandons:
-                                p_details_abandon = next((p for p in self.participants if p['bib'] == r_data_abandon['bib']), None)
-                                if p_details_abandon: writer.writerow([p_details_abandon['bib'], p_details_abandon['nom'], p_details_abandon['prenom'], '', '', ''])
-                                else: writer.writerow([r_data_abandon['bib'], "N/A", "N/A", '', '', ''])
-                        else:
-                            writer.writerow(["", "(Aucun abandon)", "", "", "", ""])
+            # valid_ranks est déjà trié par temps: les groupes par sexe le restent
+            groups = defaultdict(list)
+            for r_data in valid_ranks: 
+                p_details = participants_by_bib.get(r_data.bib) 
+                if p_details: groups[p_details.sexe].append(r_data)
+            
+            for sex_key in ['h', 'f']: 
+                writer.writerow([]) 
+                sex_name = "Hommes" if sex_key == 'h' else "Femmes" if sex_key == 'f' else f"Sexe {sex_key.upper()}"
+                writer.writerow([f"Classement Catégorie {self.current_category} - {sex_name}", "", "", "", "", ""])
+                writer.writerow(['Pos.', 'Dossard', 'Nom', 'Prénom', 'Temps', ''] + (['Temps brut', 'Décalage'] if with_offsets else []) + perf_header) 
+                
+                sorted_sex_group = groups.get(sex_key, []) 
                 
-                logging.info(f"Résultats exportés: {file_path}")
-                messagebox.showinfo("Succès", f"Résultats exportés vers:\n{file_path}")
-                self.race_instance_counter[normalized_cat_for_lookup] += 1 
-                self.save_state(); break 
-            except (IOError, PermissionError) as e_io:
-                logging.error(f"Erreur écriture fichier {file_path}: {e_io}")
-                if not messagebox.askretrycancel("Erreur d'écriture", f"Impossible d'écrire fichier (ouvert/protégé):\n{file_path}\n\n{e_io}\n\nRéessayer ?"):
-                    logging.info("Export abandonné après erreur écriture."); return
-                file_path = None 
-            except Exception as e_exp:
-                logging.exception("Erreur export résultats."); messagebox.showerror("Erreur Export", f"Erreur export: {e_exp}"); return
+                if not sorted_sex_group:
+                     writer.writerow(["", "(Aucun classé)", "", "", "", ""])
+                for pos_sex, r_data in enumerate(sorted_sex_group, 1):
+                    p_details = participants_by_bib[r_data.bib]
+                    time_s = str(net_times[r_data.bib]).split('.')[0]
+                    writer.writerow([pos_sex, p_details.bib, p_details.nom, p_details.prenom, time_s, ''] + offset_cols(r_data) + perf_cols(r_data))
+                
+                sex_specific_abandons = [r for r in category_abandons_all if r.bib in participants_by_bib and participants_by_bib[r.bib].sexe == sex_key]
+                writer.writerow(["Abandons " + sex_name, "", "", "", "", ""]) 
+                if sex_specific_abandons:
+                    writer.writerow(['Dossard', 'Nom', 'Prénom', '', '', '']) 
+                    for r_data_abandon in sex_specific_abandons:
+                        p_details_abandon = participants_by_bib.get(r_data_abandon.bib)
+                        if p_details_abandon: writer.writerow([p_details_abandon.bib, p_details_abandon.nom, p_details_abandon.prenom, '', '', ''])
+                        else: writer.writerow([r_data_abandon.bib, "N/A", "N/A", '', '', ''])
+                else:
+                    writer.writerow(["", "(Aucun abandon)", "", "", "", ""])
+
+            if self.team_scorer.has_teams():
+                for sex_key in ['h', 'f']:
+                    writer.writerow([])
+                    sex_name = "Hommes" if sex_key == 'h' else "Femmes"
+                    writer.writerow([f"Classement par Équipes {self.current_category} - {sex_name} ({self.team_scorer.top_n} premiers)", "", "", "", "", ""])
+                    writer.writerow(['Pos.', 'Club', 'Points', 'Coureurs (place)', 'Complète', ''])
+                    standings = self.team_scorer.standings(sex_key)
+                    if not standings:
+                        writer.writerow(["", "(Aucune équipe)", "", "", "", ""])
+                    for pos_team, (club, points, scorers, complete) in enumerate(standings, 1):
+                        scorers_str = ", ".join(f"{bib} ({place})" for place, bib in scorers)
+                        writer.writerow([pos_team if complete else "", club, points, scorers_str, "Oui" if complete else "Non", ''])
+        except Exception as e_exp:
+            logging.exception("Erreur export résultats."); messagebox.showerror("Erreur Export", f"Erreur export: {e_exp}"); return
+        self.disk_writer.replace(file_path, f.getvalue(), encoding='utf-8-sig',
+                                 callback=lambda error: self._on_results_exported(file_path, normalized_cat_for_lookup, error))
+
+    def _on_results_exported(self, file_path, category, error):
+        if error is None:
+            logging.info(f"Résultats exportés: {file_path}")
+            messagebox.showinfo("Succès", f"Résultats exportés vers:\n{file_path}")
+            self.race_instance_counter[category] += 1 
+            self.save_state()
+            return
+        logging.error(f"Erreur écriture fichier {file_path}: {error}")
+        if not messagebox.askretrycancel("Erreur d'écriture", f"Impossible d'écrire fichier (ouvert/protégé):\n{file_path}\n\n{error}\n\nRéessayer ?"):
+            logging.info("Export abandonné après erreur écriture."); return
+        if category == self.current_category: self.export_results()
+
+def replay_main(argv):
+    """Ligne de commande sans interface : rejoue un journal d'actions avec corrections et compare à un export.
+
+    python race_timer_app.py --replay journal_X.ndjson --fix "bib 312->321" --fix "insert 57" --against resultats_X.csv"""
+    parser = argparse.ArgumentParser(prog="race_timer_app.py --replay",
+                                     description="Rejoue un journal d'actions, applique des corrections et recalcule le classement.")
+    parser.add_argument('--replay', required=True, metavar='JOURNAL', help="Journal NDJSON (résultats/journal_*.ndjson)")
+    parser.add_argument('--fix', action='append', default=[], metavar='CORRECTION',
+                        help="'bib 312->321', 'insert 57 [HH:MM:SS.d]' (arrivée manquée avant la n°57) ou 'delete 12' (répétable)")
+    parser.add_argument('--corrections', metavar='FICHIER', help="Fichier de corrections, une par ligne (# pour commenter)")
+    parser.add_argument('--against', metavar='CSV', help="Export de résultats à comparer au classement recalculé")
+    parser.add_argument('--output', metavar='CSV', help="Écrit la différence (avec --against) ou le classement recalculé")
+    args = parser.parse_args(argv)
+
+    fix_lines = list(args.fix)
+    if args.corrections:
+        with open(args.corrections, 'r', encoding='utf-8-sig') as f:
+            fix_lines += [line.split('#', 1)[0] for line in f]
+    try:
+        corrections = [parse_journal_correction(line) for line in fix_lines if line.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    t0 = time.perf_counter()
+    events, skipped = read_journal(args.replay)
+    t_read = time.perf_counter()
+    corrected, warnings = apply_journal_corrections(events, corrections)
+    replay = replay_journal(corrected)
+    scratch = replay.scratch()
+    t_done = time.perf_counter()
+    print(f"Journal {pathlib.Path(args.replay).name}: {len(events)} actions ({skipped} ligne(s) illisible(s)), "
+          f"{len(corrections)} correction(s), catégorie {replay.category or '?'}")
+    print(f"Relecture: {len(scratch)} classé(s), {len(replay.abandons())} abandon(s), {len(replay.buffer)} temps non attribué(s) ; "
+          f"lecture {(t_read - t0) * 1000:.0f} ms, recalcul {(t_done - t_read) * 1000:.0f} ms")
+    if replay.time_changes:
+        print(f"{replay.time_changes} dossard(s) appariés à un autre temps qu'à l'origine (buffer décalé).")
+    for warning in warnings + replay.warnings:
+        print(f"Attention: {warning}")
+
+    f = io.StringIO(newline='')
+    writer = csv.writer(f, delimiter=';')
+    if args.against:
+        old_scratch, old_abandons = read_exported_scratch(args.against)
+        rows = scratch_diff(old_scratch, old_abandons, scratch, replay.abandons())
+        print(f"Différences avec {pathlib.Path(args.against).name}: {len(rows)} dossard(s)")
+        for bib, status, old_pos, new_pos, old_time, new_time in rows[:20]:
+            print(f"  {bib}: {status} ({old_pos or '-'} {old_time or '-'} -> {new_pos or '-'} {new_time or '-'})")
+        if len(rows) > 20: print(f"  ... {len(rows) - 20} autre(s)")
+        writer.writerow(['Dossard', 'Statut', 'Ancienne pos.', 'Nouvelle pos.', 'Ancien temps', 'Nouveau temps'])
+        writer.writerows(['' if value is None else value for value in row] for row in rows)
+    else:
+        for pos, bib, seconds in scratch[:10]:
+            print(f"  {pos}. {bib} {format_elapsed(seconds)}")
+        writer.writerow(['Pos.', 'Dossard', 'Temps', 'Temps brut', 'Décalage'])
+        for pos, bib, seconds in scratch:
+            offset = replay.offsets.get(bib, 0.0)
+            writer.writerow([pos, bib, format_elapsed(seconds), format_elapsed(seconds + offset) if offset else '', format_elapsed(offset) if offset else ''])
+    if args.output:
+        write_file_atomic(pathlib.Path(args.output), f.getvalue().encode('utf-8-sig'))
+        print(f"Écrit: {args.output}")
+    return 0
+
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # Exécutable figé (PyInstaller) : les processus d'import relancent ce programme
+    if '--replay' in sys.argv[1:]:
+        sys.exit(replay_main(sys.argv[1:]))
     app = RaceTimerApp()  
     app.mainloop()
@@ -0,0 +1,217 @@
+"""Test d'endurance de la ligne d'arrivée : pilote la vraie application RaceTimerApp (Tk) sous un serveur X virtuel.
+
+Les arrivées ("Nouvelle arrivée") et les validations de dossard sont injectées à des débits croissants
+(ex: 5 -> 50 arrivées/s). Pour chaque palier on mesure le retard de la boucle d'événements Tk, la durée des
+callbacks et le débit réellement tenu ; le rapport donne le débit soutenu avant saturation de l'interface.
+
+Usage: python soak_test.py --rates 5,10,20,50 --duration 20
+"""
+import argparse
+import json
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import race_timer_app
+from race_timer_app import RaceTimerApp, messagebox
+
+HEARTBEAT_INTERVAL_MS = 10 # Sonde de retard de la boucle d'événements
+SOAK_CATEGORY = "Soak"
+
+
+def percentile(values, fraction):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def start_virtual_display():
+    """Démarre Xvfb sur un numéro d'affichage libre si aucun DISPLAY n'est disponible. Retourne le processus (ou None)."""
+    if os.environ.get('DISPLAY'):
+        return None
+    if not shutil.which('Xvfb'):
+        sys.exit("Aucun DISPLAY et Xvfb introuvable: installez Xvfb ou lancez avec xvfb-run.")
+    for display_num in range(90, 120):
+        if pathlib.Path(f"/tmp/.X11-unix/X{display_num}").exists(): continue
+        proc = subprocess.Popen(['Xvfb', f':{display_num}', '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if pathlib.Path(f"/tmp/.X11-unix/X{display_num}").exists():
+                os.environ['DISPLAY'] = f":{display_num}"
+                return proc
+            if proc.poll() is not None: break
+            time.sleep(0.1)
+        proc.kill()
+    sys.exit("Impossible de démarrer Xvfb.")
+
+
+def prepare_sandbox(work_dir, participant_count):
+    """Redirige les fichiers de l'application vers un dossier temporaire et crée une liste de départ de test."""
+    work_dir = pathlib.Path(work_dir)
+    race_timer_app.RECOVERY_FILE = work_dir / "race_recovery_state.json"
+    race_timer_app.CONFIG_FILENAME = work_dir / "categories.ini"
+    race_timer_app.LISTE_DEPARTS_FILENAME = work_dir / "liste_departs.csv"
+    race_timer_app.RESULTS_DIR = work_dir / "résultats"
+    race_timer_app.STARTUP_CACHE_FILE = work_dir / "race_timer_cache.pickle"
+    race_timer_app.SETTINGS_FILENAME = work_dir / "race_timer_settings.json" # Pas de miroir de secours pendant le test
+    race_timer_app.START_OFFSETS_FILENAME = work_dir / "decalages_depart.json"
+    race_timer_app.DIAGNOSTICS_LOG_FILENAME = work_dir / "diagnostics_blocages.log"
+    race_timer_app.CONFIG_FILENAME.write_text(
+        f"[{SOAK_CATEGORY}]\ndistance_h = 5000\ndistance_f = 5000\nannees = 2000-2010\n", encoding='utf-8')
+    with race_timer_app.LISTE_DEPARTS_FILENAME.open('w', encoding='utf-8-sig', newline='') as f:
+        f.write("N° Dossard;Nom;Prénom;Sexe;Catégorie\n")
+        for bib in range(1, participant_count + 1):
+            f.write(f"{bib};Coureur{bib};Test{bib};{'h' if bib % 2 else 'f'};{SOAK_CATEGORY}\n")
+
+
+def silence_dialogs():
+    # Les boîtes de dialogue modales bloqueraient la boucle Tk pilotée par le script
+    for name in ('showinfo', 'showwarning', 'showerror'):
+        setattr(messagebox, name, lambda title=None, message=None, **kw: logging.info(f"[dialogue] {title}: {message}"))
+    for name in ('askyesno', 'askretrycancel', 'askokcancel'):
+        setattr(messagebox, name, lambda title=None, message=None, **kw: True)
+
+
+class SoakDriver:
+    """Injecte arrivées et dossards à débit fixe par paliers et mesure la réactivité de l'application."""
+
+    def __init__(self, app, rates, step_duration, lag_threshold_ms, min_rate_ratio):
+        self.app = app
+        self.rates = rates
+        self.step_duration = step_duration
+        self.lag_threshold = lag_threshold_ms / 1000
+        self.min_rate_ratio = min_rate_ratio
+        self.next_bib = 1
+        self.steps = []
+        self._heartbeat_expected = None
+
+    def run(self):
+        self.app.cat_combo.set(SOAK_CATEGORY)
+        self.app.on_category_selected()
+        self.app.start_race()
+        self._heartbeat_expected = time.perf_counter() + HEARTBEAT_INTERVAL_MS / 1000
+        self.app.after(HEARTBEAT_INTERVAL_MS, self._heartbeat)
+        self._start_step(0)
+        self.app.mainloop()
+        return self.steps
+
+    def _heartbeat(self):
+        now = time.perf_counter()
+        if self.steps and not self.steps[-1].get('done'):
+            self.steps[-1]['loop_lags'].append(max(0.0, now - self._heartbeat_expected))
+        self._heartbeat_expected = now + HEARTBEAT_INTERVAL_MS / 1000
+        self.app.after(HEARTBEAT_INTERVAL_MS, self._heartbeat)
+
+    def _start_step(self, index):
+        if index >= len(self.rates):
+            self._finish(); return
+        rate = self.rates[index]
+        step = {'rate': rate, 'start': time.perf_counter(), 'period': 1.0 / rate, 'sent': 0,
+                'callback_durations': [], 'fire_delays': [], 'loop_lags': []}
+        self.steps.append(step)
+        print(f"Palier {index + 1}/{len(self.rates)}: {rate} arrivées/s pendant {self.step_duration}s", flush=True)
+        self.app.after(0, self._inject, index)
+
+    def _inject(self, index):
+        step = self.steps[index]
+        now = time.perf_counter()
+        deadline = step['start'] + step['sent'] * step['period']
+        step['fire_delays'].append(max(0.0, now - deadline))
+        t0 = time.perf_counter()
+        self.app.new_arrival()
+        self.app.entry_bib.delete(0, 'end')
+        self.app.entry_bib.insert(0, str(self.next_bib))
+        self.app.assign_arrival()
+        step['callback_durations'].append(time.perf_counter() - t0)
+        self.next_bib += 1
+        step['sent'] += 1
+
+        elapsed = time.perf_counter() - step['start']
+        if elapsed >= self.step_duration:
+            self._close_step(index)
+            return
+        next_deadline = step['start'] + step['sent'] * step['period']
+        delay_ms = max(0, int((next_deadline - time.perf_counter()) * 1000))
+        self.app.after(delay_ms, self._inject, index)
+
+    def _close_step(self, index):
+        step = self.steps[index]
+        step['done'] = True
+        elapsed = time.perf_counter() - step['start']
+        step['achieved_rate'] = step['sent'] / elapsed if elapsed else 0.0
+        step['pending_after_events'] = len(self.app.tk.splitlist(self.app.tk.call('after', 'info')))
+        step['lag_p95'] = percentile(step['loop_lags'], 0.95)
+        saturated = (step['achieved_rate'] < self.min_rate_ratio * step['rate'] or step['lag_p95'] > self.lag_threshold)
+        step['saturated'] = saturated
+        print(f"Palier {step['rate']}/s: tenu {step['achieved_rate']:.1f}/s, retard boucle p95 {step['lag_p95'] * 1000:.1f} ms"
+              + (" -> SATURÉ" if saturated else ""), flush=True)
+        if saturated:
+            self._finish()
+        else:
+            self._start_step(index + 1)
+
+    def _finish(self):
+        self.app.after(200, self.app.destroy)
+
+
+def summarize(steps):
+    report = {'steps': [], 'sustained_rate': 0.0}
+    for step in steps:
+        if 'achieved_rate' not in step: continue
+        report['steps'].append({
+            'target_rate': step['rate'],
+            'achieved_rate': round(step['achieved_rate'], 2),
+            'arrivals': step['sent'],
+            'loop_lag_ms': {'p50': round(percentile(step['loop_lags'], 0.5) * 1000, 2),
+                            'p95': round(percentile(step['loop_lags'], 0.95) * 1000, 2),
+                            'max': round(max(step['loop_lags'], default=0) * 1000, 2)},
+            'callback_ms': {'p50': round(percentile(step['callback_durations'], 0.5) * 1000, 2),
+                            'p95': round(percentile(step['callback_durations'], 0.95) * 1000, 2),
+                            'max': round(max(step['callback_durations'], default=0) * 1000, 2)},
+            'fire_delay_ms_p95': round(percentile(step['fire_delays'], 0.95) * 1000, 2),
+            'pending_after_events': step['pending_after_events'],
+            'saturated': step['saturated'],
+        })
+        if not step['saturated']:
+            report['sustained_rate'] = max(report['sustained_rate'], step['achieved_rate'])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test d'endurance de l'interface de chronométrage (Tk sous Xvfb).")
+    parser.add_argument('--rates', default="5,10,20,30,50", help="Débits successifs en arrivées/seconde (ex: 5,10,20,50)")
+    parser.add_argument('--duration', type=float, default=20.0, help="Durée de chaque palier en secondes")
+    parser.add_argument('--lag-threshold-ms', type=float, default=100.0, help="Retard p95 de la boucle Tk au-delà duquel l'UI est saturée")
+    parser.add_argument('--min-rate-ratio', type=float, default=0.95, help="Fraction du débit cible à tenir pour ne pas être saturé")
+    parser.add_argument('--output', help="Fichier JSON où écrire le rapport")
+    parser.add_argument('--verbose', action='store_true', help="Conserver le journal INFO de l'application (une ligne par arrivée)")
+    args = parser.parse_args(argv)
+    rates = [float(r) for r in args.rates.split(',') if r.strip()]
+
+    xvfb = start_virtual_display()
+    work_dir = tempfile.mkdtemp(prefix="race_timer_soak_")
+    try:
+        prepare_sandbox(work_dir, int(sum(rate * args.duration for rate in rates) * 1.2) + 100)
+        silence_dialogs()
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+        app = RaceTimerApp()
+        steps = SoakDriver(app, rates, args.duration, args.lag_threshold_ms, args.min_rate_ratio).run()
+        report = summarize(steps)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"Débit soutenu avant saturation: {report['sustained_rate']:.1f} arrivées/s")
+        if args.output:
+            pathlib.Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if xvfb is not None:
+            xvfb.terminate()
+
+
+if __name__ == '__main__':
+    main()